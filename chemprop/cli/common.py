@@ -39,6 +39,11 @@ def add_common_args(parser: ArgumentParser) -> ArgumentParser:
 (Warning: setting ``num_workers`` to a value greater than 0 can cause hangs on Windows and MacOS)""",
     )
     dataloader_args.add_argument("-b", "--batch-size", type=int, default=64, help="Batch size")
+    dataloader_args.add_argument(
+        "--pin-memory",
+        action="store_true",
+        help="Load batches into pinned memory so that they can be transferred to a CUDA device asynchronously",
+    )
 
     parser.add_argument(
         "--accelerator", default="auto", help="Passed directly to the lightning ``Trainer()``"
@@ -85,6 +90,11 @@ def add_common_args(parser: ArgumentParser) -> ArgumentParser:
     featurization_args.add_argument(
         "--add-h", action="store_true", help="Whether hydrogens should be added to the mol graph"
     )
+    featurization_args.add_argument(
+        "--lazy-mols",
+        action="store_true",
+        help="Store only the SMILES strings of the input molecules and build the RDKit molecules on demand during featurization. This reduces memory usage for large datasets, especially when combined with ``--no-cache`` during training.",
+    )
     featurization_args.add_argument(
         "--molecule-featurizers",
         "--features-generators",
@@ -197,14 +207,15 @@ def find_models(model_paths: list[Path]):
     collected_model_paths = []
 
     for model_path in model_paths:
-        if model_path.suffix in [".ckpt", ".pt"]:
+        if model_path.suffix in [".ckpt", ".pt", ".safetensors"]:
             collected_model_paths.append(model_path)
         elif model_path.is_dir():
             collected_model_paths.extend(list(model_path.rglob("*.pt")))
+            collected_model_paths.extend(list(model_path.rglob("*.safetensors")))
         else:
             raise ArgumentError(
                 argument=None,
-                message=f"Expected a .ckpt or .pt file, or a directory. Got {model_path}",
+                message=f"Expected a .ckpt, .pt, or .safetensors file, or a directory. Got {model_path}",
             )
 
     return collected_model_paths
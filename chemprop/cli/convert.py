@@ -3,15 +3,18 @@ import logging
 from pathlib import Path
 import sys
 
+import torch
+
 from chemprop.cli.utils import Subcommand
-from chemprop.utils.v1_to_v2 import convert_model_file_v1_to_v2
+from chemprop.models.serialization import load_model_file, save_safetensors
+from chemprop.utils.v1_to_v2 import convert_model_dict_v1_to_v2
 
 logger = logging.getLogger(__name__)
 
 
 class ConvertSubcommand(Subcommand):
     COMMAND = "convert"
-    HELP = "Convert a v1 model checkpoint (.pt) to a v2 model checkpoint (.pt)."
+    HELP = "Convert a v1 model checkpoint (.pt) to a v2 model file (.pt or .safetensors), or a v2 model file or checkpoint to another format."
 
     @classmethod
     def add_args(cls, parser: ArgumentParser) -> ArgumentParser:
@@ -20,13 +23,13 @@ class ConvertSubcommand(Subcommand):
             "--input-path",
             required=True,
             type=Path,
-            help="Path to a v1 model .pt checkpoint file",
+            help="Path to a v1 model .pt checkpoint file, or to a v2 model .ckpt, .pt, or .safetensors file",
         )
         parser.add_argument(
             "-o",
             "--output-path",
             type=Path,
-            help="Path to which the converted model will be saved (``CURRENT_DIRECTORY/STEM_OF_INPUT_v2.pt`` by default)",
+            help="Path to which the converted model will be saved as a ``.pt`` or ``.safetensors`` file (``CURRENT_DIRECTORY/STEM_OF_INPUT_v2.pt`` by default)",
         )
         return parser
 
@@ -34,15 +37,37 @@ class ConvertSubcommand(Subcommand):
     def func(cls, args: Namespace):
         if args.output_path is None:
             args.output_path = Path(args.input_path.stem + "_v2.pt")
-        if args.output_path.suffix != ".pt":
+        if args.output_path.suffix not in [".pt", ".safetensors"]:
             raise ArgumentError(
-                argument=None, message=f"Output must be a `.pt` file. Got {args.output_path}"
+                argument=None,
+                message=f"Output must be a `.pt` or `.safetensors` file. Got {args.output_path}",
             )
 
-        logger.info(
-            f"Converting v1 model checkpoint '{args.input_path}' to v2 model checkpoint '{args.output_path}'..."
-        )
-        convert_model_file_v1_to_v2(args.input_path, args.output_path)
+        model_dict = load_model_file(args.input_path, map_location="cpu")
+        if "hyper_parameters" not in model_dict:
+            logger.info(
+                f"Converting v1 model checkpoint '{args.input_path}' to v2 model file '{args.output_path}'..."
+            )
+            model_dict = convert_model_dict_v1_to_v2(model_dict)
+        else:
+            logger.info(
+                f"Converting v2 model file '{args.input_path}' to model file '{args.output_path}'..."
+            )
+            model_dict = {
+                "hyper_parameters": model_dict["hyper_parameters"],
+                "state_dict": model_dict["state_dict"],
+                "output_columns": model_dict.get("output_columns"),
+            }
+
+        if args.output_path.suffix == ".safetensors":
+            save_safetensors(
+                args.output_path,
+                model_dict["hyper_parameters"],
+                model_dict["state_dict"],
+                output_columns=model_dict.get("output_columns"),
+            )
+        else:
+            torch.save(model_dict, args.output_path)
 
 
 if __name__ == "__main__":
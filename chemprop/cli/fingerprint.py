@@ -44,7 +44,7 @@ class FingerprintSubcommand(Subcommand):
             required=True,
             type=Path,
             nargs="+",
-            help="Specify location of checkpoint(s) or model file(s) to use for prediction. It can be a path to either a single pretrained model checkpoint (.ckpt) or single pretrained model file (.pt), a directory that contains these files, or a list of path(s) and directory(s). If a directory, chemprop will recursively search and predict on all found (.pt) models.",
+            help="Specify location of checkpoint(s) or model file(s) to use for prediction. It can be a path to either a single pretrained model checkpoint (.ckpt) or single pretrained model file (.pt or .safetensors), a directory that contains these files, or a list of path(s) and directory(s). If a directory, chemprop will recursively search and predict on all found (.pt and .safetensors) models.",
         )
         parser.add_argument(
             "--ffn-block-index",
@@ -81,7 +81,7 @@ def process_fingerprint_args(args: Namespace) -> Namespace:
 def make_fingerprint_for_model(
     args: Namespace, model_path: Path, multicomponent: bool, output_path: Path
 ):
-    model = load_model(model_path, multicomponent)
+    model = load_model(model_path, multicomponent, mmap=True)
     model.eval()
 
     bounded = any(
@@ -102,7 +102,10 @@ def make_fingerprint_for_model(
     )
 
     featurization_kwargs = dict(
-        molecule_featurizers=args.molecule_featurizers, keep_h=args.keep_h, add_h=args.add_h
+        molecule_featurizers=args.molecule_featurizers,
+        keep_h=args.keep_h,
+        add_h=args.add_h,
+        lazy=args.lazy_mols,
     )
 
     test_data = build_data_from_files(
@@ -124,7 +127,9 @@ def make_fingerprint_for_model(
     else:
         test_dset = test_dsets[0]
 
-    test_loader = data.build_dataloader(test_dset, args.batch_size, args.num_workers, shuffle=False)
+    test_loader = data.build_dataloader(
+        test_dset, args.batch_size, args.num_workers, shuffle=False, pin_memory=args.pin_memory
+    )
 
     logger.info(model)
 
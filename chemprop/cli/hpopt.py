@@ -1,13 +1,20 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from copy import deepcopy
+from dataclasses import dataclass
 import logging
+import multiprocessing
 from pathlib import Path
 import shutil
 import sys
+import tempfile
+import time
+from typing import TypeAlias
 
 from configargparse import ArgumentParser, Namespace
 from lightning import pytorch as pl
-from lightning.pytorch.callbacks import EarlyStopping
+from lightning.pytorch.callbacks import EarlyStopping, ModelCheckpoint
 import numpy as np
+import pandas as pd
 import torch
 
 from chemprop.cli.common import add_common_args, process_common_args, validate_common_args
@@ -17,33 +24,118 @@ from chemprop.cli.train import (
     build_datasets,
     build_model,
     build_splits,
+    get_tracking_metric,
     normalize_inputs,
     process_train_args,
     save_config,
     validate_train_args,
 )
 from chemprop.cli.utils.command import Subcommand
-from chemprop.data import build_dataloader
-from chemprop.nn import AggregationRegistry, MetricRegistry
+from chemprop.cli.utils.parallel import (
+    available_cpus,
+    init_worker_process,
+    load_packed_dataset,
+    make_core_sets,
+    save_packed_dataset,
+)
+from chemprop.data import BatchReplayLoader, MulticomponentDataset, build_dataloader, pack_dataset
+from chemprop.nn import AggregationRegistry
 from chemprop.nn.transforms import UnscaleTransform
 from chemprop.nn.utils import Activation
 
-NO_RAY = False
-DEFAULT_SEARCH_SPACE = {
-    "activation": None,
-    "aggregation": None,
-    "aggregation_norm": None,
-    "batch_size": None,
-    "depth": None,
-    "dropout": None,
-    "ffn_hidden_dim": None,
-    "ffn_num_layers": None,
-    "final_lr_ratio": None,
-    "message_hidden_dim": None,
-    "init_lr_ratio": None,
-    "max_lr": None,
+
+@dataclass(frozen=True)
+class Choice:
+    """A uniform choice between the given categories"""
+
+    categories: list
+
+    def sample(self, rng: np.random.Generator):
+        return self.categories[rng.integers(len(self.categories))]
+
+    def suggest(self, trial: "optuna.Trial", name: str):
+        # optuna only supports primitive categories, so suggest an index into the categories instead
+        return self.categories[trial.suggest_categorical(name, list(range(len(self.categories))))]
+
+    def to_tune(self):
+        return tune.choice(categories=self.categories)
+
+
+@dataclass(frozen=True)
+class QUniform:
+    """A float sampled uniformly from ``[lower, upper]`` and rounded to a multiple of ``q``"""
+
+    lower: float
+    upper: float
+    q: float
+
+    def sample(self, rng: np.random.Generator) -> float:
+        return float(np.round(rng.uniform(self.lower, self.upper) / self.q) * self.q)
+
+    def suggest(self, trial: "optuna.Trial", name: str) -> float:
+        return trial.suggest_float(name, self.lower, self.upper, step=self.q)
+
+    def to_tune(self):
+        return tune.quniform(lower=self.lower, upper=self.upper, q=self.q)
+
+
+@dataclass(frozen=True)
+class QRandInt:
+    """An integer sampled uniformly from ``[lower, upper]`` and rounded to a multiple of ``q``"""
+
+    lower: int
+    upper: int
+    q: int
+
+    def sample(self, rng: np.random.Generator) -> int:
+        return int(np.round(rng.integers(self.lower, self.upper + 1) / self.q) * self.q)
+
+    def suggest(self, trial: "optuna.Trial", name: str) -> int:
+        return trial.suggest_int(name, self.lower, self.upper, step=self.q)
+
+    def to_tune(self):
+        return tune.qrandint(lower=self.lower, upper=self.upper, q=self.q)
+
+
+@dataclass(frozen=True)
+class LogUniform:
+    """A float sampled uniformly from ``[lower, upper]`` in log space"""
+
+    lower: float
+    upper: float
+
+    def sample(self, rng: np.random.Generator) -> float:
+        return float(np.exp(rng.uniform(np.log(self.lower), np.log(self.upper))))
+
+    def suggest(self, trial: "optuna.Trial", name: str) -> float:
+        return trial.suggest_float(name, self.lower, self.upper, log=True)
+
+    def to_tune(self):
+        return tune.loguniform(lower=self.lower, upper=self.upper)
+
+
+SearchDomain: TypeAlias = Choice | QUniform | QRandInt | LogUniform
+
+SEARCH_DOMAINS: dict[str, SearchDomain | None] = {
+    "activation": Choice(list(Activation.keys())),
+    "aggregation": Choice(list(AggregationRegistry.keys())),
+    "aggregation_norm": QUniform(1, 200, 1),
+    "batch_size": Choice([16, 32, 64, 128, 256]),
+    "depth": QRandInt(2, 6, 1),
+    "dropout": Choice([0.0] * 8 + [float(p) for p in np.arange(0.05, 0.45, 0.05)]),
+    "ffn_hidden_dim": QRandInt(300, 2400, 100),
+    "ffn_num_layers": QRandInt(1, 3, 1),
+    "final_lr_ratio": LogUniform(1e-2, 1),
+    "message_hidden_dim": QRandInt(300, 2400, 100),
+    "init_lr_ratio": LogUniform(1e-2, 1),
+    "max_lr": LogUniform(1e-4, 1e-2),
     "warmup_epochs": None,
 }
+"""the search domain of each hyperparameter, independent of the backend used for optimization.
+The domain of ``warmup_epochs`` depends on the number of training epochs."""
+
+NO_RAY = False
+DEFAULT_SEARCH_SPACE = dict.fromkeys(SEARCH_DOMAINS)
 
 try:
     import ray
@@ -56,22 +148,11 @@ try:
         prepare_trainer,
     )
     from ray.train.torch import TorchTrainer
-    from ray.tune.schedulers import ASHAScheduler, FIFOScheduler
+    from ray.tune.schedulers import ASHAScheduler, FIFOScheduler, HyperBandScheduler
 
     DEFAULT_SEARCH_SPACE = {
-        "activation": tune.choice(categories=list(Activation.keys())),
-        "aggregation": tune.choice(categories=list(AggregationRegistry.keys())),
-        "aggregation_norm": tune.quniform(lower=1, upper=200, q=1),
-        "batch_size": tune.choice([16, 32, 64, 128, 256]),
-        "depth": tune.qrandint(lower=2, upper=6, q=1),
-        "dropout": tune.choice([0.0] * 8 + list(np.arange(0.05, 0.45, 0.05))),
-        "ffn_hidden_dim": tune.qrandint(lower=300, upper=2400, q=100),
-        "ffn_num_layers": tune.qrandint(lower=1, upper=3, q=1),
-        "final_lr_ratio": tune.loguniform(lower=1e-2, upper=1),
-        "message_hidden_dim": tune.qrandint(lower=300, upper=2400, q=100),
-        "init_lr_ratio": tune.loguniform(lower=1e-2, upper=1),
-        "max_lr": tune.loguniform(lower=1e-4, upper=1e-2),
-        "warmup_epochs": None,
+        param: None if domain is None else domain.to_tune()
+        for param, domain in SEARCH_DOMAINS.items()
     }
 except ImportError:
     NO_RAY = True
@@ -84,7 +165,10 @@ except ImportError:
 
 NO_OPTUNA = False
 try:
-    from ray.tune.search.optuna import OptunaSearch
+    import optuna
+
+    if not NO_RAY:
+        from ray.tune.search.optuna import OptunaSearch
 except ImportError:
     NO_OPTUNA = True
 
@@ -145,6 +229,15 @@ def add_hpopt_args(parser: ArgumentParser) -> ArgumentParser:
         help="Directory to save the hyperparameter optimization results",
     )
 
+    hpopt_args.add_argument(
+        "--hpopt-backend",
+        choices=["ray", "local"],
+        default="ray",
+        help="""The backend with which to run trials:
+        - ``ray``: Run trials with Ray Tune
+        - ``local``: Run trials in a pool of local worker processes, each pinned to its own CPU cores. This doesn't require Ray and has far less startup overhead on a single machine. It supports the ``random`` search algorithm and TPE (used for both ``hyperopt`` and ``optuna``, and requiring optuna) and uses ``--raytune-num-samples``, ``--raytune-max-concurrent-trials``, ``--hyperopt-n-initial-points``, and ``--hyperopt-random-state-seed``""",
+    )
+
     raytune_args = parser.add_argument_group("Ray Tune arguments")
 
     raytune_args.add_argument(
@@ -163,9 +256,15 @@ def add_hpopt_args(parser: ArgumentParser) -> ArgumentParser:
 
     raytune_args.add_argument(
         "--raytune-trial-scheduler",
-        choices=["FIFO", "AsyncHyperBand"],
+        choices=["FIFO", "AsyncHyperBand", "HyperBand"],
         default="FIFO",
-        help="Passed to Ray Tune ``TuneConfig`` to control trial scheduler",
+        help="""Passed to Ray Tune ``TuneConfig`` to control trial scheduler. ``AsyncHyperBand`` stops trials that perform poorly early on. ``HyperBand`` runs synchronous successive halving brackets instead: trials are paused at each rung and only the promoted trials are resumed from their latest checkpoint, so no completed epochs are retrained""",
+    )
+
+    raytune_args.add_argument(
+        "--raytune-resume",
+        action="store_true",
+        help="Resume the most recent hyperparameter optimization in ``hpopt_save_dir/ray_results`` that was interrupted. Finished trials are kept, and unfinished and errored trials are continued from their latest checkpoints. If there is no run to resume, a new one is started",
     )
 
     raytune_args.add_argument(
@@ -199,7 +298,7 @@ def add_hpopt_args(parser: ArgumentParser) -> ArgumentParser:
         "--raytune-reduction-factor",
         type=int,
         default=2,
-        help="Passed directly to Ray Tune ``ASHAScheduler`` to control reduction factor",
+        help="Passed directly to Ray Tune ``ASHAScheduler`` or ``HyperBandScheduler`` to control reduction factor",
     )
 
     raytune_args.add_argument(
@@ -224,6 +323,15 @@ def add_hpopt_args(parser: ArgumentParser) -> ArgumentParser:
         help="Passed directly to Ray Tune TuneConfig to control maximum concurrent trials",
     )
 
+    local_args = parser.add_argument_group("Local backend arguments")
+
+    local_args.add_argument(
+        "--local-threads-per-trial",
+        type=int,
+        default=1,
+        help="The number of CPU cores to which each trial of the ``local`` backend is pinned and the number of threads it uses. If ``--raytune-max-concurrent-trials`` is not given, as many trials as fit on the available cores are run concurrently",
+    )
+
     hyperopt_args = parser.add_argument_group("Hyperopt arguments")
 
     hyperopt_args.add_argument(
@@ -300,13 +408,23 @@ def update_args_with_config(args: Namespace, config: dict) -> Namespace:
     return args
 
 
-def train_model(config, args, train_dset, val_dset, logger, output_transform, input_transforms):
+def build_trial(config, args, train_dset, val_dset, logger, output_transform, input_transforms):
+    """Build the model, dataloaders, and early stopping callback of the trial with the given
+    configuration"""
     args = update_args_with_config(args, config)
 
     train_loader = build_dataloader(
-        train_dset, args.batch_size, args.num_workers, seed=args.data_seed
+        train_dset,
+        args.batch_size,
+        args.num_workers,
+        seed=args.data_seed,
+        pin_memory=args.pin_memory,
+    )
+    val_loader = build_dataloader(
+        val_dset, args.batch_size, args.num_workers, shuffle=False, pin_memory=args.pin_memory
     )
-    val_loader = build_dataloader(val_dset, args.batch_size, args.num_workers, shuffle=False)
+    if args.replay_eval_batches:
+        val_loader = BatchReplayLoader(val_loader, pin_memory=args.pin_memory)
 
     seed = args.pytorch_seed if args.pytorch_seed is not None else torch.seed()
 
@@ -315,18 +433,22 @@ def train_model(config, args, train_dset, val_dset, logger, output_transform, in
     model = build_model(args, train_loader.dataset, output_transform, input_transforms)
     logger.info(model)
 
-    if args.tracking_metric == "val_loss":
-        T_tracking_metric = model.criterion.__class__
-    else:
-        T_tracking_metric = MetricRegistry[args.tracking_metric]
-        args.tracking_metric = "val/" + args.tracking_metric
-
-    monitor_mode = "max" if T_tracking_metric.higher_is_better else "min"
-    logger.debug(f"Evaluation metric: '{T_tracking_metric.alias}', mode: '{monitor_mode}'")
+    args.tracking_metric, monitor_mode = get_tracking_metric(args, model)
 
     patience = args.patience if args.patience is not None else args.epochs
     early_stopping = EarlyStopping(args.tracking_metric, patience=patience, mode=monitor_mode)
 
+    return args, model, train_loader, val_loader, early_stopping, monitor_mode
+
+
+def train_model(config, args, train_dset, val_dset, logger, output_transform, input_transforms):
+    if isinstance(train_dset, ray.ObjectRef):
+        train_dset, val_dset = ray.get([train_dset, val_dset])
+
+    args, model, train_loader, val_loader, early_stopping, _ = build_trial(
+        config, args, train_dset, val_dset, logger, output_transform, input_transforms
+    )
+
     trainer = pl.Trainer(
         accelerator=args.accelerator,
         devices=args.devices,
@@ -338,7 +460,16 @@ def train_model(config, args, train_dset, val_dset, logger, output_transform, in
         deterministic=args.pytorch_seed is not None,
     )
     trainer = prepare_trainer(trainer)
-    trainer.fit(model, train_loader, val_loader)
+
+    # a trial that is resumed (after being paused by the scheduler or after an interrupted run)
+    # continues training from its latest checkpoint rather than starting over
+    checkpoint = ray.train.get_checkpoint()
+    if checkpoint is None:
+        trainer.fit(model, train_loader, val_loader)
+    else:
+        with checkpoint.as_directory() as checkpoint_dir:
+            ckpt_path = Path(checkpoint_dir) / RayTrainReportCallback.CHECKPOINT_NAME
+            trainer.fit(model, train_loader, val_loader, ckpt_path=ckpt_path)
 
 
 def tune_model(
@@ -353,6 +484,10 @@ def tune_model(
                 grace_period=min(args.raytune_grace_period, args.epochs),
                 reduction_factor=args.raytune_reduction_factor,
             )
+        case "HyperBand":
+            scheduler = HyperBandScheduler(
+                max_t=args.epochs, reduction_factor=args.raytune_reduction_factor
+            )
         case _:
             raise ValueError(f"Invalid trial scheduler! got: {args.raytune_trial_scheduler}.")
 
@@ -382,14 +517,16 @@ def tune_model(
         checkpoint_score_order=monitor_mode,
     )
 
-    run_config = RunConfig(
-        checkpoint_config=checkpoint_config,
-        storage_path=args.hpopt_save_dir.absolute() / "ray_results",
-    )
+    storage_path = args.hpopt_save_dir.absolute() / "ray_results"
+    run_config = RunConfig(checkpoint_config=checkpoint_config, storage_path=storage_path)
+
+    # store the packed datasets in the object store once so that every trial maps them from shared
+    # memory rather than receiving its own pickled copy
+    train_ref, val_ref = ray.put(train_dset), ray.put(val_dset)
 
     ray_trainer = TorchTrainer(
         lambda config: train_model(
-            config, args, train_dset, val_dset, logger, output_transform, input_transforms
+            config, args, train_ref, val_ref, logger, output_transform, input_transforms
         ),
         scaling_config=scaling_config,
         run_config=run_config,
@@ -425,26 +562,223 @@ def tune_model(
         trial_dirname_creator=lambda trial: str(trial.trial_id),
     )
 
-    tuner = tune.Tuner(
-        ray_trainer,
-        param_space={
-            "train_loop_config": build_search_space(args.search_parameter_keywords, args.epochs)
-        },
-        tune_config=tune_config,
-    )
+    param_space = {
+        "train_loop_config": build_search_space(args.search_parameter_keywords, args.epochs)
+    }
+
+    run_path = find_resumable_run(storage_path) if args.raytune_resume else None
+    if run_path is not None:
+        logger.info(f"Resuming hyperparameter optimization from '{run_path}'")
+        tuner = tune.Tuner.restore(
+            str(run_path),
+            ray_trainer,
+            resume_unfinished=True,
+            resume_errored=True,
+            param_space=param_space,
+        )
+    else:
+        if args.raytune_resume:
+            logger.warning(
+                f"No hyperparameter optimization to resume found in '{storage_path}'! "
+                "Starting a new one."
+            )
+        tuner = tune.Tuner(ray_trainer, param_space=param_space, tune_config=tune_config)
 
     return tuner.fit()
 
 
-def main(args: Namespace):
+def find_resumable_run(storage_path: Path) -> Path | None:
+    """Find the most recently modified run in ``storage_path`` that can be restored by Ray Tune,
+    if any"""
+    if not storage_path.is_dir():
+        return None
+
+    run_paths = [
+        path for path in storage_path.iterdir() if path.is_dir() and tune.Tuner.can_restore(path)
+    ]
+
+    return max(run_paths, key=lambda path: path.stat().st_mtime, default=None)
+
+
+def build_search_domains(
+    search_parameters: list[str], train_epochs: int
+) -> dict[str, SearchDomain]:
+    domains = {param: SEARCH_DOMAINS[param] for param in search_parameters}
+    if "warmup_epochs" in domains and domains["warmup_epochs"] is None:
+        assert (
+            train_epochs >= 6
+        ), "Training epochs must be at least 6 to perform hyperparameter optimization for warmup_epochs."
+        domains["warmup_epochs"] = QRandInt(1, train_epochs // 2, 1)
+
+    return domains
+
+
+def tune_model_locally(
+    args, train_dset, val_dset, tracking_metric, monitor_mode, output_transform, input_transforms
+) -> tuple[dict, Path, pd.DataFrame]:
+    """Run trials in a pool of local worker processes
+
+    The packed datasets are saved once and memory-mapped by each worker, so all concurrent trials
+    share a single copy of the featurized data in the page cache. Each worker is pinned to its own
+    set of ``args.local_threads_per_trial`` CPU cores and limits its thread pools to as many threads.
+
+    Returns
+    -------
+    dict
+        the configuration of the best trial
+    Path
+        the path to the best checkpoint of the best trial
+    pd.DataFrame
+        the results of all trials
+    """
+    domains = build_search_domains(args.search_parameter_keywords, args.epochs)
+
+    match args.raytune_search_algorithm:
+        case "random":
+            rng = np.random.default_rng(args.hyperopt_random_state_seed)
+            study = None
+        case "hyperopt" | "optuna":
+            if NO_OPTUNA:
+                raise ImportError(
+                    "TPE search with the local backend requires optuna to be installed. Use 'pip install -U optuna' to install or use the 'random' search algorithm."
+                )
+
+            sampler = optuna.samplers.TPESampler(
+                n_startup_trials=args.hyperopt_n_initial_points,
+                seed=args.hyperopt_random_state_seed,
+                constant_liar=True,
+            )
+            direction = "maximize" if monitor_mode == "max" else "minimize"
+            study = optuna.create_study(sampler=sampler, direction=direction)
+
+    cpus = available_cpus()
+    n_threads = min(args.local_threads_per_trial, len(cpus))
+    n_workers = args.raytune_max_concurrent_trials or max(1, len(cpus) // n_threads)
+    n_workers = min(n_workers, args.raytune_num_samples)
+
+    ctx = multiprocessing.get_context("spawn")
+    core_sets = make_core_sets(ctx, cpus, n_workers, n_threads)
+
+    logger.info(f"Running {n_workers} concurrent trials with {n_threads} thread(s) each")
+
+    results_dir = args.hpopt_save_dir / "local_results"
+    configs = {}
+    rows = []
+    with (
+        tempfile.TemporaryDirectory(dir=args.hpopt_save_dir) as data_dir,
+        ProcessPoolExecutor(
+            n_workers, ctx, initializer=init_worker_process, initargs=(core_sets, n_threads)
+        ) as executor,
+    ):
+        data_dir = Path(data_dir)
+        save_packed_dataset(train_dset, data_dir / "train")
+        save_packed_dataset(val_dset, data_dir / "val")
+
+        trials = {}
+        n_submitted = 0
+        while n_submitted < args.raytune_num_samples or trials:
+            while n_submitted < args.raytune_num_samples and len(trials) < n_workers:
+                trial_id = f"trial_{n_submitted:04d}"
+                if study is None:
+                    trial = None
+                    config = {param: domain.sample(rng) for param, domain in domains.items()}
+                else:
+                    trial = study.ask()
+                    config = {
+                        param: domain.suggest(trial, param) for param, domain in domains.items()
+                    }
+
+                future = executor.submit(
+                    run_local_trial,
+                    config,
+                    args,
+                    data_dir,
+                    results_dir / trial_id,
+                    output_transform,
+                    input_transforms,
+                )
+                trials[future] = trial_id, trial
+                configs[trial_id] = config
+                n_submitted += 1
+
+            done, _ = wait(trials, return_when=FIRST_COMPLETED)
+            for future in done:
+                trial_id, trial = trials.pop(future)
+                try:
+                    result = future.result()
+                except Exception:
+                    logger.exception(f"Trial '{trial_id}' failed!")
+                    result = {tracking_metric: np.nan}
+                    if study is not None:
+                        study.tell(trial, state=optuna.trial.TrialState.FAIL)
+                else:
+                    logger.info(f"Trial '{trial_id}' finished: {result}")
+                    if study is not None:
+                        study.tell(trial, result[tracking_metric])
+
+                config = {f"config/train_loop_config/{k}": v for k, v in configs[trial_id].items()}
+                rows.append({"trial_id": trial_id, **result, **config})
+
+    result_df = pd.DataFrame(rows).sort_values("trial_id")
+    scores = result_df[tracking_metric]
+    if scores.isna().all():
+        raise RuntimeError("All trials failed!")
+
+    best_row = result_df.loc[scores.idxmax() if monitor_mode == "max" else scores.idxmin()]
+
+    return configs[best_row["trial_id"]], Path(best_row["checkpoint_path"]), result_df
+
+
+def run_local_trial(
+    config, args, data_dir: Path, trial_dir: Path, output_transform, input_transforms
+) -> dict:
+    """Train a model with the given configuration in a worker process of the local backend"""
+    train_dset = load_packed_dataset(data_dir / "train")
+    val_dset = load_packed_dataset(data_dir / "val")
+
+    args, model, train_loader, val_loader, early_stopping, monitor_mode = build_trial(
+        config, args, train_dset, val_dset, logger, output_transform, input_transforms
+    )
+    checkpointing = ModelCheckpoint(
+        trial_dir, "checkpoint", args.tracking_metric, mode=monitor_mode, save_top_k=1
+    )
+
+    trainer = pl.Trainer(
+        logger=False,
+        enable_progress_bar=False,
+        enable_model_summary=False,
+        accelerator=args.accelerator,
+        devices=1,
+        max_epochs=args.epochs,
+        gradient_clip_val=args.grad_clip,
+        callbacks=[checkpointing, early_stopping],
+        deterministic=args.pytorch_seed is not None,
+    )
+
+    start = time.perf_counter()
+    trainer.fit(model, train_loader, val_loader)
+
+    if checkpointing.best_model_score is None:
+        raise RuntimeError(f"Metric '{args.tracking_metric}' was never logged!")
+
+    return {
+        args.tracking_metric: checkpointing.best_model_score.item(),
+        "training_iteration": trainer.current_epoch,
+        "time_total_s": time.perf_counter() - start,
+        "checkpoint_path": checkpointing.best_model_path,
+    }
+
+
+def init_ray(args: Namespace):
     if NO_RAY:
         raise ImportError(
-            "Ray Tune requires ray to be installed. If you installed Chemprop from PyPI, run 'pip install -U ray[tune]' to install ray. If you installed from source, use 'pip install -e .[hpopt]' in Chemprop folder to install all hpopt relevant packages."
+            "Ray Tune requires ray to be installed. If you installed Chemprop from PyPI, run 'pip install -U ray[tune]' to install ray. If you installed from source, use 'pip install -e .[hpopt]' in Chemprop folder to install all hpopt relevant packages. Alternatively, use '--hpopt-backend local', which doesn't require ray."
         )
 
     if not ray.is_initialized():
         try:
             ray.init(
+                address="local",
                 _temp_dir=args.raytune_temp_dir,
                 num_cpus=args.raytune_num_cpus,
                 num_gpus=args.raytune_num_gpus,
@@ -459,6 +793,11 @@ def main(args: Namespace):
     else:
         logger.info("Ray is already initialized.")
 
+
+def main(args: Namespace):
+    if args.hpopt_backend == "ray":
+        init_ray(args)
+
     format_kwargs = dict(
         no_header_row=args.no_header_row,
         smiles_cols=args.smiles_columns,
@@ -471,7 +810,10 @@ def main(args: Namespace):
     )
 
     featurization_kwargs = dict(
-        molecule_featurizers=args.molecule_featurizers, keep_h=args.keep_h, add_h=args.add_h
+        molecule_featurizers=args.molecule_featurizers,
+        keep_h=args.keep_h,
+        add_h=args.add_h,
+        lazy=args.lazy_mols,
     )
 
     train_data, val_data, test_data = build_splits(args, format_kwargs, featurization_kwargs)
@@ -487,20 +829,38 @@ def main(args: Namespace):
     else:
         output_transform = None
 
-    train_loader = build_dataloader(
-        train_dset, args.batch_size, args.num_workers, seed=args.data_seed
+    train_dset, val_dset = pack_dataset(train_dset), pack_dataset(val_dset)
+    nbytes = sum(
+        sum(d.nbytes for d in dset.datasets)
+        if isinstance(dset, MulticomponentDataset)
+        else dset.nbytes
+        for dset in (train_dset, val_dset)
     )
+    logger.info(f"Packed featurized data shared by all trials: {nbytes / 2**20:.1f} MiB")
 
-    model = build_model(args, train_loader.dataset, output_transform, input_transforms)
-    monitor_mode = "max" if model.metrics[0].higher_is_better else "min"
+    model = build_model(args, train_dset, output_transform, input_transforms)
 
-    results = tune_model(
-        args, train_dset, val_dset, logger, monitor_mode, output_transform, input_transforms
-    )
+    if args.hpopt_backend == "ray":
+        monitor_mode = "max" if model.metrics[0].higher_is_better else "min"
+        results = tune_model(
+            args, train_dset, val_dset, logger, monitor_mode, output_transform, input_transforms
+        )
 
-    best_result = results.get_best_result()
-    best_config = best_result.config["train_loop_config"]
-    best_checkpoint_path = Path(best_result.checkpoint.path) / "checkpoint.ckpt"
+        best_result = results.get_best_result()
+        best_config = best_result.config["train_loop_config"]
+        best_checkpoint_path = Path(best_result.checkpoint.path) / "checkpoint.ckpt"
+        result_df = results.get_dataframe()
+    else:
+        tracking_metric, monitor_mode = get_tracking_metric(args, model)
+        best_config, best_checkpoint_path, result_df = tune_model_locally(
+            args,
+            train_dset,
+            val_dset,
+            tracking_metric,
+            monitor_mode,
+            output_transform,
+            input_transforms,
+        )
 
     best_config_save_path = args.hpopt_save_dir / "best_config.toml"
     best_checkpoint_save_path = args.hpopt_save_dir / "best_checkpoint.ckpt"
@@ -521,11 +881,10 @@ def main(args: Namespace):
 
     logger.info(f"Hyperparameter optimization results saved to '{all_progress_save_path}'")
 
-    result_df = results.get_dataframe()
-
     result_df.to_csv(all_progress_save_path, index=False)
 
-    ray.shutdown()
+    if args.hpopt_backend == "ray":
+        ray.shutdown()
 
 
 if __name__ == "__main__":
@@ -9,6 +9,7 @@ from chemprop.cli.convert import ConvertSubcommand
 from chemprop.cli.fingerprint import FingerprintSubcommand
 from chemprop.cli.hpopt import HpoptSubcommand
 from chemprop.cli.predict import PredictSubcommand
+from chemprop.cli.serve import ServeSubcommand
 from chemprop.cli.train import TrainSubcommand
 from chemprop.cli.utils import pop_attr
 
@@ -20,6 +21,7 @@ SUBCOMMANDS = [
     ConvertSubcommand,
     FingerprintSubcommand,
     HpoptSubcommand,
+    ServeSubcommand,
 ]
 
 
@@ -1,13 +1,17 @@
 from argparse import ArgumentError, ArgumentParser, Namespace
+from contextlib import nullcontext
 import logging
 from pathlib import Path
 import sys
-from typing import Iterator
+from typing import Callable, Iterator, Self, Sequence
 
 from lightning import pytorch as pl
 import numpy as np
+from numpy.typing import ArrayLike
 import pandas as pd
 import torch
+from torch import Tensor
+from torch.utils.data import DataLoader
 
 from chemprop import data
 from chemprop.cli.common import (
@@ -16,20 +20,38 @@ from chemprop.cli.common import (
     process_common_args,
     validate_common_args,
 )
-from chemprop.cli.utils import LookupAction, Subcommand, build_data_from_files, make_dataset
-from chemprop.models.utils import load_model, load_output_columns
+from chemprop.cli.utils import (
+    LookupAction,
+    Subcommand,
+    build_data_from_files,
+    make_datapoints,
+    make_dataset,
+)
+from chemprop.cli.utils.parsing import load_input_feats_and_descs, parse_df
+from chemprop.models import MPNN
+from chemprop.models.cache import PredictionCache, file_digest
+from chemprop.models.utils import load_model_with_metadata
 from chemprop.nn.metrics import LossFunctionRegistry
 from chemprop.nn.predictors import EvidentialFFN, MulticlassClassificationFFN, MveFFN
 from chemprop.uncertainty import (
+    CalibratorBase,
     MVEWeightingCalibrator,
     NoUncertaintyEstimator,
     RegressionCalibrator,
     RegressionEvaluator,
     UncertaintyCalibratorRegistry,
+    UncertaintyEstimator,
     UncertaintyEstimatorRegistry,
     UncertaintyEvaluatorRegistry,
 )
-from chemprop.utils import Factory
+from chemprop.utils import Factory, ProfilingCallback, profile
+
+NO_PYARROW = False
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    NO_PYARROW = True
 
 logger = logging.getLogger(__name__)
 
@@ -64,12 +86,18 @@ def add_predict_args(parser: ArgumentParser) -> ArgumentParser:
         "--output",
         "--preds-path",
         type=Path,
-        help="Specify path to which predictions will be saved. If the file extension is .pkl, it will be saved as a pickle file. Otherwise, chemprop will save predictions as a CSV. If multiple models are used to make predictions, the average predictions will be saved in the file, and another file ending in '_individual' with the same file extension will save the predictions for each individual model, with the column names being the target names appended with the model index (e.g., '_model_<index>').",
+        help="Specify path to which predictions will be saved. If the file extension is .pkl, it will be saved as a pickle file. If the file extension is .parquet, it will be saved as a Parquet file (requires pyarrow). Otherwise, chemprop will save predictions as a CSV. If multiple models are used to make predictions, the average predictions will be saved in the file, and another file ending in '_individual' with the same file extension will save the predictions for each individual model, with the column names being the target names appended with the model index (e.g., '_model_<index>').",
     )
     parser.add_argument(
         "--drop-extra-columns",
         action="store_true",
-        help="Whether to drop all columns from the test data file besides the SMILES columns and the new prediction columns",
+        help="Whether to drop all columns from the test data file besides the SMILES columns and the new prediction columns. Only the SMILES columns of the test data file are then parsed when writing the predictions.",
+    )
+    parser.add_argument(
+        "--class-probability-format",
+        default="string",
+        choices=["string", "columns", "list"],
+        help="How to save the predicted class probabilities of multiclass models: as a single column of comma-separated probabilities for each task (``string``), as a separate column for the probability of each class of each task (``columns``), or as a single list-typed column for each task (``list``, only for .pkl and .parquet outputs)",
     )
     parser.add_argument(
         "--model-paths",
@@ -77,7 +105,28 @@ def add_predict_args(parser: ArgumentParser) -> ArgumentParser:
         required=True,
         type=Path,
         nargs="+",
-        help="Location of checkpoint(s) or model file(s) to use for prediction. It can be a path to either a single pretrained model checkpoint (.ckpt) or single pretrained model file (.pt), a directory that contains these files, or a list of path(s) and directory(s). If a directory, will recursively search and predict on all found (.pt) models.",
+        help="Location of checkpoint(s) or model file(s) to use for prediction. It can be a path to either a single pretrained model checkpoint (.ckpt) or single pretrained model file (.pt or .safetensors), a directory that contains these files, or a list of path(s) and directory(s). If a directory, will recursively search and predict on all found (.pt and .safetensors) models.",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        help="The number of test datapoints to predict at a time. If specified, the predictions (and uncertainties) of each chunk are calibrated and appended to the output file before the next chunk is predicted, so that memory use is bounded by the chunk size rather than the size of the test set. Only CSV outputs are supported. By default, the whole test set is predicted at once.",
+    )
+    parser.add_argument(
+        "--prediction-cache",
+        type=Path,
+        help="Path to an SQLite database in which to cache the predictions (and uncertainties) of each datapoint, keyed by its canonical SMILES, its extra features and descriptors, the digests of the model files, and the uncertainty and featurization settings. Only datapoints missing from the cache are featurized and predicted. The database is created if it doesn't exist.",
+    )
+    parser.add_argument(
+        "--prediction-cache-size",
+        type=int,
+        default=1_000_000,
+        help="The maximum number of datapoints in the prediction cache, beyond which the least recently used entries are evicted",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the wall time, throughput (molecules/s and atoms/s), and peak memory of each stage of featurization, collation, host-device transfer, message passing, aggregation, and the FFN, and save a summary to ``profile_summary.csv`` and a Chrome trace to ``profile_trace.json`` in the directory of the output file. Stages run by dataloader workers (``--num-workers`` > 0) are not profiled.",
     )
 
     unc_args = parser.add_argument_group("Uncertainty and calibration args")
@@ -175,9 +224,34 @@ def process_predict_args(args: Namespace) -> Namespace:
         )
     if args.output is None:
         args.output = args.test_path.parent / (args.test_path.stem + "_preds.csv")
-    if args.output.suffix not in [".csv", ".pkl"]:
+    if args.output.suffix not in [".csv", ".pkl", ".parquet"]:
+        raise ArgumentError(
+            argument=None,
+            message=f"Output must be a CSV, Pickle, or Parquet file. Got {args.output}",
+        )
+    if args.output.suffix == ".parquet" and NO_PYARROW:
+        raise ImportError(
+            "Saving predictions to a Parquet file requires pyarrow to be installed. Run 'pip install pyarrow' to install it."
+        )
+    if args.class_probability_format == "list" and args.output.suffix == ".csv":
+        raise ArgumentError(
+            argument=None,
+            message="List-typed class probabilities can only be saved to a Pickle or Parquet file.",
+        )
+    if args.chunk_size is not None:
+        if args.chunk_size < 1:
+            raise ArgumentError(
+                argument=None, message=f"'--chunk-size' must be positive. Got {args.chunk_size}"
+            )
+        if args.output.suffix == ".pkl":
+            raise ArgumentError(
+                argument=None,
+                message=f"Predicting in chunks requires a CSV or Parquet output file. Got {args.output}",
+            )
+    if args.prediction_cache_size < 1:
         raise ArgumentError(
-            argument=None, message=f"Output must be a CSV or Pickle file. Got {args.output}"
+            argument=None,
+            message=f"'--prediction-cache-size' must be positive. Got {args.prediction_cache_size}",
         )
     return args
 
@@ -194,7 +268,10 @@ def prepare_data_loader(
     )
 
     featurization_kwargs = dict(
-        molecule_featurizers=args.molecule_featurizers, keep_h=args.keep_h, add_h=args.add_h
+        molecule_featurizers=args.molecule_featurizers,
+        keep_h=args.keep_h,
+        add_h=args.add_h,
+        lazy=args.lazy_mols,
     )
 
     datas = build_data_from_files(
@@ -210,14 +287,23 @@ def prepare_data_loader(
     dsets = [make_dataset(d, args.rxn_mode, args.multi_hot_atom_featurizer_mode) for d in datas]
     dset = data.MulticomponentDataset(dsets) if multicomponent else dsets[0]
 
-    return data.build_dataloader(dset, args.batch_size, args.num_workers, shuffle=False)
+    return data.build_dataloader(
+        dset, args.batch_size, args.num_workers, shuffle=False, pin_memory=args.pin_memory
+    )
 
 
 def make_prediction_for_models(
-    args: Namespace, model_paths: Iterator[Path], multicomponent: bool, output_path: Path
+    args: Namespace,
+    model_paths: Iterator[Path],
+    multicomponent: bool,
+    output_path: Path,
+    cache: PredictionCache | None = None,
 ):
-    model = load_model(model_paths[0], multicomponent)
-    output_columns = load_output_columns(model_paths[0])
+    models, metadatas = zip(
+        *[load_model_with_metadata(path, multicomponent, mmap=True) for path in model_paths]
+    )
+    model = models[0]
+    output_columns = metadatas[0].get("output_columns")
     bounded = any(
         isinstance(model.criterion, LossFunctionRegistry[loss_function])
         for loss_function in LossFunctionRegistry.keys()
@@ -232,13 +318,12 @@ def make_prediction_for_models(
         weight_col=None,
         bounded=bounded,
     )
-    format_kwargs["target_cols"] = output_columns if args.evaluation_methods is not None else []
-    test_loader = prepare_data_loader(args, multicomponent, False, format_kwargs)
-    logger.info(f"test size: {len(test_loader.dataset)}")
     if args.cal_path is not None:
-        format_kwargs["target_cols"] = output_columns
-        cal_loader = prepare_data_loader(args, multicomponent, True, format_kwargs)
+        cal_loader = prepare_data_loader(
+            args, multicomponent, True, format_kwargs | dict(target_cols=output_columns)
+        )
         logger.info(f"calibration size: {len(cal_loader.dataset)}")
+    format_kwargs["target_cols"] = output_columns if args.evaluation_methods is not None else []
 
     uncertainty_estimator = Factory.build(
         UncertaintyEstimatorRegistry[args.uncertainty_method],
@@ -246,115 +331,310 @@ def make_prediction_for_models(
         dropout=args.uncertainty_dropout_p,
     )
 
-    models = [load_model(model_path, multicomponent) for model_path in model_paths]
     trainer = pl.Trainer(
-        logger=False, enable_progress_bar=True, accelerator=args.accelerator, devices=args.devices
+        logger=False,
+        enable_progress_bar=True,
+        accelerator=args.accelerator,
+        devices=args.devices,
+        callbacks=[ProfilingCallback()] if args.profile else None,
     )
-    test_individual_preds, test_individual_uncs = uncertainty_estimator(
-        test_loader, models, trainer
+
+    estimate = make_estimate_fn(args, uncertainty_estimator, models, trainer, model_paths, cache)
+    uncertainty_calibrator = (
+        fit_calibrator(args, cal_loader, estimate) if args.calibration_method is not None else None
     )
-    test_preds = torch.mean(test_individual_preds, dim=0)
-    if not isinstance(uncertainty_estimator, NoUncertaintyEstimator):
-        test_uncs = torch.mean(test_individual_uncs, dim=0)
-    else:
-        test_uncs = None
 
-    if args.calibration_method is not None:
-        uncertainty_calibrator = Factory.build(
-            UncertaintyCalibratorRegistry[args.calibration_method],
-            p=args.calibration_interval_percentile / 100,
-            alpha=args.conformal_alpha,
-        )
-        cal_targets = cal_loader.dataset.Y
-        cal_mask = torch.from_numpy(np.isfinite(cal_targets))
-        cal_targets = np.nan_to_num(cal_targets, nan=0.0)
-        cal_targets = torch.from_numpy(cal_targets)
-        cal_individual_preds, cal_individual_uncs = uncertainty_estimator(
-            cal_loader, models, trainer
+    # only the (averaged) predictions and uncertainties and the targets are kept for evaluation
+    test_predss, test_uncss, test_targetss = [], [], []
+    n_test = 0
+    individual_output_path = output_path.parent / Path(
+        str(args.output.stem) + "_individual" + str(output_path.suffix)
+    )
+    with (
+        PredictionWriter(output_path) as writer,
+        (
+            PredictionWriter(individual_output_path) if len(model_paths) > 1 else nullcontext()
+        ) as individual_writer,
+    ):
+        for chunk_loader, df_test in iter_test_chunks(args, multicomponent, format_kwargs):
+            test_preds, test_uncs, test_individual_preds, test_individual_uncs = predict_chunk(
+                chunk_loader, estimate, uncertainty_estimator, uncertainty_calibrator
+            )
+            n_test += len(df_test)
+
+            if args.evaluation_methods is not None:
+                test_predss.append(test_preds)
+                test_uncss.append(test_uncs)
+                test_targetss.append(chunk_loader.dataset.Y)
+
+            if args.uncertainty_method == "none" and (
+                isinstance(model.predictor, MveFFN) or isinstance(model.predictor, EvidentialFFN)
+            ):
+                test_preds = test_preds[..., 0]
+                test_individual_preds = test_individual_preds[..., 0]
+
+            if output_columns is None:
+                output_columns = [
+                    f"pred_{i}" for i in range(test_preds.shape[1])
+                ]  # TODO: need to improve this for cases like multi-task MVE and multi-task multiclass
+
+            save_predictions(args, model, output_columns, test_preds, test_uncs, df_test, writer)
+
+            if individual_writer is not None:
+                save_individual_predictions(
+                    args,
+                    model,
+                    model_paths,
+                    output_columns,
+                    test_individual_preds,
+                    test_individual_uncs,
+                    df_test,
+                    individual_writer,
+                )
+
+    logger.info(f"test size: {n_test}")
+    logger.info(f"Predictions saved to '{output_path}'")
+    if cache is not None:
+        logger.info(
+            f"Prediction cache: {cache.n_hits} hits, {cache.n_misses} misses ({len(cache)} cached)"
         )
-        cal_preds = torch.mean(cal_individual_preds, dim=0)
-        cal_uncs = torch.mean(cal_individual_uncs, dim=0)
-        if isinstance(uncertainty_calibrator, MVEWeightingCalibrator):
-            uncertainty_calibrator.fit(cal_preds, cal_individual_uncs, cal_targets, cal_mask)
-            test_uncs = uncertainty_calibrator.apply(cal_individual_uncs)
-        else:
-            if isinstance(uncertainty_calibrator, RegressionCalibrator):
-                uncertainty_calibrator.fit(cal_preds, cal_uncs, cal_targets, cal_mask)
-            else:
-                uncertainty_calibrator.fit(cal_uncs, cal_targets, cal_mask)
-            test_uncs = uncertainty_calibrator.apply(test_uncs)
-            for i in range(test_individual_uncs.shape[0]):
-                test_individual_uncs[i] = uncertainty_calibrator.apply(test_individual_uncs[i])
+    if len(model_paths) > 1:
+        logger.info(f"Individual predictions saved to '{individual_output_path}'")
+        for i, model_path in enumerate(model_paths):
+            logger.info(
+                f"Results from model path {model_path} are saved under the column name ending with 'model_{i}'"
+            )
 
     if args.evaluation_methods is not None:
+        test_preds = torch.cat(test_predss)
+        test_uncs = torch.cat(test_uncss) if test_uncss[0] is not None else None
+        test_targets = np.concatenate(test_targetss)
         uncertainty_evaluators = [
             Factory.build(UncertaintyEvaluatorRegistry[method])
             for method in args.evaluation_methods
         ]
         logger.info("Uncertainty evaluation metric:")
+        test_mask = torch.from_numpy(np.isfinite(test_targets))
+        test_targets = torch.from_numpy(np.nan_to_num(test_targets, nan=0.0))
         for evaluator in uncertainty_evaluators:
-            test_targets = test_loader.dataset.Y
-            test_mask = torch.from_numpy(np.isfinite(test_targets))
-            test_targets = np.nan_to_num(test_targets, nan=0.0)
-            test_targets = torch.from_numpy(test_targets)
             if isinstance(evaluator, RegressionEvaluator):
                 metric_value = evaluator.evaluate(test_preds, test_uncs, test_targets, test_mask)
             else:
                 metric_value = evaluator.evaluate(test_uncs, test_targets, test_mask)
             logger.info(f"{evaluator.alias}: {metric_value.tolist()}")
 
-    if args.uncertainty_method == "none" and (
-        isinstance(model.predictor, MveFFN) or isinstance(model.predictor, EvidentialFFN)
-    ):
-        test_preds = test_preds[..., 0]
-        test_individual_preds = test_individual_preds[..., 0]
 
-    if output_columns is None:
-        output_columns = [
-            f"pred_{i}" for i in range(test_preds.shape[1])
-        ]  # TODO: need to improve this for cases like multi-task MVE and multi-task multiclass
+def make_estimate_fn(
+    args: Namespace,
+    uncertainty_estimator: UncertaintyEstimator,
+    models: Sequence[MPNN],
+    trainer: pl.Trainer,
+    model_paths: Sequence[Path],
+    cache: PredictionCache | None = None,
+) -> Callable[[DataLoader], tuple[Tensor, Tensor | None]]:
+    """Make a function that estimates the individual predictions and uncertainties of the models
+    for a dataloader, reading and updating the prediction ``cache`` if one is given"""
+    if cache is None:
+        return lambda loader: uncertainty_estimator(loader, models, trainer)
+
+    digests = [file_digest(model_path) for model_path in model_paths]
+    context = (
+        f"keep_h={args.keep_h},add_h={args.add_h},rxn_mode={args.rxn_mode},"
+        f"atom_featurizer={args.multi_hot_atom_featurizer_mode},"
+        f"dropout_p={args.uncertainty_dropout_p},dropout_size={args.dropout_sampling_size}"
+    )
 
-    save_predictions(args, model, output_columns, test_preds, test_uncs, output_path)
+    return lambda loader: cache.estimate(
+        uncertainty_estimator, loader, models, trainer, digests, context
+    )
 
-    if len(model_paths) > 1:
-        save_individual_predictions(
-            args,
-            model,
-            model_paths,
-            output_columns,
-            test_individual_preds,
-            test_individual_uncs,
-            output_path,
+
+def fit_calibrator(
+    args: Namespace,
+    cal_loader: DataLoader,
+    estimate: Callable[[DataLoader], tuple[Tensor, Tensor | None]],
+) -> CalibratorBase:
+    """Build the uncertainty calibrator specified by ``args`` and fit it to the calibration set"""
+    uncertainty_calibrator = Factory.build(
+        UncertaintyCalibratorRegistry[args.calibration_method],
+        p=args.calibration_interval_percentile / 100,
+        alpha=args.conformal_alpha,
+    )
+    cal_targets = cal_loader.dataset.Y
+    cal_mask = torch.from_numpy(np.isfinite(cal_targets))
+    cal_targets = np.nan_to_num(cal_targets, nan=0.0)
+    cal_targets = torch.from_numpy(cal_targets)
+    cal_individual_preds, cal_individual_uncs = estimate(cal_loader)
+    cal_preds = torch.mean(cal_individual_preds, dim=0)
+    cal_uncs = torch.mean(cal_individual_uncs, dim=0)
+    if isinstance(uncertainty_calibrator, MVEWeightingCalibrator):
+        uncertainty_calibrator.fit(cal_preds, cal_individual_uncs, cal_targets, cal_mask)
+    elif isinstance(uncertainty_calibrator, RegressionCalibrator):
+        uncertainty_calibrator.fit(cal_preds, cal_uncs, cal_targets, cal_mask)
+    else:
+        uncertainty_calibrator.fit(cal_uncs, cal_targets, cal_mask)
+
+    return uncertainty_calibrator
+
+
+def predict_chunk(
+    chunk_loader: DataLoader,
+    estimate: Callable[[DataLoader], tuple[Tensor, Tensor | None]],
+    uncertainty_estimator: UncertaintyEstimator,
+    uncertainty_calibrator: CalibratorBase | None,
+) -> tuple[Tensor, Tensor | None, Tensor, Tensor | None]:
+    """Predict a chunk of the test set and calibrate its uncertainties
+
+    Returns
+    -------
+    tuple[Tensor, Tensor | None, Tensor, Tensor | None]
+        the averaged predictions and uncertainties and the individual predictions and
+        uncertainties of the models
+    """
+    test_individual_preds, test_individual_uncs = estimate(chunk_loader)
+    test_preds = torch.mean(test_individual_preds, dim=0)
+    if not isinstance(uncertainty_estimator, NoUncertaintyEstimator):
+        test_uncs = torch.mean(test_individual_uncs, dim=0)
+    else:
+        test_uncs = None
+
+    if isinstance(uncertainty_calibrator, MVEWeightingCalibrator):
+        test_uncs = uncertainty_calibrator.apply(test_individual_uncs)
+    elif uncertainty_calibrator is not None:
+        test_uncs = uncertainty_calibrator.apply(test_uncs)
+        for j in range(test_individual_uncs.shape[0]):
+            test_individual_uncs[j] = uncertainty_calibrator.apply(test_individual_uncs[j])
+
+    return test_preds, test_uncs, test_individual_preds, test_individual_uncs
+
+
+def iter_test_chunks(
+    args: Namespace, multicomponent: bool, format_kwargs: dict
+) -> Iterator[tuple[DataLoader, pd.DataFrame]]:
+    """Yield a dataloader over the datapoints of each chunk of ``args.chunk_size`` rows of the test
+    data file and the rows to which their predictions are added, or a single dataloader over the
+    whole file if no chunk size is specified.
+
+    The datapoints are built from each chunk as it is read, so only those of the current chunk are
+    held in memory. If ``args.drop_extra_columns`` is ``True``, only the SMILES columns of the rows
+    are kept."""
+    featurization_kwargs = dict(
+        molecule_featurizers=args.molecule_featurizers,
+        keep_h=args.keep_h,
+        add_h=args.add_h,
+        lazy=args.lazy_mols,
+    )
+    # the extra descriptors are stored in a single array, so they are loaded once and sliced
+    X_d = load_input_feats_and_descs(args.descriptors_path, None, None, feat_desc="X_d")
+    input_cols = (args.smiles_columns or []) + (args.reaction_columns or [])
+
+    start = 0
+    for df in read_test_chunks(args):
+        idxs = range(start, start + len(df))
+        start += len(df)
+
+        smiss, rxnss, Y, weights, lt_mask, gt_mask = parse_df(
+            df,
+            format_kwargs["smiles_cols"],
+            format_kwargs["rxn_cols"],
+            format_kwargs["target_cols"],
+            format_kwargs["ignore_cols"],
+            format_kwargs["splits_col"],
+            format_kwargs["weight_col"],
+            format_kwargs["bounded"],
         )
+        n_molecules = len(smiss) if smiss is not None else 0
+        V_fss, E_fss, V_dss = (
+            load_input_feats_and_descs(paths, n_molecules, len(df), feat_desc, idxs)
+            for paths, feat_desc in [
+                (args.atom_features_path, "V_f"),
+                (args.bond_features_path, "E_f"),
+                (args.atom_descriptors_path, "V_d"),
+            ]
+        )
+        mol_data, rxn_data = make_datapoints(
+            smiss,
+            rxnss,
+            Y,
+            weights,
+            lt_mask,
+            gt_mask,
+            X_d[idxs] if X_d is not None else None,
+            V_fss,
+            E_fss,
+            V_dss,
+            **featurization_kwargs,
+        )
+
+        dsets = [
+            make_dataset(d, args.rxn_mode, args.multi_hot_atom_featurizer_mode)
+            for d in mol_data + rxn_data
+        ]
+        dset = data.MulticomponentDataset(dsets) if multicomponent else dsets[0]
+        loader = data.build_dataloader(
+            dset, args.batch_size, args.num_workers, shuffle=False, pin_memory=args.pin_memory
+        )
+
+        if args.drop_extra_columns:
+            df = df[input_cols] if input_cols else df.iloc[:, [0]]
+
+        yield loader, df
+
+
+def read_test_chunks(args: Namespace) -> Iterator[pd.DataFrame]:
+    """Yield each chunk of ``args.chunk_size`` rows of the test data file, or the whole file if no
+    chunk size is specified"""
+    kwargs = dict(header=None if args.no_header_row else "infer", index_col=False)
+
+    if args.chunk_size is None:
+        yield pd.read_csv(args.test_path, **kwargs)
+        return
+
+    with pd.read_csv(args.test_path, chunksize=args.chunk_size, **kwargs) as reader:
+        yield from reader
+
 
+def format_class_predictions(
+    preds: np.ndarray, columns: list[str], probability_format: str = "string", suffix: str = ""
+) -> dict[str, ArrayLike]:
+    """Format the predicted class probabilities of shape ``n x t x c`` as the columns of the
+    predicted class labels and the class probabilities of each task (see
+    ``--class-probability-format``), with ``suffix`` appended to each column name"""
+    preds = np.asarray(preds)
+    n, t, c = preds.shape
+    if probability_format == "string":
+        # format all probabilities at once, then join the probabilities of each datapoint and task
+        prob_strs = preds.astype(str).reshape(-1, c).tolist()
+        prob_strs = np.array([",".join(probs) for probs in prob_strs], dtype=object).reshape(n, t)
 
-def save_predictions(args, model, output_columns, test_preds, test_uncs, output_path):
+    label_cols, prob_cols = {}, {}
+    for j, col in enumerate(columns):
+        label_cols[f"{col}{suffix}"] = preds[:, j].argmax(-1)
+        match probability_format:
+            case "string":
+                prob_cols[f"{col}_prob{suffix}"] = prob_strs[:, j]
+            case "list":
+                prob_cols[f"{col}_prob{suffix}"] = list(preds[:, j])
+            case "columns":
+                prob_cols |= {f"{col}_prob_{k}{suffix}": preds[:, j, k] for k in range(c)}
+
+    return label_cols | prob_cols
+
+
+def save_predictions(args, model, output_columns, test_preds, test_uncs, df_test, writer):
     unc_columns = [f"{col}_unc" for col in output_columns]
 
     if isinstance(model.predictor, MulticlassClassificationFFN):
-        output_columns = output_columns + [f"{col}_prob" for col in output_columns]
-        predicted_class_labels = test_preds.argmax(axis=-1)
-        formatted_probability_strings = np.apply_along_axis(
-            lambda x: ",".join(map(str, x)), 2, test_preds
+        df_test = df_test.assign(
+            **format_class_predictions(test_preds, output_columns, args.class_probability_format)
         )
-        test_preds = np.concatenate(
-            (predicted_class_labels, formatted_probability_strings), axis=-1
-        )
-
-    df_test = pd.read_csv(
-        args.test_path, header=None if args.no_header_row else "infer", index_col=False
-    )
-    df_test[output_columns] = test_preds
+    else:
+        df_test[output_columns] = test_preds
 
     if args.uncertainty_method not in ["none", "classification"]:
         df_test[unc_columns] = np.round(test_uncs, 6)
 
-    if output_path.suffix == ".pkl":
-        df_test = df_test.reset_index(drop=True)
-        df_test.to_pickle(output_path)
-    else:
-        df_test.to_csv(output_path, index=False)
-    logger.info(f"Predictions saved to '{output_path}'")
+    writer.write(df_test)
 
 
 def save_individual_predictions(
@@ -364,57 +644,86 @@ def save_individual_predictions(
     output_columns,
     test_individual_preds,
     test_individual_uncs,
-    output_path,
+    df_test,
+    writer,
 ):
     unc_columns = [
         f"{col}_unc_model_{i}" for i in range(len(model_paths)) for col in output_columns
     ]
 
     if isinstance(model.predictor, MulticlassClassificationFFN):
-        output_columns = [
-            item
-            for i in range(len(model_paths))
-            for col in output_columns
-            for item in (f"{col}_model_{i}", f"{col}_prob_model_{i}")
-        ]
-
-        predicted_class_labels = test_individual_preds.argmax(axis=-1)
-        formatted_probability_strings = np.apply_along_axis(
-            lambda x: ",".join(map(str, x)), 3, test_individual_preds
-        )
-        test_individual_preds = np.concatenate(
-            (predicted_class_labels, formatted_probability_strings), axis=-1
-        )
+        for i, test_preds in enumerate(test_individual_preds):
+            df_test = df_test.assign(
+                **format_class_predictions(
+                    test_preds, output_columns, args.class_probability_format, f"_model_{i}"
+                )
+            )
     else:
         output_columns = [
             f"{col}_model_{i}" for i in range(len(model_paths)) for col in output_columns
         ]
-
-    m, n, t = test_individual_preds.shape
-    test_individual_preds = np.transpose(test_individual_preds, (1, 0, 2)).reshape(n, m * t)
-    df_test = pd.read_csv(
-        args.test_path, header=None if args.no_header_row else "infer", index_col=False
-    )
-    df_test[output_columns] = test_individual_preds
+        m, n, t = test_individual_preds.shape
+        test_individual_preds = np.transpose(test_individual_preds, (1, 0, 2)).reshape(n, m * t)
+        df_test[output_columns] = test_individual_preds
 
     if args.uncertainty_method not in ["none", "classification", "ensemble"]:
         m, n, t = test_individual_uncs.shape
         test_individual_uncs = np.transpose(test_individual_uncs, (1, 0, 2)).reshape(n, m * t)
         df_test[unc_columns] = np.round(test_individual_uncs, 6)
 
-    output_path = output_path.parent / Path(
-        str(args.output.stem) + "_individual" + str(output_path.suffix)
-    )
-    if output_path.suffix == ".pkl":
-        df_test = df_test.reset_index(drop=True)
-        df_test.to_pickle(output_path)
-    else:
-        df_test.to_csv(output_path, index=False)
-    logger.info(f"Individual predictions saved to '{output_path}'")
-    for i, model_path in enumerate(model_paths):
-        logger.info(
-            f"Results from model path {model_path} are saved under the column name ending with 'model_{i}'"
-        )
+    writer.write(df_test)
+
+
+class PredictionWriter:
+    """Write the predictions of each chunk of the test data to a CSV, Pickle, or Parquet file.
+
+    The predictions of every chunk after the first are appended to those already written, so only
+    one chunk may be written to a Pickle file.
+
+    Parameters
+    ----------
+    output_path : Path
+        the path to which to write the predictions. Its suffix determines the file format.
+    """
+
+    def __init__(self, output_path: Path):
+        self.output_path = output_path
+        self.n_chunks = 0
+        self._parquet_writer = None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, df: pd.DataFrame):
+        match self.output_path.suffix:
+            case ".pkl":
+                if self.n_chunks > 0:
+                    raise ValueError("Only a single chunk of predictions can be saved to a pickle!")
+                df.reset_index(drop=True).to_pickle(self.output_path)
+            case ".parquet":
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if self._parquet_writer is None:
+                    self._parquet_writer = pq.ParquetWriter(self.output_path, table.schema)
+                else:
+                    table = table.cast(self._parquet_writer.schema)
+                self._parquet_writer.write_table(table)
+            case _:
+                df.to_csv(
+                    self.output_path,
+                    mode="a" if self.n_chunks > 0 else "w",
+                    header=self.n_chunks == 0,
+                    index=False,
+                )
+
+        self.n_chunks += 1
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
 
 
 def main(args):
@@ -432,7 +741,18 @@ def main(args):
 
     model_paths = find_models(args.model_paths)
 
-    make_prediction_for_models(args, model_paths, multicomponent, output_path=args.output)
+    with profile() if args.profile else nullcontext() as profiler, (
+        PredictionCache(args.prediction_cache, args.prediction_cache_size)
+        if args.prediction_cache is not None
+        else nullcontext()
+    ) as cache:
+        make_prediction_for_models(
+            args, model_paths, multicomponent, output_path=args.output, cache=cache
+        )
+
+    if profiler is not None:
+        logger.info(f"Profile:\n{profiler.summary().to_string(index=False)}")
+        profiler.save(args.output.parent)
 
 
 if __name__ == "__main__":
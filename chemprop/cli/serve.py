@@ -0,0 +1,440 @@
+from argparse import ArgumentError, ArgumentParser, Namespace
+from collections import OrderedDict
+from dataclasses import asdict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+from pathlib import Path
+import socketserver
+import sys
+import threading
+from typing import Any, Self, Sequence
+
+import numpy as np
+import torch
+
+from chemprop import data
+from chemprop.cli.common import find_models
+from chemprop.cli.utils import LookupAction, Subcommand
+from chemprop.cli.utils.args import uppercase
+from chemprop.featurizers import (
+    AtomFeatureMode,
+    MoleculeFeaturizerRegistry,
+    SimpleMoleculeMolGraphFeaturizer,
+    get_multi_hot_atom_featurizer,
+)
+from chemprop.models import MPNN, MicroBatcher
+from chemprop.models.utils import load_model_with_metadata
+from chemprop.nn.predictors import EvidentialFFN, MveFFN
+from chemprop.utils import make_mol
+
+logger = logging.getLogger(__name__)
+
+
+class ServeSubcommand(Subcommand):
+    COMMAND = "serve"
+    HELP = "serve the predictions of pretrained chemprop models over a local HTTP API"
+
+    @classmethod
+    def add_args(cls, parser: ArgumentParser) -> ArgumentParser:
+        return add_serve_args(parser)
+
+    @classmethod
+    def func(cls, args: Namespace):
+        args = process_serve_args(args)
+        main(args)
+
+
+def add_serve_args(parser: ArgumentParser) -> ArgumentParser:
+    parser.add_argument(
+        "--model-paths",
+        "--model-path",
+        required=True,
+        type=Path,
+        nargs="+",
+        help="Location of checkpoint(s) or model file(s) to serve. It can be a path to either a single pretrained model checkpoint (.ckpt) or single pretrained model file (.pt or .safetensors), a directory that contains these files, or a list of path(s) and directory(s). If a directory, will recursively search and serve all found (.pt and .safetensors) models. The averaged predictions of all models are served.",
+    )
+
+    server_args = parser.add_argument_group("Server args")
+    server_args.add_argument(
+        "--host", default="127.0.0.1", help="The host on which to listen for HTTP requests"
+    )
+    server_args.add_argument(
+        "--port", type=int, default=8000, help="The port on which to listen for HTTP requests"
+    )
+    server_args.add_argument(
+        "--socket",
+        type=Path,
+        help="The path of a Unix domain socket on which to listen for HTTP requests instead of ``--host`` and ``--port``",
+    )
+    server_args.add_argument(
+        "--max-batch-size",
+        type=int,
+        default=256,
+        help="The maximum number of molecules of concurrent requests to predict in a single batch",
+    )
+    server_args.add_argument(
+        "--max-atoms",
+        type=int,
+        help="The maximum total number of atoms of concurrent requests to predict in a single batch. By default, only the number of molecules is bounded.",
+    )
+    server_args.add_argument(
+        "--max-latency",
+        type=float,
+        default=5.0,
+        help="The maximum time in milliseconds to wait for further requests to fill a batch after receiving a request",
+    )
+    server_args.add_argument(
+        "--cache-size",
+        type=int,
+        default=10000,
+        help="The number of the most recently predicted SMILES whose predictions are cached. A cache size of 0 disables the cache.",
+    )
+    server_args.add_argument(
+        "--device",
+        default="cpu",
+        help="The device on which to run the models (e.g., 'cpu' or 'cuda:0')",
+    )
+
+    featurization_args = parser.add_argument_group("Featurization args")
+    featurization_args.add_argument(
+        "--multi-hot-atom-featurizer-mode",
+        type=uppercase,
+        default="V2",
+        choices=list(AtomFeatureMode.keys()),
+        help="The multi-hot atom featurization scheme with which the models were trained (case insensitive)",
+    )
+    featurization_args.add_argument(
+        "--keep-h",
+        action="store_true",
+        help="Whether hydrogens explicitly specified in input should be kept in the mol graph",
+    )
+    featurization_args.add_argument(
+        "--add-h", action="store_true", help="Whether hydrogens should be added to the mol graph"
+    )
+    featurization_args.add_argument(
+        "--molecule-featurizers",
+        "--features-generators",
+        nargs="+",
+        action=LookupAction(MoleculeFeaturizerRegistry),
+        help="Method(s) of generating molecule features to use as extra descriptors",
+    )
+
+    return parser
+
+
+def process_serve_args(args: Namespace) -> Namespace:
+    if args.max_batch_size < 1:
+        raise ArgumentError(
+            argument=None, message=f"'--max-batch-size' must be positive. Got {args.max_batch_size}"
+        )
+    if args.max_atoms is not None and args.max_atoms < 1:
+        raise ArgumentError(
+            argument=None, message=f"'--max-atoms' must be positive. Got {args.max_atoms}"
+        )
+    if args.max_latency < 0:
+        raise ArgumentError(
+            argument=None, message=f"'--max-latency' must be non-negative. Got {args.max_latency}"
+        )
+    if args.cache_size < 0:
+        raise ArgumentError(
+            argument=None, message=f"'--cache-size' must be non-negative. Got {args.cache_size}"
+        )
+
+    return args
+
+
+class PredictionService:
+    """Predict the properties of molecules given as SMILES with models that are loaded once.
+
+    Requests made concurrently (e.g., by the threads of a :class:`ThreadingHTTPServer`) are
+    coalesced into batches by a :class:`~chemprop.models.MicroBatcher`, and the predictions of the
+    most recently predicted SMILES are cached.
+
+    Parameters
+    ----------
+    models : Sequence[MPNN]
+        the models whose averaged predictions are served. Only single-component molecule models are
+        supported.
+    output_columns : list[str]
+        the names of the predicted tasks
+    keep_h : bool, default=False
+        whether hydrogens explicitly specified in the SMILES should be kept
+    add_h : bool, default=False
+        whether hydrogens should be added to the molecules
+    molecule_featurizers : Sequence[str] | None, default=None
+        the names of the molecule featurizers with which to calculate extra descriptors
+    multi_hot_atom_featurizer_mode : str, default="V2"
+        the multi-hot atom featurization scheme with which the models were trained
+    max_batch_size : int, default=256
+        the maximum number of molecules to predict at once
+    max_atoms : int | None, default=None
+        the maximum total number of atoms to predict at once
+    max_latency : float, default=0.005
+        the maximum time in seconds to wait for further requests to fill a batch
+    cache_size : int, default=10000
+        the number of the most recently predicted SMILES whose predictions are cached
+    device : str | torch.device, default="cpu"
+        the device on which to run the models
+    """
+
+    def __init__(
+        self,
+        models: Sequence[MPNN],
+        output_columns: list[str],
+        keep_h: bool = False,
+        add_h: bool = False,
+        molecule_featurizers: Sequence[str] | None = None,
+        multi_hot_atom_featurizer_mode: str = "V2",
+        max_batch_size: int = 256,
+        max_atoms: int | None = None,
+        max_latency: float = 0.005,
+        cache_size: int = 10000,
+        device: str | torch.device = "cpu",
+    ):
+        self.output_columns = output_columns
+        self.keep_h = keep_h
+        self.add_h = add_h
+        self.molecule_featurizers = [
+            MoleculeFeaturizerRegistry[mf]() for mf in molecule_featurizers or []
+        ]
+        self.cache_size = cache_size
+        self.batcher = MicroBatcher(
+            models,
+            SimpleMoleculeMolGraphFeaturizer(
+                atom_featurizer=get_multi_hot_atom_featurizer(multi_hot_atom_featurizer_mode)
+            ),
+            max_batch_size,
+            max_atoms,
+            max_latency,
+            device,
+        )
+
+        self._cache: OrderedDict[str, list | None] = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @property
+    def models(self) -> list[MPNN]:
+        return self.batcher.models
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """Start the background thread that predicts the batches of requests"""
+        self.batcher.start()
+
+    def stop(self):
+        """Stop the background thread after the pending requests have been predicted"""
+        self.batcher.stop()
+
+    def predict(self, smis: Sequence[str]) -> list[list | None]:
+        """Predict the molecules given by ``smis``, blocking until their batch has been predicted.
+
+        Returns
+        -------
+        list[list | None]
+            the (nested) list of predictions of each molecule, of shape ``t`` or ``t x c`` for
+            multiclass models, or ``None`` if its SMILES is invalid
+        """
+        preds = dict(self._lookup(smis))
+        misses = list(dict.fromkeys(smi for smi in smis if smi not in preds))
+
+        if len(misses) > 0:
+            miss_preds = self._predict(misses)
+            self._store(misses, miss_preds)
+            preds.update(zip(misses, miss_preds))
+
+        return [preds[smi] for smi in smis]
+
+    def _lookup(self, smis: Sequence[str]) -> list[tuple[str, list | None]]:
+        with self._cache_lock:
+            hits = [(smi, self._cache[smi]) for smi in smis if smi in self._cache]
+            for smi, _ in hits:
+                self._cache.move_to_end(smi)
+
+        return hits
+
+    def _store(self, smis: Sequence[str], preds: Sequence[list | None]):
+        if self.cache_size == 0:
+            return
+
+        with self._cache_lock:
+            self._cache.update(zip(smis, preds))
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _predict(self, smis: Sequence[str]) -> list[list | None]:
+        mols = []
+        for smi in smis:
+            try:
+                mols.append(make_mol(smi, self.keep_h, self.add_h))
+            except RuntimeError:
+                logger.warning(f"Invalid SMILES: {smi}")
+                mols.append(None)
+
+        dps = [
+            data.MoleculeDatapoint(
+                mol,
+                x_d=(
+                    np.hstack([mf(mol) for mf in self.molecule_featurizers])
+                    if self.molecule_featurizers
+                    else None
+                ),
+            )
+            for mol in mols
+            if mol is not None
+        ]
+        if len(dps) == 0:
+            return [None] * len(smis)
+
+        preds = self.batcher.predict(dps)
+        if isinstance(self.models[0].predictor, (MveFFN, EvidentialFFN)):
+            preds = preds[..., 0]
+
+        valid_preds = iter(preds.tolist())
+
+        return [next(valid_preds) if mol is not None else None for mol in mols]
+
+
+class PredictionRequestHandler(BaseHTTPRequestHandler):
+    """Handle the requests of the HTTP API of a :class:`PredictionService`:
+
+    * ``GET /health`` returns the names of the predicted tasks, the number of models, and the
+      latency statistics of the recent requests (see :class:`~chemprop.models.LatencyStats`)
+    * ``POST /predict`` with the JSON body ``{"smiles": [...]}`` returns
+      ``{"columns": [...], "predictions": [...]}``, where the prediction of each SMILES is
+      ``null`` if it is invalid
+    """
+
+    server_version = "chemprop"
+
+    def do_GET(self):
+        if self.path != "/health":
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        service: PredictionService = self.server.service
+        self._send_json(
+            {
+                "status": "ok",
+                "columns": service.output_columns,
+                "n_models": len(service.models),
+                "latency": asdict(service.batcher.latency_stats()),
+            }
+        )
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            smis = body["smiles"]
+            if not (isinstance(smis, list) and all(isinstance(smi, str) for smi in smis)):
+                raise TypeError
+        except (ValueError, KeyError, TypeError):
+            self.send_error(
+                HTTPStatus.BAD_REQUEST, 'Expected a JSON body of the form {"smiles": [...]}'
+            )
+            return
+
+        service: PredictionService = self.server.service
+        try:
+            preds = service.predict(smis)
+        except Exception:
+            logger.exception("Failed to predict a request")
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR)
+            return
+
+        self._send_json({"columns": service.output_columns, "predictions": preds})
+
+    def _send_json(self, obj: Any):
+        body = json.dumps(obj).encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args):
+        logger.debug(format % args)
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """A :class:`ThreadingHTTPServer` listening on a Unix domain socket"""
+
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = str(self.server_address), 0
+
+
+def build_server(
+    service: PredictionService,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    socket_path: Path | None = None,
+) -> socketserver.BaseServer:
+    """Build an HTTP server for the :class:`PredictionService`, listening on ``socket_path`` if
+    given and otherwise on ``host`` and ``port``"""
+    if socket_path is not None:
+        server = ThreadingUnixHTTPServer(str(socket_path), PredictionRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), PredictionRequestHandler)
+    server.service = service
+
+    return server
+
+
+def main(args: Namespace):
+    model_paths = find_models(args.model_paths)
+    models, metadatas = zip(
+        *[load_model_with_metadata(path, False, mmap=True) for path in model_paths]
+    )
+    output_columns = metadatas[0].get("output_columns")
+    if output_columns is None:
+        output_columns = [f"pred_{i}" for i in range(models[0].predictor.n_tasks)]
+
+    service = PredictionService(
+        models,
+        output_columns,
+        keep_h=args.keep_h,
+        add_h=args.add_h,
+        molecule_featurizers=args.molecule_featurizers,
+        multi_hot_atom_featurizer_mode=args.multi_hot_atom_featurizer_mode,
+        max_batch_size=args.max_batch_size,
+        max_atoms=args.max_atoms,
+        max_latency=args.max_latency / 1000,
+        cache_size=args.cache_size,
+        device=args.device,
+    )
+    server = build_server(service, args.host, args.port, args.socket)
+
+    with service:
+        address = args.socket if args.socket is not None else f"http://{args.host}:{args.port}"
+        logger.info(f"Serving the predictions of {len(models)} model(s) on {address}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if args.socket is not None:
+                args.socket.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser = ServeSubcommand.add_args(parser)
+
+    logging.basicConfig(stream=sys.stdout, level=logging.DEBUG, force=True)
+    args = parser.parse_args()
+    ServeSubcommand.func(args)
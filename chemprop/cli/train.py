@@ -1,8 +1,12 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
 from copy import deepcopy
 from io import StringIO
 import json
 import logging
+import multiprocessing
 from pathlib import Path
+import pickle
 import sys
 from tempfile import TemporaryDirectory
 
@@ -34,18 +38,28 @@ from chemprop.cli.utils import (
     parse_indices,
 )
 from chemprop.cli.utils.args import uppercase
+from chemprop.cli.utils.parallel import (
+    available_cpus,
+    init_worker_process,
+    load_packed_dataset,
+    make_core_sets,
+    save_packed_dataset,
+)
 from chemprop.data import (
-    MoleculeDataset,
+    BatchReplayLoader,
     MolGraphDataset,
     MulticomponentDataset,
     ReactionDatapoint,
     SplitType,
     build_dataloader,
     make_split_indices,
+    pack_dataset,
     split_data_by_indices,
+    split_dataset_by_indices,
 )
 from chemprop.data.datasets import _MolGraphDatasetMixin
-from chemprop.models import MPNN, MulticomponentMPNN, save_model
+from chemprop.models import MPNN, EnsembleCheckpoint, EnsembleMPNN, MulticomponentMPNN, save_model
+from chemprop.models.serialization import NO_SAFETENSORS
 from chemprop.nn import AggregationRegistry, LossFunctionRegistry, MetricRegistry, PredictorRegistry
 from chemprop.nn.message_passing import (
     AtomMessagePassing,
@@ -54,7 +68,7 @@ from chemprop.nn.message_passing import (
 )
 from chemprop.nn.transforms import GraphTransform, ScaleTransform, UnscaleTransform
 from chemprop.nn.utils import Activation
-from chemprop.utils import Factory
+from chemprop.utils import Factory, ProfilingCallback, profile
 
 logger = logging.getLogger(__name__)
 
@@ -114,6 +128,17 @@ def add_train_args(parser: ArgumentParser) -> ArgumentParser:
         action="store_true",
         help="Remove intermediate checkpoint files after training is complete.",
     )
+    parser.add_argument(
+        "--model-format",
+        default="pt",
+        choices=["pt", "safetensors"],
+        help="File format of the best model of each replicate (``best.pt`` or ``best.safetensors``). Safetensors files store the hyperparameters as JSON instead of a pickle and are memory-mapped when loaded, but require ``safetensors`` to be installed.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the wall time, throughput (molecules/s and atoms/s), and peak memory of each stage of featurization, collation, host-device transfer, message passing, aggregation, the FFN, and the backward pass, and save a summary to ``profile_summary.csv`` and a Chrome trace to ``profile_trace.json`` in the output directory. With ``--parallel-jobs``, the stages of each job are saved to its model directory instead. Stages run by dataloader workers (``--num-workers`` > 0) are not profiled.",
+    )
 
     # TODO: Add in v2.1; see if we can tell lightning how often to log training loss
     # parser.add_argument(
@@ -167,6 +192,22 @@ def add_train_args(parser: ArgumentParser) -> ArgumentParser:
         default=1,
         help="Number of models in ensemble for each splitting of data",
     )
+    parser.add_argument(
+        "--joint-ensemble",
+        action="store_true",
+        help="Train all models of the ensemble together in a single trainer on the same batches, so that each batch is loaded, collated, and moved to the device once rather than once per model. Each model keeps its own seed, optimizer, learning rate schedule, early stopping, and checkpoints.",
+    )
+    parser.add_argument(
+        "--parallel-jobs",
+        type=int,
+        default=1,
+        help="Number of models to train concurrently, each in its own worker process pinned to its own set of CPU cores. Jobs span all replicates and ensemble members (or, with ``--joint-ensemble``, whole ensembles). The featurized training and validation data of each replicate are shared read-only between the workers through memory-mapped files.",
+    )
+    parser.add_argument(
+        "--threads-per-job",
+        type=int,
+        help="Number of CPU cores to which each parallel job is pinned and number of threads it uses (defaults to the number of available cores divided by ``--parallel-jobs``)",
+    )
 
     # TODO: Add in v2.2
     # abt_args = parser.add_argument_group("atom/bond target args")
@@ -323,6 +364,16 @@ def add_train_args(parser: ArgumentParser) -> ArgumentParser:
         action="store_true",
         help="Turn off caching the featurized ``MolGraph`` s at the beginning of training",
     )
+    train_data_args.add_argument(
+        "--cache-budget",
+        type=float,
+        help="Instead of caching all featurized ``MolGraph`` s at the beginning of training, cache them as they are requested up to this many megabytes per data loading process, evicting the least recently used ones first",
+    )
+    train_data_args.add_argument(
+        "--replay-eval-batches",
+        action="store_true",
+        help="Collate the validation and test batches once and replay them afterwards, rather than collating them again every epoch",
+    )
     train_data_args.add_argument(
         "--splits-column",
         help="Name of the column in the input CSV file containing 'train', 'val', or 'test' for each row.",
@@ -455,6 +506,11 @@ def add_train_args(parser: ArgumentParser) -> ArgumentParser:
         type=Path,
         help="Path to a JSON file containing pre-defined splits for the input data, formatted as a list of dictionaries with keys ``train``, ``val``, and ``test`` and values as lists of indices or formatted strings (e.g. [0, 1, 2, 4] or '0-2,4')",
     )
+    split_args.add_argument(
+        "--index-splits",
+        action="store_true",
+        help="Build a single dataset from the input data and represent each train/val/test split as a view of its indices, so that all splits and replicates share one featurization (and cache) of the data",
+    )
     split_args.add_argument(
         "--data-seed",
         type=int,
@@ -510,6 +566,11 @@ def validate_train_args(args):
             "Please use `--checkpoint` with `--freeze-encoder` instead."
         )
 
+    if args.model_format == "safetensors" and NO_SAFETENSORS:
+        raise ImportError(
+            "Saving models as safetensors files requires safetensors to be installed. Run 'pip install safetensors' to install it."
+        )
+
     if args.freeze_encoder and args.checkpoint is None:
         raise ArgumentError(
             argument=None,
@@ -528,6 +589,17 @@ def validate_train_args(args):
                 message="To freeze the first `n` layers of the FFN via `--frzn-ffn-layers`. The message passing layer should also be frozen with `--freeze-encoder`.",
             )
 
+    if args.parallel_jobs < 1:
+        raise ArgumentError(
+            argument=None, message=f"`--parallel-jobs` must be positive. Got {args.parallel_jobs}"
+        )
+
+    if args.parallel_jobs > 1 and args.devices not in ("auto", 1, "1"):
+        raise ArgumentError(
+            argument=None,
+            message="`--parallel-jobs` trains each model on a single device and cannot be used with multiple `--devices`.",
+        )
+
     if args.class_balance and args.task_type != "classification":
         raise ArgumentError(
             argument=None, message="Class balance is only applicable for classification tasks."
@@ -736,8 +808,8 @@ def save_smiles_splits(args: Namespace, output_dir, train_dset, val_dset, test_d
         df_test.to_csv(output_dir / "test_smiles.csv", index=False)
 
 
-def build_splits(args, format_kwargs, featurization_kwargs):
-    """build the train/val/test splits"""
+def build_split_indices(args, format_kwargs, featurization_kwargs):
+    """build the data and the train/val/test split indices of each replicate"""
     logger.info(f"Pulling data from file: {args.data_path}")
     all_data = build_data_from_files(
         args.data_path,
@@ -774,9 +846,22 @@ def build_splits(args, format_kwargs, featurization_kwargs):
         else:
             splitting_mols = [datapoint.mol for datapoint in splitting_data]
         train_indices, val_indices, test_indices = make_split_indices(
-            splitting_mols, args.split, args.split_sizes, args.data_seed, args.num_replicates
+            splitting_mols,
+            args.split,
+            args.split_sizes,
+            args.data_seed,
+            args.num_replicates,
+            num_workers=args.num_workers,
         )
 
+    return all_data, train_indices, val_indices, test_indices
+
+
+def build_splits(args, format_kwargs, featurization_kwargs):
+    """build the train/val/test splits"""
+    all_data, train_indices, val_indices, test_indices = build_split_indices(
+        args, format_kwargs, featurization_kwargs
+    )
     train_data, val_data, test_data = split_data_by_indices(
         all_data, train_indices, val_indices, test_indices
     )
@@ -902,17 +987,49 @@ def build_datasets(args, train_data, val_data, test_data):
             test_dset = make_dataset(test_data, args.rxn_mode, args.multi_hot_atom_featurizer_mode)
         else:
             test_dset = None
-    if args.task_type != "spectral":
-        for dataset, label in zip(
-            [train_dset, val_dset, test_dset], ["Training", "Validation", "Test"]
-        ):
-            column_headers, table_rows = summarize(args.target_columns, args.task_type, dataset)
-            output = build_table(column_headers, table_rows, f"Summary of {label} Data")
-            logger.info("\n" + output)
+    summarize_datasets(args, train_dset, val_dset, test_dset)
 
     return train_dset, val_dset, test_dset
 
 
+def build_subset_datasets(args, format_kwargs, featurization_kwargs):
+    """build a single dataset from all of the data and yield the train/val/test datasets of each
+    replicate as views of it, where the test dataset may be None"""
+    all_data, train_indices, val_indices, test_indices = build_split_indices(
+        args, format_kwargs, featurization_kwargs
+    )
+    dsets = [
+        make_dataset(data, args.rxn_mode, args.multi_hot_atom_featurizer_mode) for data in all_data
+    ]
+    dset = MulticomponentDataset(dsets) if len(dsets) > 1 else dsets[0]
+    train_dsets, val_dsets, test_dsets = split_dataset_by_indices(
+        dset, train_indices, val_indices, test_indices
+    )
+
+    for i_split, (train_dset, val_dset, test_dset) in enumerate(
+        zip(train_dsets, val_dsets, test_dsets)
+    ):
+        sizes = [len(train_dset), len(val_dset), len(test_dset)]
+        logger.info(f"train/val/test split_{i_split} sizes: {sizes}")
+        test_dset = test_dset if len(test_dset) > 0 else None
+        summarize_datasets(args, train_dset, val_dset, test_dset)
+
+        yield train_dset, val_dset, test_dset
+
+
+def summarize_datasets(args, train_dset, val_dset, test_dset):
+    """log a summary table of the targets of each dataset"""
+    if args.task_type == "spectral":
+        return
+
+    for dataset, label in zip(
+        [train_dset, val_dset, test_dset], ["Training", "Validation", "Test"]
+    ):
+        column_headers, table_rows = summarize(args.target_columns, args.task_type, dataset)
+        output = build_table(column_headers, table_rows, f"Summary of {label} Data")
+        logger.info("\n" + output)
+
+
 def build_model(
     args,
     train_dset: MolGraphDataset | MulticomponentDataset,
@@ -928,11 +1045,7 @@ def build_model(
                 train_dset.datasets[i].featurizer.atom_fdim,
                 train_dset.datasets[i].featurizer.bond_fdim,
                 d_h=args.message_hidden_dim,
-                d_vd=(
-                    train_dset.datasets[i].d_vd
-                    if isinstance(train_dset.datasets[i], MoleculeDataset)
-                    else 0
-                ),
+                d_vd=train_dset.datasets[i].d_vd,
                 bias=args.message_bias,
                 depth=args.depth,
                 undirected=args.undirected,
@@ -963,7 +1076,7 @@ def build_model(
             train_dset.featurizer.atom_fdim,
             train_dset.featurizer.bond_fdim,
             d_h=args.message_hidden_dim,
-            d_vd=train_dset.d_vd if isinstance(train_dset, MoleculeDataset) else 0,
+            d_vd=train_dset.d_vd,
             bias=args.message_bias,
             depth=args.depth,
             undirected=args.undirected,
@@ -1029,8 +1142,17 @@ def build_model(
 
 
 def train_model(
-    args, train_loader, val_loader, test_loader, output_dir, output_transform, input_transforms
+    args,
+    train_loader,
+    val_loader,
+    test_loader,
+    output_dir,
+    output_transform,
+    input_transforms,
+    model_idxs=None,
 ):
+    """Train the models of the ensemble with the given indices (by default, the whole ensemble,
+    jointly if ``args.joint_ensemble`` is set) and save each to ``output_dir/model_{idx}``"""
     if args.checkpoint is not None:
         model_paths = find_models(args.checkpoint)
         if args.ensemble_size != len(model_paths):
@@ -1038,68 +1160,36 @@ def train_model(
                 f"The number of models in ensemble for each splitting of data is set to {len(model_paths)}."
             )
             args.ensemble_size = len(model_paths)
+    else:
+        model_paths = None
+
+    if model_idxs is None:
+        if args.joint_ensemble and args.ensemble_size > 1:
+            train_ensemble(
+                args,
+                train_loader,
+                val_loader,
+                test_loader,
+                output_dir,
+                output_transform,
+                input_transforms,
+                model_paths,
+            )
+            return
+
+        model_idxs = range(args.ensemble_size)
 
-    for model_idx in range(args.ensemble_size):
+    for model_idx in model_idxs:
         model_output_dir = output_dir / f"model_{model_idx}"
         model_output_dir.mkdir(exist_ok=True, parents=True)
 
-        if args.pytorch_seed is None:
-            seed = torch.seed()
-            deterministic = False
-        else:
-            seed = args.pytorch_seed + model_idx
-            deterministic = True
-
-        torch.manual_seed(seed)
-
-        if args.checkpoint or args.model_frzn is not None:
-            mpnn_cls = (
-                MulticomponentMPNN
-                if isinstance(train_loader.dataset, MulticomponentDataset)
-                else MPNN
-            )
-            model_path = model_paths[model_idx] if args.checkpoint else args.model_frzn
-            model = mpnn_cls.load_from_file(model_path)
-
-            if args.checkpoint:
-                model.apply(
-                    lambda m: setattr(m, "p", args.dropout)
-                    if isinstance(m, torch.nn.Dropout)
-                    else None
-                )
-
-            # TODO: model_frzn is deprecated and then remove in v2.2
-            if args.model_frzn or args.freeze_encoder:
-                model.message_passing.apply(lambda module: module.requires_grad_(False))
-                model.message_passing.eval()
-                model.bn.apply(lambda module: module.requires_grad_(False))
-                model.bn.eval()
-                for idx in range(args.frzn_ffn_layers):
-                    model.predictor.ffn[idx].requires_grad_(False)
-                    model.predictor.ffn[idx + 1].eval()
-        else:
-            model = build_model(args, train_loader.dataset, output_transform, input_transforms)
+        model, deterministic = build_ensemble_member(
+            args, model_idx, train_loader, output_transform, input_transforms, model_paths
+        )
         logger.info(model)
 
-        try:
-            trainer_logger = TensorBoardLogger(
-                model_output_dir, "trainer_logs", default_hp_metric=False
-            )
-        except ModuleNotFoundError as e:
-            logger.warning(
-                f"Unable to import TensorBoardLogger, reverting to CSVLogger (original error: {e})."
-            )
-            trainer_logger = CSVLogger(model_output_dir, "trainer_logs")
-
-        if args.tracking_metric == "val_loss":
-            T_tracking_metric = model.criterion.__class__
-            tracking_metric = args.tracking_metric
-        else:
-            T_tracking_metric = MetricRegistry[args.tracking_metric]
-            tracking_metric = "val/" + args.tracking_metric
-
-        monitor_mode = "max" if T_tracking_metric.higher_is_better else "min"
-        logger.debug(f"Evaluation metric: '{T_tracking_metric.alias}', mode: '{monitor_mode}'")
+        trainer_logger = build_trainer_logger(model_output_dir)
+        tracking_metric, monitor_mode = get_tracking_metric(args, model)
 
         if args.remove_checkpoints:
             temp_dir = TemporaryDirectory()
@@ -1126,6 +1216,8 @@ def train_model(
             callbacks = [checkpointing, early_stopping]
         else:
             callbacks = [checkpointing]
+        if args.profile:
+            callbacks.append(ProfilingCallback(model_output_dir))
 
         trainer = pl.Trainer(
             logger=trainer_logger,
@@ -1166,7 +1258,7 @@ def train_model(
 
         best_model_path = checkpointing.best_model_path
         model = model.__class__.load_from_checkpoint(best_model_path)
-        p_model = model_output_dir / "best.pt"
+        p_model = model_output_dir / f"best.{args.model_format}"
         save_model(p_model, model, args.target_columns)
         logger.info(f"Best model saved to '{p_model}'")
 
@@ -1174,6 +1266,165 @@ def train_model(
             temp_dir.cleanup()
 
 
+def train_ensemble(
+    args,
+    train_loader,
+    val_loader,
+    test_loader,
+    output_dir,
+    output_transform,
+    input_transforms,
+    model_paths,
+):
+    """Train all models of the ensemble jointly on the same batches with an :class:`EnsembleMPNN`"""
+    model_output_dirs = [output_dir / f"model_{i}" for i in range(args.ensemble_size)]
+    for model_output_dir in model_output_dirs:
+        model_output_dir.mkdir(exist_ok=True, parents=True)
+
+    models, deterministics = zip(
+        *[
+            build_ensemble_member(
+                args, model_idx, train_loader, output_transform, input_transforms, model_paths
+            )
+            for model_idx in range(args.ensemble_size)
+        ]
+    )
+    ensemble = EnsembleMPNN(models, args.grad_clip)
+    logger.info(ensemble)
+
+    trainer_logger = build_trainer_logger(output_dir)
+    tracking_metric, monitor_mode = get_tracking_metric(args, models[0])
+
+    if args.remove_checkpoints:
+        temp_dir = TemporaryDirectory()
+        checkpoint_dirs = [
+            Path(temp_dir.name) / f"model_{i}" / "checkpoints" for i in range(args.ensemble_size)
+        ]
+    else:
+        checkpoint_dirs = [
+            model_output_dir / "checkpoints" for model_output_dir in model_output_dirs
+        ]
+
+    if args.epochs != -1:
+        patience = args.patience if args.patience is not None else args.epochs
+    else:
+        patience = None
+    checkpointing = EnsembleCheckpoint(checkpoint_dirs, tracking_metric, monitor_mode, patience)
+    callbacks = [checkpointing]
+    if args.profile:
+        callbacks.append(ProfilingCallback(output_dir))
+
+    trainer = pl.Trainer(
+        logger=trainer_logger,
+        enable_progress_bar=True,
+        accelerator=args.accelerator,
+        devices=args.devices,
+        max_epochs=args.epochs,
+        enable_checkpointing=False,
+        callbacks=callbacks,
+        deterministic=all(deterministics),
+    )
+    trainer.fit(ensemble, train_loader, val_loader)
+
+    mpnn_cls = MulticomponentMPNN if isinstance(models[0], MulticomponentMPNN) else MPNN
+    models = [mpnn_cls.load_from_checkpoint(path) for path in checkpointing.best_model_paths]
+
+    if test_loader is not None:
+        trainer = pl.Trainer(
+            logger=trainer_logger,
+            enable_progress_bar=True,
+            enable_checkpointing=False,
+            accelerator=args.accelerator,
+            devices=1,
+            callbacks=callbacks[1:],
+        )
+        predss = trainer.predict(EnsembleMPNN(models), dataloaders=test_loader)
+        predss = torch.concat(predss, 1)
+
+        for model, preds, model_output_dir in zip(models, predss, model_output_dirs):
+            if model.predictor.n_targets > 1:
+                preds = preds[..., 0]
+
+            evaluate_and_save_predictions(
+                preds.numpy(), test_loader, model.metrics[:-1], model_output_dir, args
+            )
+
+    for model, model_output_dir in zip(models, model_output_dirs):
+        p_model = model_output_dir / f"best.{args.model_format}"
+        save_model(p_model, model, args.target_columns)
+        logger.info(f"Best model saved to '{p_model}'")
+
+    if args.remove_checkpoints:
+        temp_dir.cleanup()
+
+
+def build_ensemble_member(
+    args, model_idx, train_loader, output_transform, input_transforms, model_paths=None
+) -> tuple[MPNN, bool]:
+    """Build the ``model_idx``-th model of the ensemble after seeding the random number generator
+    with its seed and return it along with whether its training should be deterministic"""
+    if args.pytorch_seed is None:
+        seed = torch.seed()
+        deterministic = False
+    else:
+        seed = args.pytorch_seed + model_idx
+        deterministic = True
+
+    torch.manual_seed(seed)
+
+    if args.checkpoint or args.model_frzn is not None:
+        mpnn_cls = (
+            MulticomponentMPNN if isinstance(train_loader.dataset, MulticomponentDataset) else MPNN
+        )
+        model_path = model_paths[model_idx] if args.checkpoint else args.model_frzn
+        model = mpnn_cls.load_from_file(model_path)
+
+        if args.checkpoint:
+            model.apply(
+                lambda m: setattr(m, "p", args.dropout) if isinstance(m, torch.nn.Dropout) else None
+            )
+
+        # TODO: model_frzn is deprecated and then remove in v2.2
+        if args.model_frzn or args.freeze_encoder:
+            model.message_passing.apply(lambda module: module.requires_grad_(False))
+            model.message_passing.eval()
+            model.bn.apply(lambda module: module.requires_grad_(False))
+            model.bn.eval()
+            for idx in range(args.frzn_ffn_layers):
+                model.predictor.ffn[idx].requires_grad_(False)
+                model.predictor.ffn[idx + 1].eval()
+    else:
+        model = build_model(args, train_loader.dataset, output_transform, input_transforms)
+
+    return model, deterministic
+
+
+def build_trainer_logger(output_dir: Path):
+    try:
+        return TensorBoardLogger(output_dir, "trainer_logs", default_hp_metric=False)
+    except ModuleNotFoundError as e:
+        logger.warning(
+            f"Unable to import TensorBoardLogger, reverting to CSVLogger (original error: {e})."
+        )
+        return CSVLogger(output_dir, "trainer_logs")
+
+
+def get_tracking_metric(args: Namespace, model: MPNN) -> tuple[str, str]:
+    """Get the name of the logged metric that is tracked for checkpointing and early stopping and
+    whether it should be maximized (``"max"``) or minimized (``"min"``)"""
+    if args.tracking_metric == "val_loss":
+        T_tracking_metric = model.criterion.__class__
+        tracking_metric = args.tracking_metric
+    else:
+        T_tracking_metric = MetricRegistry[args.tracking_metric]
+        tracking_metric = "val/" + args.tracking_metric
+
+    monitor_mode = "max" if T_tracking_metric.higher_is_better else "min"
+    logger.debug(f"Evaluation metric: '{T_tracking_metric.alias}', mode: '{monitor_mode}'")
+
+    return tracking_metric, monitor_mode
+
+
 def evaluate_and_save_predictions(preds, test_loader, metrics, model_output_dir, args):
     if isinstance(test_loader.dataset, MulticomponentDataset):
         test_dset = test_loader.dataset.datasets[0]
@@ -1239,85 +1490,103 @@ def evaluate_and_save_predictions(preds, test_loader, metrics, model_output_dir,
     df_preds.to_csv(model_output_dir / "test_predictions.csv", index=False)
 
 
-def main(args):
-    format_kwargs = dict(
-        no_header_row=args.no_header_row,
-        smiles_cols=args.smiles_columns,
-        rxn_cols=args.reaction_columns,
-        target_cols=args.target_columns,
-        ignore_cols=args.ignore_columns,
-        splits_col=args.splits_column,
-        weight_col=args.weight_column,
-        bounded=args.loss_function is not None and "bounded" in args.loss_function,
-    )
+def prepare_replicate(args, replicate_idx, train_dset, val_dset, test_dset):
+    """Create the output directory of a replicate and normalize its training and validation data,
+    returning the directory along with the output and input transforms of its models"""
+    if args.num_replicates == 1:
+        output_dir = args.output_dir
+    else:
+        output_dir = args.output_dir / f"replicate_{replicate_idx}"
 
-    featurization_kwargs = dict(
-        molecule_featurizers=args.molecule_featurizers, keep_h=args.keep_h, add_h=args.add_h
-    )
+    output_dir.mkdir(exist_ok=True, parents=True)
 
-    splits = build_splits(args, format_kwargs, featurization_kwargs)
+    if args.save_smiles_splits:
+        save_smiles_splits(args, output_dir, train_dset, val_dset, test_dset)
 
-    for replicate_idx, (train_data, val_data, test_data) in enumerate(zip(*splits)):
-        if args.num_replicates == 1:
-            output_dir = args.output_dir
+    if args.checkpoint or args.model_frzn is not None:
+        model_paths = find_models(args.checkpoint)
+        if len(model_paths) > 1:
+            logger.warning(
+                "Multiple checkpoint files were loaded, but only the scalers from "
+                f"{model_paths[0]} are used. It is assumed that all models provided have the "
+                "same data scalings, meaning they were trained on the same data."
+            )
+        model_path = model_paths[0] if args.checkpoint else args.model_frzn
+        load_and_use_pretrained_model_scalers(model_path, train_dset, val_dset)
+        input_transforms = (None, None, None)
+        output_transform = None
+    else:
+        input_transforms = normalize_inputs(train_dset, val_dset, args)
+
+        if "regression" in args.task_type:
+            output_scaler = train_dset.normalize_targets()
+            val_dset.normalize_targets(output_scaler)
+            logger.info(f"Train data: mean = {output_scaler.mean_} | std = {output_scaler.scale_}")
+            output_transform = UnscaleTransform.from_standard_scaler(output_scaler)
         else:
-            output_dir = args.output_dir / f"replicate_{replicate_idx}"
+            output_transform = None
 
-        output_dir.mkdir(exist_ok=True, parents=True)
+    return output_dir, output_transform, input_transforms
 
-        train_dset, val_dset, test_dset = build_datasets(args, train_data, val_data, test_data)
 
-        if args.save_smiles_splits:
-            save_smiles_splits(args, output_dir, train_dset, val_dset, test_dset)
+def build_dataloaders(args, train_dset, val_dset, test_dset):
+    # keep the workers (and their caches) alive between epochs
+    persistent_workers = args.cache_budget is not None and args.num_workers > 0
 
-        if args.checkpoint or args.model_frzn is not None:
-            model_paths = find_models(args.checkpoint)
-            if len(model_paths) > 1:
-                logger.warning(
-                    "Multiple checkpoint files were loaded, but only the scalers from "
-                    f"{model_paths[0]} are used. It is assumed that all models provided have the "
-                    "same data scalings, meaning they were trained on the same data."
-                )
-            model_path = model_paths[0] if args.checkpoint else args.model_frzn
-            load_and_use_pretrained_model_scalers(model_path, train_dset, val_dset)
-            input_transforms = (None, None, None)
-            output_transform = None
-        else:
-            input_transforms = normalize_inputs(train_dset, val_dset, args)
+    train_loader = build_dataloader(
+        train_dset,
+        args.batch_size,
+        args.num_workers,
+        class_balance=args.class_balance,
+        seed=args.data_seed,
+        persistent_workers=persistent_workers,
+        pin_memory=args.pin_memory,
+    )
+    if args.class_balance:
+        logger.debug(f"With `--class-balance`, effective train size = {len(train_loader.sampler)}")
+    val_loader = build_dataloader(
+        val_dset,
+        args.batch_size,
+        args.num_workers,
+        shuffle=False,
+        persistent_workers=persistent_workers,
+        pin_memory=args.pin_memory,
+    )
+    if test_dset is not None:
+        test_loader = build_dataloader(
+            test_dset, args.batch_size, args.num_workers, shuffle=False, pin_memory=args.pin_memory
+        )
+    else:
+        test_loader = None
+
+    if args.replay_eval_batches:
+        val_loader = BatchReplayLoader(val_loader, pin_memory=args.pin_memory)
+        test_loader = (
+            BatchReplayLoader(test_loader, pin_memory=args.pin_memory)
+            if test_loader is not None
+            else None
+        )
+
+    return train_loader, val_loader, test_loader
 
-            if "regression" in args.task_type:
-                output_scaler = train_dset.normalize_targets()
-                val_dset.normalize_targets(output_scaler)
-                logger.info(
-                    f"Train data: mean = {output_scaler.mean_} | std = {output_scaler.scale_}"
-                )
-                output_transform = UnscaleTransform.from_standard_scaler(output_scaler)
-            else:
-                output_transform = None
 
-        if not args.no_cache:
+def train_serially(args, dsetss):
+    """Train the models of each replicate one after another in this process"""
+    for replicate_idx, (train_dset, val_dset, test_dset) in enumerate(dsetss):
+        output_dir, output_transform, input_transforms = prepare_replicate(
+            args, replicate_idx, train_dset, val_dset, test_dset
+        )
+
+        if args.cache_budget is not None:
+            train_dset.cache_budget = int(args.cache_budget * 2**20)
+            val_dset.cache_budget = int(args.cache_budget * 2**20)
+        elif not args.no_cache:
             train_dset.cache = True
             val_dset.cache = True
 
-        train_loader = build_dataloader(
-            train_dset,
-            args.batch_size,
-            args.num_workers,
-            class_balance=args.class_balance,
-            seed=args.data_seed,
+        train_loader, val_loader, test_loader = build_dataloaders(
+            args, train_dset, val_dset, test_dset
         )
-        if args.class_balance:
-            logger.debug(
-                f"With `--class-balance`, effective train size = {len(train_loader.sampler)}"
-            )
-        val_loader = build_dataloader(val_dset, args.batch_size, args.num_workers, shuffle=False)
-        if test_dset is not None:
-            test_loader = build_dataloader(
-                test_dset, args.batch_size, args.num_workers, shuffle=False
-            )
-        else:
-            test_loader = None
-
         train_model(
             args,
             train_loader,
@@ -1329,6 +1598,142 @@ def main(args):
         )
 
 
+def train_in_parallel(args, dsetss):
+    """Train the models of all replicates concurrently in ``args.parallel_jobs`` worker processes.
+
+    Each replicate is normalized and featurized once in the main process, and its packed training
+    and validation data are saved to memory-mapped files that are shared read-only by every job
+    of the replicate. The jobs of a replicate are submitted as soon as its data are ready, so the
+    featurization of later replicates overlaps with the training of earlier ones. Each job writes
+    its outputs to the usual ``replicate_{i}/model_{j}`` directory.
+
+    .. note::
+        Each job draws its training batches from a fresh sampler, so the models of an ensemble
+        see the same order of batches rather than continuing the shuffle of the previous model as
+        they do when trained one after another.
+    """
+    if args.checkpoint is not None:
+        # resolve the size of the ensemble up front so that each job trains a single model
+        args.ensemble_size = len(find_models(args.checkpoint))
+
+    cpus = available_cpus()
+    n_threads = args.threads_per_job or max(1, len(cpus) // args.parallel_jobs)
+    n_threads = min(n_threads, len(cpus))
+
+    ctx = multiprocessing.get_context("spawn")
+    core_sets = make_core_sets(ctx, cpus, args.parallel_jobs, n_threads)
+
+    logger.info(f"Running {args.parallel_jobs} concurrent jobs with {n_threads} thread(s) each")
+
+    jobs = {}
+    with (
+        TemporaryDirectory(dir=args.output_dir) as data_root,
+        ProcessPoolExecutor(
+            args.parallel_jobs,
+            ctx,
+            initializer=init_worker_process,
+            initargs=(core_sets, n_threads),
+        ) as executor,
+    ):
+        for replicate_idx, (train_dset, val_dset, test_dset) in enumerate(dsetss):
+            output_dir, output_transform, input_transforms = prepare_replicate(
+                args, replicate_idx, train_dset, val_dset, test_dset
+            )
+
+            data_dir = Path(data_root) / f"replicate_{replicate_idx}"
+            save_packed_dataset(pack_dataset(train_dset), data_dir / "train")
+            save_packed_dataset(pack_dataset(val_dset), data_dir / "val")
+            if test_dset is not None:
+                # the test data are only used once per model and keep their names for the outputs
+                with open(data_dir / "test.pkl", "wb") as f:
+                    pickle.dump(test_dset, f)
+
+            if args.joint_ensemble:
+                model_idxss = [None]
+            else:
+                model_idxss = [[model_idx] for model_idx in range(args.ensemble_size)]
+
+            for model_idxs in model_idxss:
+                future = executor.submit(
+                    run_train_job,
+                    args,
+                    data_dir,
+                    output_dir,
+                    output_transform,
+                    input_transforms,
+                    model_idxs,
+                )
+                jobs[future] = replicate_idx, model_idxs
+
+        for future in as_completed(jobs):
+            replicate_idx, model_idxs = jobs[future]
+            future.result()
+            models = "all models" if model_idxs is None else f"model {model_idxs[0]}"
+            logger.info(f"Finished training {models} of replicate {replicate_idx}")
+
+
+def run_train_job(
+    args, data_dir: Path, output_dir: Path, output_transform, input_transforms, model_idxs
+):
+    """Train the models with the given indices of a replicate in a worker process of
+    :func:`train_in_parallel`"""
+    train_dset = load_packed_dataset(data_dir / "train")
+    val_dset = load_packed_dataset(data_dir / "val")
+    if (data_dir / "test.pkl").exists():
+        with open(data_dir / "test.pkl", "rb") as f:
+            test_dset = pickle.load(f)
+    else:
+        test_dset = None
+
+    train_loader, val_loader, test_loader = build_dataloaders(args, train_dset, val_dset, test_dset)
+    train_model(
+        args,
+        train_loader,
+        val_loader,
+        test_loader,
+        output_dir,
+        output_transform,
+        input_transforms,
+        model_idxs,
+    )
+
+
+def main(args):
+    format_kwargs = dict(
+        no_header_row=args.no_header_row,
+        smiles_cols=args.smiles_columns,
+        rxn_cols=args.reaction_columns,
+        target_cols=args.target_columns,
+        ignore_cols=args.ignore_columns,
+        splits_col=args.splits_column,
+        weight_col=args.weight_column,
+        bounded=args.loss_function is not None and "bounded" in args.loss_function,
+    )
+
+    featurization_kwargs = dict(
+        molecule_featurizers=args.molecule_featurizers,
+        keep_h=args.keep_h,
+        add_h=args.add_h,
+        lazy=args.lazy_mols,
+    )
+
+    with profile() if args.profile else nullcontext() as profiler:
+        if args.index_splits:
+            dsetss = build_subset_datasets(args, format_kwargs, featurization_kwargs)
+        else:
+            splits = build_splits(args, format_kwargs, featurization_kwargs)
+            dsetss = (build_datasets(args, *split) for split in zip(*splits))
+
+        if args.parallel_jobs > 1:
+            train_in_parallel(args, dsetss)
+        else:
+            train_serially(args, dsetss)
+
+    if profiler is not None:
+        logger.info(f"Profile:\n{profiler.summary().to_string(index=False)}")
+        profiler.save(args.output_dir)
+
+
 if __name__ == "__main__":
     # TODO: update this old code or remove it.
     parser = ArgumentParser()
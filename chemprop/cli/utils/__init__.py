@@ -1,6 +1,13 @@
 from .actions import LookupAction
 from .args import bounded
 from .command import Subcommand
+from .parallel import (
+    available_cpus,
+    init_worker_process,
+    load_packed_dataset,
+    make_core_sets,
+    save_packed_dataset,
+)
 from .parsing import (
     build_data_from_files,
     get_column_names,
@@ -19,9 +26,15 @@ __all__ = [
     "make_dataset",
     "get_column_names",
     "parse_indices",
+    "available_cpus",
+    "make_core_sets",
+    "init_worker_process",
+    "save_packed_dataset",
+    "load_packed_dataset",
     "actions",
     "args",
     "command",
+    "parallel",
     "parsing",
     "utils",
     "pop_attr",
@@ -0,0 +1,63 @@
+import os
+from pathlib import Path
+
+from threadpoolctl import threadpool_limits
+import torch
+
+from chemprop.data import MulticomponentDataset, PackedDataset
+
+__all__ = [
+    "available_cpus",
+    "make_core_sets",
+    "init_worker_process",
+    "save_packed_dataset",
+    "load_packed_dataset",
+]
+
+
+def available_cpus() -> list[int]:
+    """Get the CPU cores on which the current process may run"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+
+    return list(range(os.cpu_count()))
+
+
+def make_core_sets(ctx, cpus: list[int], n_workers: int, n_threads: int):
+    """Build a queue of ``n_workers`` sets of ``n_threads`` CPU cores, wrapping around ``cpus`` if
+    there are too few of them"""
+    core_sets = ctx.SimpleQueue()
+    for i in range(n_workers):
+        core_sets.put([cpus[(i * n_threads + j) % len(cpus)] for j in range(n_threads)])
+
+    return core_sets
+
+
+def init_worker_process(core_sets, n_threads: int):
+    """Pin a worker process to a set of CPU cores and limit its threads"""
+    cores = core_sets.get()
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+
+    torch.set_num_threads(n_threads)
+    threadpool_limits(n_threads)
+
+
+def save_packed_dataset(dataset: PackedDataset | MulticomponentDataset, path: Path):
+    """Save a packed dataset, or a multicomponent dataset of packed datasets, to the directory
+    ``path``"""
+    if isinstance(dataset, MulticomponentDataset):
+        for i, dset in enumerate(dataset.datasets):
+            dset.save(path / str(i))
+    else:
+        dataset.save(path)
+
+
+def load_packed_dataset(path: Path) -> PackedDataset | MulticomponentDataset:
+    """Load a dataset saved with :func:`save_packed_dataset` from the directory ``path``"""
+    if (path / "featurizer.pkl").exists():
+        return PackedDataset.load(path)
+
+    n_components = len(list(path.iterdir()))
+
+    return MulticomponentDataset([PackedDataset.load(path / str(i)) for i in range(n_components)])
@@ -5,7 +5,7 @@ from typing import Mapping, Sequence
 import numpy as np
 import pandas as pd
 
-from chemprop.data.datapoints import MoleculeDatapoint, ReactionDatapoint
+from chemprop.data.datapoints import LazyMoleculeDatapoint, MoleculeDatapoint, ReactionDatapoint
 from chemprop.data.datasets import MoleculeDataset, ReactionDataset
 from chemprop.featurizers.atom import get_multi_hot_atom_featurizer
 from chemprop.featurizers.molecule import MoleculeFeaturizerRegistry
@@ -31,6 +31,23 @@ def parse_csv(
 ):
     df = pd.read_csv(path, header=None if no_header_row else "infer", index_col=False)
 
+    return parse_df(
+        df, smiles_cols, rxn_cols, target_cols, ignore_cols, splits_col, weight_col, bounded
+    )
+
+
+def parse_df(
+    df: pd.DataFrame,
+    smiles_cols: Sequence[str] | None,
+    rxn_cols: Sequence[str] | None,
+    target_cols: Sequence[str] | None,
+    ignore_cols: Sequence[str] | None,
+    splits_col: str | None,
+    weight_col: str | None,
+    bounded: bool = False,
+):
+    """Parse the inputs and targets from the rows of a data file that have already been read into
+    ``df``. See :func:`parse_csv`"""
     if smiles_cols is not None and rxn_cols is not None:
         smiss = df[smiles_cols].T.values.tolist()
         rxnss = df[rxn_cols].T.values.tolist()
@@ -120,6 +137,7 @@ def make_datapoints(
     molecule_featurizers: list[str] | None,
     keep_h: bool,
     add_h: bool,
+    lazy: bool = False,
 ) -> tuple[list[list[MoleculeDatapoint]], list[list[ReactionDatapoint]]]:
     """Make the :class:`MoleculeDatapoint`s and :class:`ReactionDatapoint`s for a given
     dataset.
@@ -173,6 +191,10 @@ def make_datapoints(
         ``molecule_featurizer`` will be applied to both of these objects.
     keep_h : bool
     add_h : bool
+    lazy : bool, default=False
+        whether to make :class:`LazyMoleculeDatapoint`\s, which store only the SMILES strings and
+        build the RDKit molecules upon access, instead of :class:`MoleculeDatapoint`\s. Reactions
+        are unaffected.
 
     Returns
     -------
@@ -204,7 +226,10 @@ def make_datapoints(
     else:
         N = len(smiss[0])
 
-    if len(smiss) > 0:
+    if lazy:
+        # the molecules are only needed for the molecule featurizers, so build them one at a time
+        molss = [(make_mol(smi, keep_h, add_h) for smi in smis) for smis in smiss]
+    else:
         molss = [[make_mol(smi, keep_h, add_h) for smi in smis] for smis in smiss]
     if len(rxnss) > 0:
         rctss = [
@@ -266,10 +291,19 @@ def make_datapoints(
             else:
                 X_d = np.hstack([X_d, rct_pdt_descriptors])
 
+    if lazy:
+        mol_cls = LazyMoleculeDatapoint
+        mol_inputss = smiss
+        mol_kwargs = dict(keep_h=keep_h, add_h=add_h)
+    else:
+        mol_cls = MoleculeDatapoint
+        mol_inputss = molss
+        mol_kwargs = {}
+
     mol_data = [
         [
-            MoleculeDatapoint(
-                mol=molss[mol_idx][i],
+            mol_cls(
+                mol_inputss[mol_idx][i],
                 name=smis[i],
                 y=Y[i],
                 weight=weights[i],
@@ -280,6 +314,7 @@ def make_datapoints(
                 V_f=V_fss[mol_idx][i],
                 E_f=E_fss[mol_idx][i],
                 V_d=V_dss[mol_idx][i],
+                **mol_kwargs,
             )
             for i in range(N)
         ]
@@ -363,7 +398,10 @@ def load_input_feats_and_descs(
     n_molecules: int | None,
     n_datapoints: int | None,
     feat_desc: str,
+    idxs: Sequence[int] | None = None,
 ):
+    """Load the extra features or descriptors from the given ``.npz`` file(s). If ``idxs`` is given,
+    only those of the datapoints with the given indices are loaded."""
     if paths is None:
         return None
 
@@ -372,6 +410,8 @@ def load_input_feats_and_descs(
             path = paths
             loaded_feature = np.load(path)
             features = loaded_feature["arr_0"]
+            if idxs is not None:
+                features = features[idxs]
 
         case _:
             for index in paths:
@@ -388,10 +428,11 @@ def load_input_feats_and_descs(
                 if path is not None:
                     loaded_feature = np.load(path)
                     loaded_feature = [
-                        loaded_feature[f"arr_{i}"] for i in range(len(loaded_feature))
+                        loaded_feature[f"arr_{i}"]
+                        for i in (range(len(loaded_feature)) if idxs is None else idxs)
                     ]
                 else:
-                    loaded_feature = [None] * n_datapoints
+                    loaded_feature = [None] * (n_datapoints if idxs is None else len(idxs))
 
                 features.append(loaded_feature)
     return features
@@ -404,7 +445,7 @@ def make_dataset(
 ) -> MoleculeDataset | ReactionDataset:
     atom_featurizer = get_multi_hot_atom_featurizer(multi_hot_atom_featurizer_mode)
 
-    if isinstance(data[0], MoleculeDatapoint):
+    if isinstance(data[0], (MoleculeDatapoint, LazyMoleculeDatapoint)):
         extra_atom_fdim = data[0].V_f.shape[1] if data[0].V_f is not None else 0
         extra_bond_fdim = data[0].E_f.shape[1] if data[0].E_f is not None else 0
         featurizer = SimpleMoleculeMolGraphFeaturizer(
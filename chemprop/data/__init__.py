@@ -5,18 +5,26 @@ from .collate import (
     collate_batch,
     collate_multicomponent,
 )
-from .dataloader import build_dataloader
-from .datapoints import MoleculeDatapoint, ReactionDatapoint
+from .dataloader import BatchReplayLoader, CUDAPrefetcher, DeviceDataLoader, build_dataloader
+from .datapoints import LazyMoleculeDatapoint, MoleculeDatapoint, ReactionDatapoint
 from .datasets import (
     Datum,
     MoleculeDataset,
     MolGraphDataset,
     MulticomponentDataset,
+    PackedDataset,
     ReactionDataset,
+    SubsetDataset,
+    pack_dataset,
 )
 from .molgraph import MolGraph
 from .samplers import ClassBalanceSampler, SeededSampler
-from .splitting import SplitType, make_split_indices, split_data_by_indices
+from .splitting import (
+    SplitType,
+    make_split_indices,
+    split_data_by_indices,
+    split_dataset_by_indices,
+)
 
 __all__ = [
     "BatchMolGraph",
@@ -25,12 +33,19 @@ __all__ = [
     "MulticomponentTrainingBatch",
     "collate_multicomponent",
     "build_dataloader",
+    "BatchReplayLoader",
+    "CUDAPrefetcher",
+    "DeviceDataLoader",
     "MoleculeDatapoint",
+    "LazyMoleculeDatapoint",
     "ReactionDatapoint",
     "MoleculeDataset",
     "ReactionDataset",
     "Datum",
     "MulticomponentDataset",
+    "SubsetDataset",
+    "PackedDataset",
+    "pack_dataset",
     "MolGraphDataset",
     "MolGraph",
     "ClassBalanceSampler",
@@ -38,4 +53,5 @@ __all__ = [
     "SplitType",
     "make_split_indices",
     "split_data_by_indices",
+    "split_dataset_by_indices",
 ]
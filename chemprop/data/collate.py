@@ -1,5 +1,5 @@
 from dataclasses import InitVar, dataclass, field
-from typing import Iterable, NamedTuple, Sequence
+from typing import Callable, Iterable, NamedTuple, Sequence
 
 import numpy as np
 import torch
@@ -7,6 +7,7 @@ from torch import Tensor
 
 from chemprop.data.datasets import Datum
 from chemprop.data.molgraph import MolGraph
+from chemprop.utils.profiling import get_profiler
 
 
 @dataclass(repr=False, eq=False, slots=True)
@@ -60,16 +61,69 @@ class BatchMolGraph:
         self.rev_edge_index = torch.from_numpy(np.concatenate(rev_edge_indexes)).long()
         self.batch = torch.tensor(np.concatenate(batch_indexes)).long()
 
+    @classmethod
+    def from_tensors(
+        cls,
+        V: Tensor,
+        E: Tensor,
+        edge_index: Tensor,
+        rev_edge_index: Tensor,
+        batch: Tensor,
+        size: int,
+    ) -> "BatchMolGraph":
+        """Build a :class:`BatchMolGraph` directly from already batched tensors
+
+        Parameters
+        ----------
+        V, E, edge_index, rev_edge_index, batch : Tensor
+            the batched tensors. See the attributes of this class for their shapes
+        size : int
+            the number of individual :class:`MolGraph`\s in the batch
+        """
+        bmg = cls.__new__(cls)
+        bmg.V = V
+        bmg.E = E
+        bmg.edge_index = edge_index
+        bmg.rev_edge_index = rev_edge_index
+        bmg.batch = batch
+        bmg.__size = size
+
+        return bmg
+
     def __len__(self) -> int:
         """the number of individual :class:`MolGraph`\s in this batch"""
         return self.__size
 
-    def to(self, device: str | torch.device):
-        self.V = self.V.to(device)
-        self.E = self.E.to(device)
-        self.edge_index = self.edge_index.to(device)
-        self.rev_edge_index = self.rev_edge_index.to(device)
-        self.batch = self.batch.to(device)
+    def to(self, device: str | torch.device, non_blocking: bool = False):
+        """Move this batch to the given device in-place
+
+        Parameters
+        ----------
+        device : str | torch.device
+            the device to which to move the batch
+        non_blocking : bool, default=False
+            whether to perform the transfers asynchronously with respect to the host. This only has
+            an effect when moving a batch in pinned memory to a CUDA device.
+        """
+        self.V = self.V.to(device, non_blocking=non_blocking)
+        self.E = self.E.to(device, non_blocking=non_blocking)
+        self.edge_index = self.edge_index.to(device, non_blocking=non_blocking)
+        self.rev_edge_index = self.rev_edge_index.to(device, non_blocking=non_blocking)
+        self.batch = self.batch.to(device, non_blocking=non_blocking)
+
+    def pin_memory(self) -> "BatchMolGraph":
+        """Return a copy of this batch in pinned (page-locked) memory. This allows subsequent
+        transfers to CUDA devices to be performed with ``non_blocking=True``.
+
+        .. note::
+            This method is called by a :obj:`~torch.utils.data.DataLoader` with
+            ``pin_memory=True`` on each batch it loads.
+        """
+        return BatchMolGraph.from_tensors(*(X.pin_memory() for X in self.tensors()), len(self))
+
+    def tensors(self) -> tuple[Tensor, Tensor, Tensor, Tensor, Tensor]:
+        """the tensors of this batch"""
+        return self.V, self.E, self.edge_index, self.rev_edge_index, self.batch
 
 
 class TrainingBatch(NamedTuple):
@@ -81,8 +135,31 @@ class TrainingBatch(NamedTuple):
     lt_mask: Tensor | None
     gt_mask: Tensor | None
 
+    def to(self, device: str | torch.device, non_blocking: bool = False) -> "TrainingBatch":
+        """Return a copy of this batch on the given device, leaving this batch unchanged. See
+        :meth:`BatchMolGraph.to` for the arguments"""
+        return _apply(self, lambda X: X.to(device, non_blocking=non_blocking))
+
+    def pin_memory(self) -> "TrainingBatch":
+        """Return a copy of this batch in pinned memory. See :meth:`BatchMolGraph.pin_memory` for
+        details"""
+        return _apply(self, lambda X: X.pin_memory())
+
 
 def collate_batch(batch: Iterable[Datum]) -> TrainingBatch:
+    profiler = get_profiler()
+    if profiler is None:
+        return _collate_batch(batch)
+
+    start = profiler.start(synchronize=False)
+    training_batch = _collate_batch(batch)
+    bmg = training_batch.bmg
+    profiler.stop("collate", start, len(bmg), len(bmg.V), synchronize=False)
+
+    return training_batch
+
+
+def _collate_batch(batch: Iterable[Datum]) -> TrainingBatch:
     mgs, V_ds, x_ds, ys, weights, lt_masks, gt_masks = zip(*batch)
 
     return TrainingBatch(
@@ -105,6 +182,18 @@ class MulticomponentTrainingBatch(NamedTuple):
     lt_mask: Tensor | None
     gt_mask: Tensor | None
 
+    def to(
+        self, device: str | torch.device, non_blocking: bool = False
+    ) -> "MulticomponentTrainingBatch":
+        """Return a copy of this batch on the given device, leaving this batch unchanged. See
+        :meth:`BatchMolGraph.to` for the arguments"""
+        return _apply(self, lambda X: X.to(device, non_blocking=non_blocking))
+
+    def pin_memory(self) -> "MulticomponentTrainingBatch":
+        """Return a copy of this batch in pinned memory. See :meth:`BatchMolGraph.pin_memory` for
+        details"""
+        return _apply(self, lambda X: X.pin_memory())
+
 
 def collate_multicomponent(batches: Iterable[Iterable[Datum]]) -> MulticomponentTrainingBatch:
     tbs = [collate_batch(batch) for batch in zip(*batches)]
@@ -118,3 +207,23 @@ def collate_multicomponent(batches: Iterable[Iterable[Datum]]) -> Multicomponent
         tbs[0].lt_mask,
         tbs[0].gt_mask,
     )
+
+
+def _apply(
+    batch: TrainingBatch | MulticomponentTrainingBatch, func: Callable[[Tensor], Tensor]
+) -> TrainingBatch | MulticomponentTrainingBatch:
+    """Apply ``func`` to each tensor in ``batch`` and return the results as a new batch, including
+    new :class:`BatchMolGraph`\s. ``batch`` itself is left unchanged."""
+
+    def apply(x):
+        match x:
+            case BatchMolGraph():
+                return BatchMolGraph.from_tensors(*map(func, x.tensors()), len(x))
+            case Tensor():
+                return func(x)
+            case list():
+                return [apply(x_i) for x_i in x]
+            case _:
+                return x
+
+    return type(batch)(*map(apply, batch))
@@ -1,9 +1,20 @@
+from collections.abc import Iterator, Sequence
 import logging
 
+import numpy as np
+import torch
+from torch import Tensor
 from torch.utils.data import DataLoader
 
-from chemprop.data.collate import collate_batch, collate_multicomponent
-from chemprop.data.datasets import MoleculeDataset, MulticomponentDataset, ReactionDataset
+from chemprop.data.collate import (
+    BatchMolGraph,
+    MulticomponentTrainingBatch,
+    TrainingBatch,
+    _apply,
+    collate_batch,
+    collate_multicomponent,
+)
+from chemprop.data.datasets import Datum, MoleculeDataset, MulticomponentDataset, ReactionDataset
 from chemprop.data.samplers import ClassBalanceSampler, SeededSampler
 
 logger = logging.getLogger(__name__)
@@ -69,3 +80,297 @@ def build_dataloader(
         drop_last=drop_last,
         **kwargs,
     )
+
+
+class BatchReplayLoader:
+    """A :class:`BatchReplayLoader` wraps an unshuffled :obj:`~torch.utils.data.DataLoader` and
+    stores the collated batches of its first complete pass. Subsequent passes replay the stored
+    batches rather than collating them again.
+
+    This is useful for validation and test loaders, which yield the same batches in the same order
+    every epoch. Incomplete passes (e.g., the lightning sanity check) are not stored.
+
+    Each pass yields shallow copies of the stored batches, i.e., new batches (and
+    :class:`~chemprop.data.BatchMolGraph`\s) holding the stored tensors, so that the stored batches
+    stay on their device even if the yielded batches are moved to another one. The tensors
+    themselves are shared, so they must not be modified in-place.
+
+    Parameters
+    ----------
+    loader : DataLoader
+        the loader from which to collect batches.
+    device : str | torch.device | None, default=None
+        the device to which to move the stored batches. If ``None``, the batches are stored as
+        collated by ``loader``.
+    pin_memory : bool, default=False
+        whether to store the batches in pinned memory so that they may be transferred to a CUDA
+        device asynchronously on every pass. Only used when ``device`` is ``None``.
+    """
+
+    def __init__(
+        self, loader: DataLoader, device: str | torch.device | None = None, pin_memory: bool = False
+    ):
+        self.loader = loader
+        self.device = device
+        self.pin_memory = pin_memory
+        self._batches: list[TrainingBatch | MulticomponentTrainingBatch] | None = None
+
+    @property
+    def dataset(self):
+        return self.loader.dataset
+
+    @property
+    def cached(self) -> bool:
+        """whether the batches have been stored"""
+        return self._batches is not None
+
+    def __len__(self) -> int:
+        return len(self.loader)
+
+    def __iter__(self) -> Iterator[TrainingBatch | MulticomponentTrainingBatch]:
+        if self._batches is not None:
+            for batch in self._batches:
+                yield _shallow_copy(batch)
+            return
+
+        batches = []
+        for batch in self.loader:
+            if self.device is not None:
+                batch = batch.to(self.device)
+            elif self.pin_memory:
+                batch = batch.pin_memory()
+            batches.append(batch)
+            yield _shallow_copy(batch)
+
+        self._batches = batches
+
+    def clear(self):
+        """Drop the stored batches so that they are collated again on the next pass"""
+        self._batches = None
+
+
+def _shallow_copy(
+    batch: TrainingBatch | MulticomponentTrainingBatch,
+) -> TrainingBatch | MulticomponentTrainingBatch:
+    return _apply(batch, lambda X: X)
+
+
+class CUDAPrefetcher:
+    """A :class:`CUDAPrefetcher` wraps a loader and copies the next batch to a CUDA device on a
+    side stream while the current batch is being used.
+
+    The batches of ``loader`` should be in pinned memory (e.g., by building it with
+    ``pin_memory=True``) for the copies to actually overlap with computation. If ``device`` is not
+    a CUDA device, the batches are simply moved to ``device`` synchronously.
+
+    Parameters
+    ----------
+    loader : Iterable[TrainingBatch | MulticomponentTrainingBatch]
+        the loader from which to load batches.
+    device : str | torch.device, default="cuda"
+        the device to which to copy the batches.
+    """
+
+    def __init__(self, loader: DataLoader, device: str | torch.device = "cuda"):
+        self.loader = loader
+        self.device = torch.device(device)
+
+    @property
+    def dataset(self):
+        return self.loader.dataset
+
+    def __len__(self) -> int:
+        return len(self.loader)
+
+    def __iter__(self) -> Iterator[TrainingBatch | MulticomponentTrainingBatch]:
+        if self.device.type != "cuda":
+            for batch in self.loader:
+                yield batch.to(self.device)
+            return
+
+        stream = torch.cuda.Stream(self.device)
+        next_batch = None
+        for batch in self.loader:
+            with torch.cuda.stream(stream):
+                batch = batch.to(self.device, non_blocking=True)
+            if next_batch is not None:
+                yield self._wait(next_batch, stream)
+            next_batch = batch
+
+        if next_batch is not None:
+            yield self._wait(next_batch, stream)
+
+    def _wait(
+        self, batch: TrainingBatch | MulticomponentTrainingBatch, stream: torch.cuda.Stream
+    ) -> TrainingBatch | MulticomponentTrainingBatch:
+        """Make the current stream wait for the copy of ``batch`` on ``stream`` to finish and mark
+        its tensors as in use by the current stream so that their memory isn't reused early"""
+        current_stream = torch.cuda.current_stream(self.device)
+        current_stream.wait_stream(stream)
+
+        def record(X: Tensor) -> Tensor:
+            X.record_stream(current_stream)
+            return X
+
+        return _apply(batch, record)
+
+
+class DeviceDataLoader:
+    """A :class:`DeviceDataLoader` loads batches from a dataset that has been packed into a few
+    contiguous tensors on a given device.
+
+    The featurized data of the entire dataset is packed and moved to ``device`` once upon
+    initialization. Each batch is then built with on-device gathers and offset arithmetic rather
+    than by collating individual :class:`~chemprop.data.molgraph.MolGraph`\s, so no per-batch
+    host-to-device transfer is necessary. This is only suitable for datasets whose featurized data
+    fits in the memory of ``device``.
+
+    .. note::
+        The dataset is packed as-is, so any normalization of the dataset must be performed
+        *before* building the loader.
+
+    Parameters
+    ----------
+    dataset : MoleculeDataset | ReactionDataset | MulticomponentDataset
+        The dataset containing the molecules or reactions to load.
+    batch_size : int, default=64
+        the batch size to load.
+    device : str | torch.device, default="cpu"
+        the device on which to store the packed data and build batches.
+    seed : int, default=None
+        the random seed to use for shuffling (only used when `shuffle` is `True`).
+    shuffle : bool, default=True
+        whether to shuffle the data during sampling.
+    """
+
+    def __init__(
+        self,
+        dataset: MoleculeDataset | ReactionDataset | MulticomponentDataset,
+        batch_size: int = 64,
+        device: str | torch.device = "cpu",
+        seed: int | None = None,
+        shuffle: bool = True,
+    ):
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.device = torch.device(device)
+        self.shuffle = shuffle
+        self.generator = torch.Generator()
+        if seed is not None:
+            self.generator.manual_seed(seed)
+        else:
+            self.generator.seed()
+
+        self.multicomponent = isinstance(dataset, MulticomponentDataset)
+        data = [dataset[i] for i in range(len(dataset))]
+        datass = list(zip(*data)) if self.multicomponent else [data]
+        self._graphs = [_PackedMolGraphs(data, self.device) for data in datass]
+
+        _, _, x_ds, ys, weights, lt_masks, gt_masks = zip(*datass[0])
+        self.X_d = None if x_ds[0] is None else self._pack(np.array(x_ds)).float()
+        self.Y = None if ys[0] is None else self._pack(np.array(ys)).float()
+        self.w = self._pack(np.array(weights, dtype=np.single)).unsqueeze(1)
+        self.lt_mask = None if lt_masks[0] is None else self._pack(np.array(lt_masks))
+        self.gt_mask = None if gt_masks[0] is None else self._pack(np.array(gt_masks))
+
+        if len(dataset) % batch_size == 1:
+            logger.warning(
+                f"Dropping last batch of size 1 to avoid issues with batch normalization \
+(dataset size = {len(dataset)}, batch_size = {batch_size})"
+            )
+            self.drop_last = True
+        else:
+            self.drop_last = False
+
+    def _pack(self, X: np.ndarray) -> Tensor:
+        return torch.from_numpy(X).to(self.device)
+
+    def __len__(self) -> int:
+        n_batches, remainder = divmod(len(self.dataset), self.batch_size)
+
+        return n_batches + int(remainder > 0 and not self.drop_last)
+
+    def __iter__(self) -> Iterator[TrainingBatch | MulticomponentTrainingBatch]:
+        if self.shuffle:
+            idxs = torch.randperm(len(self.dataset), generator=self.generator).to(self.device)
+        else:
+            idxs = torch.arange(len(self.dataset), device=self.device)
+
+        for i in range(len(self)):
+            yield self._collate(idxs[i * self.batch_size : (i + 1) * self.batch_size])
+
+    def _collate(self, idxs: Tensor) -> TrainingBatch | MulticomponentTrainingBatch:
+        bmgs, V_ds = zip(*[graphs[idxs] for graphs in self._graphs])
+
+        X_d = None if self.X_d is None else self.X_d[idxs]
+        Y = None if self.Y is None else self.Y[idxs]
+        lt_mask = None if self.lt_mask is None else self.lt_mask[idxs]
+        gt_mask = None if self.gt_mask is None else self.gt_mask[idxs]
+
+        if self.multicomponent:
+            return MulticomponentTrainingBatch(
+                list(bmgs), list(V_ds), X_d, Y, self.w[idxs], lt_mask, gt_mask
+            )
+
+        return TrainingBatch(bmgs[0], V_ds[0], X_d, Y, self.w[idxs], lt_mask, gt_mask)
+
+
+class _PackedMolGraphs:
+    """The :class:`~chemprop.data.molgraph.MolGraph`\s and atom descriptors of a dataset, packed
+    into contiguous tensors along with the offsets of each individual graph"""
+
+    def __init__(self, data: Sequence[Datum], device: torch.device):
+        mgs, V_ds = zip(*[(d.mg, d.V_d) for d in data])
+
+        self.V = torch.from_numpy(np.concatenate([mg.V for mg in mgs])).float().to(device)
+        self.E = torch.from_numpy(np.concatenate([mg.E for mg in mgs])).float().to(device)
+        self.edge_index = torch.from_numpy(np.hstack([mg.edge_index for mg in mgs])).long()
+        self.edge_index = self.edge_index.to(device)
+        self.rev_edge_index = torch.from_numpy(np.concatenate([mg.rev_edge_index for mg in mgs]))
+        self.rev_edge_index = self.rev_edge_index.long().to(device)
+        self.V_d = (
+            None if V_ds[0] is None else torch.from_numpy(np.concatenate(V_ds)).float().to(device)
+        )
+
+        self.n_atoms = torch.tensor([len(mg.V) for mg in mgs], device=device)
+        self.n_edges = torch.tensor([mg.edge_index.shape[1] for mg in mgs], device=device)
+        self.atom_offsets = self.n_atoms.cumsum(0) - self.n_atoms
+        self.edge_offsets = self.n_edges.cumsum(0) - self.n_edges
+
+    def __getitem__(self, idxs: Tensor) -> tuple[BatchMolGraph, Tensor | None]:
+        """Gather the graphs at the given indices into a single :class:`BatchMolGraph` and the
+        corresponding atom descriptors, if any."""
+        batch, atom_idxs, atom_starts = _gather_segments(self.n_atoms, self.atom_offsets, idxs)
+        edge_batch, edge_idxs, edge_starts = _gather_segments(self.n_edges, self.edge_offsets, idxs)
+
+        bmg = BatchMolGraph.from_tensors(
+            self.V[atom_idxs],
+            self.E[edge_idxs],
+            self.edge_index[:, edge_idxs] + atom_starts[edge_batch],
+            self.rev_edge_index[edge_idxs] + edge_starts[edge_batch],
+            batch,
+            len(idxs),
+        )
+        V_d = None if self.V_d is None else self.V_d[atom_idxs]
+
+        return bmg, V_d
+
+
+def _gather_segments(sizes: Tensor, offsets: Tensor, idxs: Tensor) -> tuple[Tensor, Tensor, Tensor]:
+    """Calculate the indices of the elements of the selected segments of a packed tensor
+
+    Returns
+    -------
+    Tensor
+        the position in ``idxs`` of the segment of each selected element
+    Tensor
+        the index in the packed tensor of each selected element
+    Tensor
+        the starting index of each selected segment in the gathered tensor
+    """
+    sizes = sizes[idxs]
+    starts = sizes.cumsum(0) - sizes
+    segment_ids = torch.repeat_interleave(torch.arange(len(idxs), device=idxs.device), sizes)
+    positions = torch.arange(len(segment_ids), device=idxs.device) - starts[segment_ids]
+
+    return segment_ids, offsets[idxs][segment_ids] + positions, starts
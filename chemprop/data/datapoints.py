@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import lru_cache
 
 import numpy as np
 from rdkit.Chem import AllChem as Chem
@@ -10,6 +11,14 @@ from chemprop.utils import make_mol
 
 MoleculeFeaturizer = Featurizer[Chem.Mol, np.ndarray]
 
+MOL_CACHE_SIZE = 4096
+"""the maximum number of molecules held by the cache of :class:`LazyMoleculeDatapoint`\s"""
+
+
+@lru_cache(maxsize=MOL_CACHE_SIZE)
+def _make_mol_cached(smi: str, keep_h: bool, add_h: bool) -> Chem.Mol:
+    return make_mol(smi, keep_h, add_h)
+
 
 @dataclass(slots=True)
 class _DatapointMixin:
@@ -58,8 +67,8 @@ class _MoleculeDatapointMixin:
 
 
 @dataclass
-class MoleculeDatapoint(_DatapointMixin, _MoleculeDatapointMixin):
-    """A :class:`MoleculeDatapoint` contains a single molecule and its associated features and targets."""
+class _MoleculeFeaturesMixin:
+    """A mixin class for the atom- and bond-level features and descriptors of a molecule"""
 
     V_f: np.ndarray | None = None
     """a numpy array of shape ``V x d_vf``, where ``V`` is the number of atoms in the molecule, and
@@ -85,6 +94,52 @@ class MoleculeDatapoint(_DatapointMixin, _MoleculeDatapointMixin):
 
         super().__post_init__()
 
+
+@dataclass
+class MoleculeDatapoint(_MoleculeFeaturesMixin, _DatapointMixin, _MoleculeDatapointMixin):
+    """A :class:`MoleculeDatapoint` contains a single molecule and its associated features and targets."""
+
+    def __len__(self) -> int:
+        return 1
+
+
+@dataclass
+class _LazyMoleculeDatapointMixin:
+    smi: str
+    """the SMILES string of the molecule associated with this datapoint"""
+    keep_h: bool = field(default=False, kw_only=True)
+    """whether to keep hydrogens specified in :attr:`smi` when building the molecule"""
+    add_h: bool = field(default=False, kw_only=True)
+    """whether to add hydrogens when building the molecule"""
+
+    @property
+    def mol(self) -> Chem.Mol:
+        """the molecule associated with this datapoint, built from :attr:`smi` upon access"""
+        return _make_mol_cached(self.smi, self.keep_h, self.add_h)
+
+    @classmethod
+    def from_smi(
+        cls, smi: str, *args, keep_h: bool = False, add_h: bool = False, **kwargs
+    ) -> _LazyMoleculeDatapointMixin:
+        kwargs["name"] = smi if "name" not in kwargs else kwargs["name"]
+
+        return cls(smi, *args, keep_h=keep_h, add_h=add_h, **kwargs)
+
+
+@dataclass
+class LazyMoleculeDatapoint(_MoleculeFeaturesMixin, _DatapointMixin, _LazyMoleculeDatapointMixin):
+    """A :class:`LazyMoleculeDatapoint` is a :class:`MoleculeDatapoint` that stores only the SMILES
+    string of its molecule.
+
+    The RDKit molecule is rebuilt each time :attr:`mol` is accessed, and the most recently built
+    molecules are kept in a bounded LRU cache of size :data:`MOL_CACHE_SIZE` that is shared by all
+    instances. This trades some featurization time for a much smaller memory footprint and faster
+    pickling (e.g., when sending a dataset to :class:`~torch.utils.data.DataLoader` workers).
+
+    .. note::
+        Invalid SMILES are only detected once :attr:`mol` is first accessed.
+    """
+
     def __len__(self) -> int:
         return 1
 
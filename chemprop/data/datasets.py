@@ -1,5 +1,9 @@
-from dataclasses import dataclass, field
+from collections.abc import Sequence
+from dataclasses import dataclass, field, fields
 from functools import cached_property
+from os import PathLike
+from pathlib import Path
+import pickle
 from typing import NamedTuple, TypeAlias
 
 import numpy as np
@@ -9,11 +13,15 @@ from rdkit.Chem import Mol
 from sklearn.preprocessing import StandardScaler
 from torch.utils.data import Dataset
 
-from chemprop.data.datapoints import MoleculeDatapoint, ReactionDatapoint
+from chemprop.data.datapoints import LazyMoleculeDatapoint, MoleculeDatapoint, ReactionDatapoint
 from chemprop.data.molgraph import MolGraph
 from chemprop.featurizers.base import Featurizer
 from chemprop.featurizers.molgraph import CGRFeaturizer, SimpleMoleculeMolGraphFeaturizer
-from chemprop.featurizers.molgraph.cache import MolGraphCache, MolGraphCacheOnTheFly
+from chemprop.featurizers.molgraph.cache import (
+    MolGraphCache,
+    MolGraphCacheLRU,
+    MolGraphCacheOnTheFly,
+)
 from chemprop.types import Rxn
 
 
@@ -32,6 +40,21 @@ class Datum(NamedTuple):
 MolGraphDataset: TypeAlias = Dataset[Datum]
 
 
+class _MolsView(Sequence[Chem.Mol]):
+    """A read-only view of the molecules of a sequence of datapoints that only accesses the
+    ``mol`` attribute of a datapoint upon indexing. This allows molecules of
+    :class:`LazyMoleculeDatapoint`\s to be built on-the-fly during featurization."""
+
+    def __init__(self, data: Sequence[MoleculeDatapoint | LazyMoleculeDatapoint]):
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, idx: int) -> Chem.Mol:
+        return self.data[idx].mol
+
+
 class _MolGraphDatasetMixin:
     def __len__(self) -> int:
         return len(self.data)
@@ -154,17 +177,23 @@ class MoleculeDataset(_MolGraphDatasetMixin, MolGraphDataset):
     and parallelized across multiple workers via the :class:`~torch.utils.data
     DataLoader` class. However, for small datasets, it may be more efficient to
     featurize the data in advance and cache the results. This can be done by
-    setting ``MoleculeDataset.cache=True``.
+    setting ``MoleculeDataset.cache=True``. Alternatively, setting
+    ``MoleculeDataset.cache_budget`` to a number of bytes will cache the featurized data as it is
+    requested, up to the given budget.
+
+    For very large datasets, the data may instead be composed of
+    :class:`LazyMoleculeDatapoint`\s, which store only SMILES strings. Their molecules are then
+    built only when they are featurized.
 
     Parameters
     ----------
-    data : Iterable[MoleculeDatapoint]
+    data : Iterable[MoleculeDatapoint | LazyMoleculeDatapoint]
         the data from which to create a dataset
     featurizer : MoleculeFeaturizer
         the featurizer with which to generate MolGraphs of the molecules
     """
 
-    data: list[MoleculeDatapoint]
+    data: list[MoleculeDatapoint | LazyMoleculeDatapoint]
     featurizer: Featurizer[Mol, MolGraph] = field(default_factory=SimpleMoleculeMolGraphFeaturizer)
 
     def __post_init__(self):
@@ -172,6 +201,7 @@ class MoleculeDataset(_MolGraphDatasetMixin, MolGraphDataset):
             raise ValueError("Data cannot be None!")
 
         self.reset()
+        self.__cache_budget = None
         self.cache = False
 
     def __getitem__(self, idx: int) -> Datum:
@@ -189,11 +219,27 @@ class MoleculeDataset(_MolGraphDatasetMixin, MolGraphDataset):
         self.__cache = cache
         self._init_cache()
 
+    @property
+    def cache_budget(self) -> int | None:
+        """the maximum number of bytes of featurized data to cache as it is requested. Only used if
+        :attr:`cache` is ``False``"""
+        return self.__cache_budget
+
+    @cache_budget.setter
+    def cache_budget(self, cache_budget: int | None = None):
+        self.__cache_budget = cache_budget
+        self._init_cache()
+
     def _init_cache(self):
         """initialize the cache"""
-        self.mg_cache = (MolGraphCache if self.cache else MolGraphCacheOnTheFly)(
-            self.mols, self.V_fs, self.E_fs, self.featurizer
-        )
+        args = (_MolsView(self.data), self.V_fs, self.E_fs, self.featurizer)
+
+        if self.cache:
+            self.mg_cache = MolGraphCache(*args)
+        elif self.cache_budget is not None:
+            self.mg_cache = MolGraphCacheLRU(*args, self.cache_budget)
+        else:
+            self.mg_cache = MolGraphCacheOnTheFly(*args)
 
     @property
     def smiles(self) -> list[str]:
@@ -324,7 +370,7 @@ class ReactionDataset(_MolGraphDatasetMixin, MolGraphDataset):
     .. note::
         The featurized data provided by this class may be cached, simlar to a
         :class:`MoleculeDataset`. To enable the cache, set ``ReactionDataset
-        cache=True``.
+        cache=True``. To cache data up to a budget in bytes, set ``ReactionDataset.cache_budget``.
     """
 
     data: list[ReactionDatapoint]
@@ -337,6 +383,7 @@ class ReactionDataset(_MolGraphDatasetMixin, MolGraphDataset):
             raise ValueError("Data cannot be None!")
 
         self.reset()
+        self.__cache_budget = None
         self.cache = False
 
     @property
@@ -346,9 +393,29 @@ class ReactionDataset(_MolGraphDatasetMixin, MolGraphDataset):
     @cache.setter
     def cache(self, cache: bool = False):
         self.__cache = cache
-        self.mg_cache = (MolGraphCache if cache else MolGraphCacheOnTheFly)(
-            self.mols, [None] * len(self), [None] * len(self), self.featurizer
-        )
+        self._init_cache()
+
+    @property
+    def cache_budget(self) -> int | None:
+        """the maximum number of bytes of featurized data to cache as it is requested. Only used if
+        :attr:`cache` is ``False``"""
+        return self.__cache_budget
+
+    @cache_budget.setter
+    def cache_budget(self, cache_budget: int | None = None):
+        self.__cache_budget = cache_budget
+        self._init_cache()
+
+    def _init_cache(self):
+        """initialize the cache"""
+        args = (self.mols, [None] * len(self), [None] * len(self), self.featurizer)
+
+        if self.cache:
+            self.mg_cache = MolGraphCache(*args)
+        elif self.cache_budget is not None:
+            self.mg_cache = MolGraphCacheLRU(*args, self.cache_budget)
+        else:
+            self.mg_cache = MolGraphCacheOnTheFly(*args)
 
     def __getitem__(self, idx: int) -> Datum:
         d = self.data[idx]
@@ -377,12 +444,336 @@ class ReactionDataset(_MolGraphDatasetMixin, MolGraphDataset):
         return 0
 
 
+@dataclass(repr=False, eq=False)
+class SubsetDataset(_MolGraphDatasetMixin, MolGraphDataset):
+    """A :class:`SubsetDataset` is a view of a subset of a :class:`MoleculeDataset` or
+    :class:`ReactionDataset` given by the indices of its datapoints.
+
+    The featurized data of the parent dataset (including its cache) are shared by all of its
+    subsets, so splitting a dataset into subsets, e.g., for multiple replicates, doesn't duplicate
+    any featurization. Setting :attr:`cache` or :attr:`cache_budget` of a subset enables the
+    respective cache of the parent dataset. Each subset has its own targets and extra and atom
+    descriptors, which may be normalized independently of the parent dataset and of other subsets.
+
+    .. note::
+        The graphs of the parent dataset contain its raw atom and bond features. If the atom or bond
+        features of a subset have been normalized, the extra feature columns of each graph are
+        replaced with the normalized features of the subset when the graph is requested, so the
+        graphs are still featurized only once.
+
+    Parameters
+    ----------
+    dataset : MoleculeDataset | ReactionDataset
+        the parent dataset
+    indices : Sequence[int]
+        the indices of the datapoints of the parent dataset in this subset
+    """
+
+    dataset: MoleculeDataset | ReactionDataset
+    indices: Sequence[int]
+
+    def __post_init__(self):
+        if isinstance(self.dataset, SubsetDataset):
+            self.indices = [self.dataset.indices[i] for i in self.indices]
+            self.dataset = self.dataset.dataset
+
+        self.data = [self.dataset.data[i] for i in self.indices]
+        self._molecular = isinstance(self.dataset, MoleculeDataset)
+        self._scaled_V_fs = False
+        self._scaled_E_fs = False
+
+        self.reset()
+        self.__cache_budget = None
+        self.cache = False
+
+    def __getitem__(self, idx: int) -> Datum:
+        d = self.data[idx]
+        mg = self.dataset.mg_cache[self.indices[idx]]
+        if self._scaled_V_fs and self.d_vf > 0:
+            mg = mg._replace(V=np.hstack((mg.V[:, : -self.d_vf], self.V_fs[idx])))
+        if self._scaled_E_fs and self.d_ef > 0:
+            # each bond is featurized as two consecutive directed edges
+            E_f = np.repeat(self.E_fs[idx], 2, axis=0).astype(np.single)
+            mg = mg._replace(E=np.hstack((mg.E[:, : -self.d_ef], E_f)))
+
+        return Datum(mg, self.V_ds[idx], self.X_d[idx], self.Y[idx], d.weight, d.lt_mask, d.gt_mask)
+
+    @property
+    def featurizer(self) -> Featurizer:
+        return self.dataset.featurizer
+
+    @property
+    def cache(self) -> bool:
+        return self.__cache
+
+    @cache.setter
+    def cache(self, cache: bool = False):
+        self.__cache = cache
+        self._init_cache()
+
+    @property
+    def cache_budget(self) -> int | None:
+        """the maximum number of bytes of featurized data to cache as it is requested. Only used if
+        :attr:`cache` is ``False``"""
+        return self.__cache_budget
+
+    @cache_budget.setter
+    def cache_budget(self, cache_budget: int | None = None):
+        self.__cache_budget = cache_budget
+        self._init_cache()
+
+    def _init_cache(self):
+        """initialize the cache of the parent dataset"""
+        if self.cache and not self.dataset.cache:
+            self.dataset.cache = True
+        elif self.cache_budget is not None and self.dataset.cache_budget is None:
+            self.dataset.cache_budget = self.cache_budget
+
+    @property
+    def smiles(self) -> list[str] | list[tuple]:
+        if self._molecular:
+            return [Chem.MolToSmiles(d.mol) for d in self.data]
+
+        return [(Chem.MolToSmiles(d.rct), Chem.MolToSmiles(d.pdt)) for d in self.data]
+
+    @property
+    def mols(self) -> list[Chem.Mol] | list[Rxn]:
+        if self._molecular:
+            return [d.mol for d in self.data]
+
+        return [(d.rct, d.pdt) for d in self.data]
+
+    @property
+    def _V_fs(self) -> list[np.ndarray | None]:
+        """the raw atom features of the subset"""
+        return [d.V_f if self._molecular else None for d in self.data]
+
+    @property
+    def V_fs(self) -> list[np.ndarray | None]:
+        """the (scaled) atom features of the subset"""
+        return self.__V_fs
+
+    @V_fs.setter
+    def V_fs(self, V_fs: list[np.ndarray]):
+        self._validate_attribute(V_fs, "atom features")
+
+        self.__V_fs = V_fs
+        self._scaled_V_fs = True
+
+    @property
+    def _E_fs(self) -> list[np.ndarray | None]:
+        """the raw bond features of the subset"""
+        return [d.E_f if self._molecular else None for d in self.data]
+
+    @property
+    def E_fs(self) -> list[np.ndarray | None]:
+        """the (scaled) bond features of the subset"""
+        return self.__E_fs
+
+    @E_fs.setter
+    def E_fs(self, E_fs: list[np.ndarray]):
+        self._validate_attribute(E_fs, "bond features")
+
+        self.__E_fs = E_fs
+        self._scaled_E_fs = True
+
+    @property
+    def _V_ds(self) -> list[np.ndarray | None]:
+        """the raw atom descriptors of the subset"""
+        return [d.V_d if self._molecular else None for d in self.data]
+
+    @property
+    def V_ds(self) -> list[np.ndarray | None]:
+        """the (scaled) atom descriptors of the subset"""
+        return self.__V_ds
+
+    @V_ds.setter
+    def V_ds(self, V_ds: list[np.ndarray]):
+        self._validate_attribute(V_ds, "atom descriptors")
+
+        self.__V_ds = V_ds
+
+    @property
+    def d_vf(self) -> int:
+        """the extra atom feature dimension, if any"""
+        return 0 if self.V_fs[0] is None else self.V_fs[0].shape[1]
+
+    @property
+    def d_ef(self) -> int:
+        """the extra bond feature dimension, if any"""
+        return 0 if self.E_fs[0] is None else self.E_fs[0].shape[1]
+
+    @property
+    def d_vd(self) -> int:
+        """the extra atom descriptor dimension, if any"""
+        return 0 if self.V_ds[0] is None else self.V_ds[0].shape[1]
+
+    # the attributes used to normalize the inputs of a subset are the same as those of a
+    # `MoleculeDataset`, and the features of reactions are all empty
+    normalize_inputs = MoleculeDataset.normalize_inputs
+
+    def reset(self):
+        """Reset the atom and bond features; atom and extra descriptors; and targets of each
+        datapoint to their initial, unnormalized values"""
+        super().reset()
+        self.__V_fs = self._V_fs
+        self.__E_fs = self._E_fs
+        self.__V_ds = self._V_ds
+        self._scaled_V_fs = False
+        self._scaled_E_fs = False
+
+
+@dataclass(repr=False, eq=False)
+class PackedDataset(MolGraphDataset):
+    """A :class:`PackedDataset` stores the featurized data of a :class:`MoleculeDataset`,
+    :class:`ReactionDataset`, or :class:`SubsetDataset` in a few contiguous arrays.
+
+    The :class:`~chemprop.data.molgraph.MolGraph` of each datapoint is a set of views into these
+    arrays, so a :class:`PackedDataset` holds no Python objects per datapoint. This makes it cheap
+    to pickle and allows it to be shared between processes without copying, e.g., via the Ray
+    object store, which maps the arrays of a pickled object directly from shared memory.
+
+    .. note::
+        A :class:`PackedDataset` is read-only: its data are packed as-is, so any normalization must
+        be performed on the source dataset *before* packing it. The arrays of a dataset shared
+        through the Ray object store are not writeable.
+
+    Parameters
+    ----------
+    V, E : np.ndarray
+        the atom and bond features of all graphs, concatenated
+    edge_index, rev_edge_index : np.ndarray
+        the edges and reverse edges of all graphs, concatenated. Indices are local to each graph.
+    atom_offsets, edge_offsets : np.ndarray
+        arrays of length ``n + 1`` containing the offsets of the atoms and edges of each graph
+    V_d : np.ndarray | None
+        the atom descriptors of all graphs, concatenated, if any
+    X_d, Y, weights, lt_mask, gt_mask : np.ndarray | None
+        the extra descriptors, targets, weights, and bound masks of each datapoint
+    featurizer : Featurizer
+        the featurizer with which the source dataset was featurized
+    """
+
+    V: np.ndarray
+    E: np.ndarray
+    edge_index: np.ndarray
+    rev_edge_index: np.ndarray
+    atom_offsets: np.ndarray
+    edge_offsets: np.ndarray
+    V_d: np.ndarray | None
+    X_d: np.ndarray | None
+    Y: np.ndarray | None
+    weights: np.ndarray
+    lt_mask: np.ndarray | None
+    gt_mask: np.ndarray | None
+    featurizer: Featurizer
+
+    @classmethod
+    def from_dataset(cls, dataset: MoleculeDataset | ReactionDataset | SubsetDataset):
+        """Featurize each datapoint of the given dataset and pack the results"""
+        data = [dataset[i] for i in range(len(dataset))]
+        mgs = [d.mg for d in data]
+
+        n_atoms = [len(mg.V) for mg in mgs]
+        n_edges = [mg.edge_index.shape[1] for mg in mgs]
+        V_ds = [d.V_d for d in data]
+
+        return cls(
+            V=np.concatenate([mg.V for mg in mgs]),
+            E=np.concatenate([mg.E for mg in mgs]),
+            edge_index=np.hstack([mg.edge_index for mg in mgs]),
+            rev_edge_index=np.concatenate([mg.rev_edge_index for mg in mgs]),
+            atom_offsets=np.concatenate(([0], np.cumsum(n_atoms))),
+            edge_offsets=np.concatenate(([0], np.cumsum(n_edges))),
+            V_d=None if V_ds[0] is None else np.concatenate(V_ds),
+            X_d=None if data[0].x_d is None else np.array([d.x_d for d in data]),
+            Y=None if data[0].y is None else np.array([d.y for d in data], float),
+            weights=np.array([d.weight for d in data], float),
+            lt_mask=None if data[0].lt_mask is None else np.array([d.lt_mask for d in data]),
+            gt_mask=None if data[0].gt_mask is None else np.array([d.gt_mask for d in data]),
+            featurizer=dataset.featurizer,
+        )
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def __getitem__(self, idx: int) -> Datum:
+        a0, a1 = self.atom_offsets[idx], self.atom_offsets[idx + 1]
+        e0, e1 = self.edge_offsets[idx], self.edge_offsets[idx + 1]
+
+        mg = MolGraph(
+            self.V[a0:a1], self.E[e0:e1], self.edge_index[:, e0:e1], self.rev_edge_index[e0:e1]
+        )
+        V_d = None if self.V_d is None else self.V_d[a0:a1]
+
+        return Datum(
+            mg,
+            V_d,
+            None if self.X_d is None else self.X_d[idx],
+            None if self.Y is None else self.Y[idx],
+            self.weights[idx],
+            None if self.lt_mask is None else self.lt_mask[idx],
+            None if self.gt_mask is None else self.gt_mask[idx],
+        )
+
+    @property
+    def d_xd(self) -> int:
+        """the extra molecule descriptor dimension, if any"""
+        return 0 if self.X_d is None else self.X_d.shape[1]
+
+    @property
+    def d_vd(self) -> int:
+        """the extra atom descriptor dimension, if any"""
+        return 0 if self.V_d is None else self.V_d.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """the total number of bytes of the packed arrays"""
+        return sum(X.nbytes for X in self._arrays().values() if X is not None)
+
+    def save(self, path: PathLike):
+        """Save this dataset to the directory ``path`` as one ``.npy`` file per array"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        for name, X in self._arrays().items():
+            if X is not None:
+                np.save(path / f"{name}.npy", X)
+        with open(path / "featurizer.pkl", "wb") as f:
+            pickle.dump(self.featurizer, f)
+
+    @classmethod
+    def load(cls, path: PathLike, mmap: bool = True) -> "PackedDataset":
+        """Load a dataset saved with :meth:`save`. If ``mmap`` is ``True``, the arrays are
+        memory-mapped read-only, so all processes that load the same dataset share a single copy
+        of it in the page cache."""
+        path = Path(path)
+        mmap_mode = "r" if mmap else None
+
+        arrays = {
+            f.name: (
+                np.load(path / f"{f.name}.npy", mmap_mode)
+                if (path / f"{f.name}.npy").exists()
+                else None
+            )
+            for f in fields(cls)
+            if f.name != "featurizer"
+        }
+        with open(path / "featurizer.pkl", "rb") as f:
+            featurizer = pickle.load(f)
+
+        return cls(**arrays, featurizer=featurizer)
+
+    def _arrays(self) -> dict[str, np.ndarray | None]:
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.name != "featurizer"}
+
+
 @dataclass(repr=False, eq=False)
 class MulticomponentDataset(_MolGraphDatasetMixin, Dataset):
     """A :class:`MulticomponentDataset` is a :class:`Dataset` composed of parallel
     :class:`MoleculeDatasets` and :class:`ReactionDataset`\s"""
 
-    datasets: list[MoleculeDataset | ReactionDataset]
+    datasets: list[MoleculeDataset | ReactionDataset | SubsetDataset | PackedDataset]
     """the parallel datasets"""
 
     def __post_init__(self):
@@ -423,7 +814,7 @@ class MulticomponentDataset(_MolGraphDatasetMixin, Dataset):
             case None:
                 return [
                     dset.normalize_inputs(key)
-                    if isinstance(dset, MoleculeDataset) or key in RXN_VALID_KEYS
+                    if isinstance(dset, (MoleculeDataset, SubsetDataset)) or key in RXN_VALID_KEYS
                     else None
                     for dset in self.datasets
                 ]
@@ -434,7 +825,7 @@ class MulticomponentDataset(_MolGraphDatasetMixin, Dataset):
 
                 return [
                     dset.normalize_inputs(key, s)
-                    if isinstance(dset, MoleculeDataset) or key in RXN_VALID_KEYS
+                    if isinstance(dset, (MoleculeDataset, SubsetDataset)) or key in RXN_VALID_KEYS
                     else None
                     for dset, s in zip(self.datasets, scaler)
                 ]
@@ -457,3 +848,14 @@ class MulticomponentDataset(_MolGraphDatasetMixin, Dataset):
     @property
     def d_vd(self) -> list[int]:
         return sum(dset.d_vd for dset in self.datasets)
+
+
+def pack_dataset(
+    dataset: MoleculeDataset | ReactionDataset | SubsetDataset | MulticomponentDataset,
+) -> PackedDataset | MulticomponentDataset:
+    """Pack the featurized data of a dataset into a :class:`PackedDataset`. The components of a
+    :class:`MulticomponentDataset` are packed individually."""
+    if isinstance(dataset, MulticomponentDataset):
+        return MulticomponentDataset([PackedDataset.from_dataset(d) for d in dataset.datasets])
+
+    return PackedDataset.from_dataset(dataset)
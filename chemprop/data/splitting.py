@@ -1,19 +1,43 @@
 from collections.abc import Iterable, Sequence
-import copy
+from concurrent.futures import ProcessPoolExecutor
 from enum import auto
 import logging
+import warnings
 
 from astartes import train_test_split, train_val_test_split
 from astartes.molecules import train_test_split_molecules, train_val_test_split_molecules
+from astartes.utils.fast_kennard_stone import fast_kennard_stone
+from astartes.utils.warnings import ImperfectSplittingWarning, NormalizationWarning
 import numpy as np
 from rdkit import Chem
-
-from chemprop.data.datapoints import MoleculeDatapoint, ReactionDatapoint
+from rdkit.Chem.Scaffolds import MurckoScaffold
+from scipy import sparse
+from sklearn.cluster import MiniBatchKMeans
+
+from chemprop.data.datapoints import LazyMoleculeDatapoint, MoleculeDatapoint, ReactionDatapoint
+from chemprop.data.datasets import (
+    MoleculeDataset,
+    MulticomponentDataset,
+    ReactionDataset,
+    SubsetDataset,
+)
+from chemprop.featurizers.molecule import MorganBinaryFeaturizer
 from chemprop.utils.utils import EnumMapping
 
 logger = logging.getLogger(__name__)
 
-Datapoints = Sequence[MoleculeDatapoint] | Sequence[ReactionDatapoint]
+KS_SAMPLE_SIZE = 2000
+"""the number of molecules on which the approximate Kennard-Stone split runs the exact algorithm"""
+KMEANS_MAX_CLUSTERS = 1000
+"""the maximum number of clusters used by the mini-batch k-means split"""
+KMEANS_BATCH_SIZE = 4096
+"""the number of molecules in each mini-batch of the mini-batch k-means split"""
+DISTANCE_CHUNK_SIZE = 1024
+"""the number of rows of a distance matrix calculated at once"""
+
+Datapoints = (
+    Sequence[MoleculeDatapoint] | Sequence[LazyMoleculeDatapoint] | Sequence[ReactionDatapoint]
+)
 MulticomponentDatapoints = Sequence[Datapoints]
 
 
@@ -23,6 +47,8 @@ class SplitType(EnumMapping):
     RANDOM = auto()
     KENNARD_STONE = auto()
     KMEANS = auto()
+    KENNARD_STONE_APPROX = auto()
+    KMEANS_MINIBATCH = auto()
 
 
 def make_split_indices(
@@ -32,6 +58,7 @@ def make_split_indices(
     seed: int = 0,
     num_replicates: int = 1,
     num_folds: None = None,
+    num_workers: int = 0,
 ) -> tuple[list[list[int]], ...]:
     """Splits data into training, validation, and test splits.
 
@@ -50,6 +77,9 @@ def make_split_indices(
         Number of replicates, by default 1
     num_folds : None, optional
         This argument was removed in v2.1 - use `num_replicates` instead.
+    num_workers : int, optional
+        The number of worker processes used to calculate scaffolds for scaffold splitting, where 0
+        means sequential, by default 0
 
     Returns
     -------
@@ -93,43 +123,44 @@ def make_split_indices(
         astartes_kwargs["val_size"] = sizes[1]
 
     n_datapoints = len(mols)
+    split = SplitType.get(split)
+    if split == SplitType.RANDOM_WITH_REPEATED_SMILES:
+        # group the indices of identical smiles once and reuse the grouping for each replicate
+        smis = [Chem.MolToSmiles(mol) for mol in mols]
+        group_order, group_offsets = _group_indices(smis)
+    elif split == SplitType.SCAFFOLD_BALANCED:
+        # the scaffolds are the same for each replicate, so only calculate them once
+        scaffolds = _make_scaffolds(mols, num_workers)
+        group_order, group_offsets = _group_indices(scaffolds)
+        if "" in scaffolds:
+            logger.warning(
+                f"No matching scaffold was found for {scaffolds.count('')} molecules. These will "
+                "be grouped together."
+            )
+    elif split in (SplitType.KENNARD_STONE_APPROX, SplitType.KMEANS_MINIBATCH):
+        fps = _make_packed_fingerprints(mols)
+
     train_replicates, val_replicates, test_replicates = [], [], []
     for _ in range(num_replicates):
         train, val, test = None, None, None
-        match SplitType.get(split):
+        match split:
             case SplitType.SCAFFOLD_BALANCED:
-                mols_without_atommaps = []
-                for mol in mols:
-                    copied_mol = copy.deepcopy(mol)
-                    for atom in copied_mol.GetAtoms():
-                        atom.SetAtomMapNum(0)
-                    mols_without_atommaps.append(copied_mol)
-                result = mol_split_fun(
-                    np.array(mols_without_atommaps), sampler="scaffold", **astartes_kwargs
+                train, val, test = _group_split(
+                    group_order, group_offsets, sizes, astartes_kwargs["random_state"]
                 )
-                train, val, test = _unpack_astartes_result(result, include_val)
 
             # Use to constrain data with the same smiles go in the same split.
             case SplitType.RANDOM_WITH_REPEATED_SMILES:
-                # get two arrays: one of all the smiles strings, one of just the unique
-                all_smiles = np.array([Chem.MolToSmiles(mol) for mol in mols])
-                unique_smiles = np.unique(all_smiles)
-
-                # save a mapping of smiles -> all the indices that it appeared at
-                smiles_indices = {}
-                for smiles in unique_smiles:
-                    smiles_indices[smiles] = np.where(all_smiles == smiles)[0].tolist()
-
                 # randomly split the unique smiles
                 result = split_fun(
-                    np.arange(len(unique_smiles)), sampler="random", **astartes_kwargs
+                    np.arange(len(group_offsets) - 1), sampler="random", **astartes_kwargs
                 )
                 train_idxs, val_idxs, test_idxs = _unpack_astartes_result(result, include_val)
 
-                # convert these to the 'actual' indices from the original list using the dict we made
-                train = sum((smiles_indices[unique_smiles[i]] for i in train_idxs), [])
-                val = sum((smiles_indices[unique_smiles[j]] for j in val_idxs), [])
-                test = sum((smiles_indices[unique_smiles[k]] for k in test_idxs), [])
+                # convert these to the 'actual' indices from the original list
+                train = _expand_groups(train_idxs, group_order, group_offsets)
+                val = _expand_groups(val_idxs, group_order, group_offsets)
+                test = _expand_groups(test_idxs, group_order, group_offsets)
 
             case SplitType.RANDOM:
                 result = split_fun(np.arange(n_datapoints), sampler="random", **astartes_kwargs)
@@ -157,6 +188,17 @@ def make_split_indices(
                 )
                 train, val, test = _unpack_astartes_result(result, include_val)
 
+            case SplitType.KENNARD_STONE_APPROX:
+                order = _approx_kennard_stone(fps, astartes_kwargs["random_state"])
+                train, val, test = _ordered_split(order, sizes)
+
+            case SplitType.KMEANS_MINIBATCH:
+                labels = _minibatch_kmeans(fps, astartes_kwargs["random_state"])
+                group_order, group_offsets = _group_indices(labels)
+                train, val, test = _group_split(
+                    group_order, group_offsets, sizes, astartes_kwargs["random_state"]
+                )
+
             case _:
                 raise RuntimeError("Unreachable code reached!")
         train_replicates.append(train)
@@ -166,6 +208,317 @@ def make_split_indices(
     return train_replicates, val_replicates, test_replicates
 
 
+def _group_indices(keys: Sequence) -> tuple[np.ndarray, np.ndarray]:
+    """Group the indices of identical keys together in linear time (after sorting).
+
+    Groups are numbered in the sorted order of their unique keys, and the indices of each group
+    are in ascending order.
+
+    Parameters
+    ----------
+    keys : Sequence
+        the key of each datapoint (e.g., its SMILES or scaffold)
+
+    Returns
+    -------
+    order : np.ndarray
+        the indices of the datapoints sorted by group
+    offsets : np.ndarray
+        an array of shape ``G + 1``, where ``G`` is the number of groups, such that the indices of
+        the ``i``-th group are ``order[offsets[i] : offsets[i + 1]]``
+    """
+    _, inverse, counts = np.unique(np.asarray(keys), return_inverse=True, return_counts=True)
+    order = np.argsort(inverse.ravel(), kind="stable")
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    return order, offsets
+
+
+def _expand_groups(groups: Sequence[int], order: np.ndarray, offsets: np.ndarray) -> list[int]:
+    """Get the indices of all datapoints in the given groups, in the order of the groups. See
+    :func:`_group_indices` for a description of ``order`` and ``offsets``."""
+    groups = np.asarray(groups, dtype=int)
+    if len(groups) == 0:
+        return []
+
+    starts = offsets[groups]
+    sizes = offsets[groups + 1] - starts
+    # the position of each selected index in `order`: the start of its group plus its rank within
+    # the group
+    group_starts = np.repeat(starts - (np.cumsum(sizes) - sizes), sizes)
+    positions = group_starts + np.arange(sizes.sum())
+
+    return order[positions].tolist()
+
+
+def _make_scaffolds(mols: Sequence[Chem.Mol], num_workers: int = 0) -> list[str]:
+    """Calculate the Bemis-Murcko scaffold SMILES of each molecule, ignoring atom map numbers.
+
+    The scaffold of each unique molecule (by canonical SMILES) is only calculated once, and these
+    calculations are distributed over ``num_workers`` processes if ``num_workers > 0``.
+    """
+    smis = [Chem.MolToSmiles(_remove_atom_map_nums(mol)) for mol in mols]
+    # the index of the first occurrence of each unique molecule
+    smi_to_idx = {}
+    for i, smi in enumerate(smis):
+        smi_to_idx.setdefault(smi, i)
+    unique_mols = [mols[i] for i in smi_to_idx.values()]
+
+    if num_workers > 0:
+        chunksize = max(1, len(unique_mols) // (4 * num_workers))
+        with ProcessPoolExecutor(num_workers) as executor:
+            unique_scaffolds = list(executor.map(_make_scaffold, unique_mols, chunksize=chunksize))
+    else:
+        unique_scaffolds = [_make_scaffold(mol) for mol in unique_mols]
+
+    smi_to_scaffold = dict(zip(smi_to_idx.keys(), unique_scaffolds))
+
+    return [smi_to_scaffold[smi] for smi in smis]
+
+
+def _make_scaffold(mol: Chem.Mol) -> str:
+    return MurckoScaffold.MurckoScaffoldSmiles(
+        mol=_remove_atom_map_nums(mol), includeChirality=False
+    )
+
+
+def _remove_atom_map_nums(mol: Chem.Mol) -> Chem.Mol:
+    """Return a copy of the input molecule without atom map numbers, or the molecule itself if it
+    has none"""
+    if not any(atom.GetAtomMapNum() for atom in mol.GetAtoms()):
+        return mol
+
+    mol = Chem.Mol(mol)
+    for atom in mol.GetAtoms():
+        atom.SetAtomMapNum(0)
+
+    return mol
+
+
+def _group_split(
+    order: np.ndarray, offsets: np.ndarray, sizes: tuple[float, float, float], seed: int
+) -> tuple[list[int], list[int], list[int]]:
+    """Split groups of datapoints (e.g., that share a scaffold or cluster) into training,
+    validation, and test sets without breaking up any group.
+
+    This is equivalent to the extrapolative sampling of astartes, but it works on precomputed
+    groups (see :func:`_group_indices`) in linear time: the groups are sorted by ascending size
+    (breaking ties by first occurrence), the groups small enough to fit in the validation and test
+    sets are shuffled, and the groups are then greedily assigned to the test, validation, and
+    training sets, in that order of priority.
+    """
+    train_size, val_size, test_size = _normalize_split_sizes(sizes)
+    n_datapoints = len(order)
+    n_train = np.floor(n_datapoints * train_size)
+    n_val = np.floor(n_datapoints * val_size)
+    n_test = np.floor(n_datapoints * test_size)
+    max_shufflable_size = min(n_train, n_test) if val_size == 0 else min(n_test, n_val)
+
+    group_sizes = np.diff(offsets)
+    # the first index of each group is the first element of its segment in `order`
+    group_first_idxs = order[offsets[:-1]]
+    groups = np.lexsort((group_first_idxs, group_sizes))
+
+    n_small = np.searchsorted(group_sizes[groups], max_shufflable_size, side="right")
+    small_groups = groups[:n_small].tolist()
+    np.random.default_rng(seed).shuffle(small_groups)
+    groups = small_groups + groups[n_small:].tolist()
+
+    train_groups, val_groups, test_groups = [], [], []
+    n_val_filled, n_test_filled = 0, 0
+    for group, size in zip(groups, group_sizes[groups]):
+        if n_test_filled + size <= n_test:
+            test_groups.append(group)
+            n_test_filled += size
+        elif n_val_filled + size <= n_val:
+            val_groups.append(group)
+            n_val_filled += size
+        else:
+            train_groups.append(group)
+
+    train, val, test = (
+        _expand_groups(train_groups, order, offsets),
+        _expand_groups(val_groups, order, offsets),
+        _expand_groups(test_groups, order, offsets),
+    )
+    _check_split(train, val, test, (train_size, val_size, test_size))
+
+    return train, val, test
+
+
+def _make_packed_fingerprints(mols: Sequence[Chem.Mol]) -> np.ndarray:
+    """Calculate the 2048-bit Morgan fingerprints of the input molecules, packed into an array of
+    shape ``N x 256`` and type ``uint8``"""
+    featurizer = MorganBinaryFeaturizer(radius=2, length=2048)
+
+    return np.stack([np.packbits(featurizer(mol)) for mol in mols])
+
+
+def _tanimoto_distances(X: np.ndarray, Y: np.ndarray) -> np.ndarray:
+    """Calculate the Tanimoto (Jaccard) distance between each pair of packed fingerprints in ``X``
+    and ``Y``, unpacking at most :data:`DISTANCE_CHUNK_SIZE` rows of ``X`` at a time.
+
+    The intersections are calculated with a matrix product of the unpacked bits, and the distance
+    between two empty fingerprints is 0."""
+    Y = np.unpackbits(Y, axis=1).astype(np.float32)
+    n_bits_Y = Y.sum(1)
+
+    D = np.empty((len(X), len(Y)), dtype=np.float32)
+    for i in range(0, len(X), DISTANCE_CHUNK_SIZE):
+        X_chunk = np.unpackbits(X[i : i + DISTANCE_CHUNK_SIZE], axis=1).astype(np.float32)
+        intersection = X_chunk @ Y.T
+        union = X_chunk.sum(1, keepdims=True) + n_bits_Y - intersection
+        D[i : i + DISTANCE_CHUNK_SIZE] = 1 - intersection / np.maximum(union, 1)
+
+    return D
+
+
+def _approx_kennard_stone(fps: np.ndarray, seed: int) -> np.ndarray:
+    """Order the input fingerprints with an approximate Kennard-Stone algorithm.
+
+    The exact algorithm is run on a random sample of :data:`KS_SAMPLE_SIZE` molecules. Each
+    remaining molecule is then placed after its nearest sampled molecule, and molecules with the
+    same nearest sample are ordered by increasing distance to it. If there are no more than
+    ``KS_SAMPLE_SIZE`` molecules, this is the exact Kennard-Stone order using Tanimoto distances.
+    """
+    n_datapoints = len(fps)
+    if n_datapoints <= KS_SAMPLE_SIZE:
+        return fast_kennard_stone(_tanimoto_distances(fps, fps).astype(float))
+
+    logger.info(
+        f"Using the Kennard-Stone order of a random sample of {KS_SAMPLE_SIZE} molecules and "
+        "placing each remaining molecule after its nearest sampled molecule"
+    )
+    samples = np.sort(np.random.default_rng(seed).choice(n_datapoints, KS_SAMPLE_SIZE, False))
+    sample_order = fast_kennard_stone(_tanimoto_distances(fps[samples], fps[samples]).astype(float))
+    sample_ranks = np.empty(KS_SAMPLE_SIZE, dtype=int)
+    sample_ranks[sample_order] = np.arange(KS_SAMPLE_SIZE)
+
+    nearest_ranks = np.empty(n_datapoints, dtype=int)
+    nearest_distances = np.empty(n_datapoints, dtype=np.float32)
+    for i in range(0, n_datapoints, DISTANCE_CHUNK_SIZE):
+        D = _tanimoto_distances(fps[i : i + DISTANCE_CHUNK_SIZE], fps[samples])
+        nearest = D.argmin(1)
+        nearest_ranks[i : i + DISTANCE_CHUNK_SIZE] = sample_ranks[nearest]
+        nearest_distances[i : i + DISTANCE_CHUNK_SIZE] = D[np.arange(len(D)), nearest]
+    # the sampled molecules themselves have a distance of 0, so they come first in their group
+    nearest_distances[samples] = -1
+
+    return np.lexsort((nearest_distances, nearest_ranks))
+
+
+def _minibatch_kmeans(fps: np.ndarray, seed: int) -> np.ndarray:
+    """Cluster the input fingerprints with mini-batch k-means and return the cluster labels.
+
+    This uses the same number of clusters as the ``"kmeans"`` sampler of astartes (10% of the
+    number of molecules), up to a maximum of :data:`KMEANS_MAX_CLUSTERS`. The fingerprints are
+    clustered as sparse vectors with mini-batches of :data:`KMEANS_BATCH_SIZE` molecules.
+    """
+    n_clusters = min(len(fps) // 10 + 1, KMEANS_MAX_CLUSTERS)
+    logger.info(
+        f"Using mini-batch k-means with {n_clusters} clusters and a batch size of "
+        f"{KMEANS_BATCH_SIZE}"
+    )
+    X = sparse.vstack(
+        [
+            sparse.csr_matrix(
+                np.unpackbits(fps[i : i + DISTANCE_CHUNK_SIZE], axis=1), dtype=np.float32
+            )
+            for i in range(0, len(fps), DISTANCE_CHUNK_SIZE)
+        ],
+        format="csr",
+    )
+    kmeans = MiniBatchKMeans(
+        n_clusters,
+        batch_size=KMEANS_BATCH_SIZE,
+        random_state=seed,
+        n_init=1,
+        init_size=3 * n_clusters,
+    ).fit(X)
+
+    return kmeans.labels_
+
+
+def _ordered_split(
+    order: np.ndarray, sizes: tuple[float, float, float]
+) -> tuple[list[int], list[int], list[int]]:
+    """Split ordered datapoints into training, validation, and test sets, in that order, like the
+    interpolative samplers of astartes"""
+    train_size, val_size, test_size = _normalize_split_sizes(sizes)
+    n_train = int(np.floor(len(order) * train_size))
+    n_val = int(np.floor(len(order) * val_size))
+
+    train = order[:n_train].tolist()
+    val = order[n_train : n_train + n_val].tolist()
+    test = order[n_train + n_val :].tolist()
+    _check_split(train, val, test, (train_size, val_size, test_size))
+
+    return train, val, test
+
+
+def _normalize_split_sizes(sizes: tuple[float, float, float]) -> tuple[float, float, float]:
+    """Normalize the train, validation, and test ``sizes`` like the samplers of astartes do: a
+    missing train or test size is inferred from the other sizes, and the train and test sizes are
+    otherwise rescaled so that all sizes sum to 1 (the validation size is kept as is)"""
+    train_size, val_size, test_size = sizes
+    if not train_size and not test_size:
+        raise ValueError(f"The train or test size must be nonzero! got: {sizes}")
+    if not 0 <= val_size < 1:
+        raise ValueError(f"The validation size must be in [0, 1)! got: {val_size}")
+
+    if not train_size or not test_size:
+        given_size = train_size or test_size
+        if not 0 < given_size < 1:
+            raise ValueError(f"A lone train or test size must be in (0, 1)! got: {given_size}")
+        other_size = 1.0 - (given_size + val_size)
+        return (
+            (train_size, val_size, other_size) if train_size else (other_size, val_size, test_size)
+        )
+
+    total_size = train_size + test_size + val_size
+    if total_size != 1.0:
+        train_size = train_size / total_size
+        test_size = test_size / total_size if val_size else 1.0 - train_size
+        warnings.warn(
+            f"Requested split sizes {sizes} do not sum to 1.0, normalizing to train={train_size:.2f}, "
+            f"val={val_size:.2f}, test={test_size:.2f}.",
+            NormalizationWarning,
+        )
+
+    return train_size, val_size, test_size
+
+
+def _check_split(
+    train: Sequence[int], val: Sequence[int], test: Sequence[int], sizes: tuple[float, float, float]
+):
+    """Check that no requested set of a split is empty and warn if the actual sizes of the sets
+    differ from the requested ``sizes``"""
+    empty_sets = [
+        name
+        for name, idxs, size in [
+            ("train", train, 1),
+            ("validation", val, sizes[1]),
+            ("test", test, 1),
+        ]
+        if size and len(idxs) == 0
+    ]
+    if len(empty_sets) > 0:
+        raise ValueError(
+            f"The requested split resulted in an empty {' and '.join(empty_sets)} set! The dataset "
+            "may be too small or the requested sizes too large."
+        )
+
+    n_datapoints = len(train) + len(val) + len(test)
+    actual_sizes = [round(len(idxs) / n_datapoints, 2) for idxs in (train, val, test)]
+    requested_sizes = [round(size, 2) for size in sizes]
+    if actual_sizes != requested_sizes:
+        warnings.warn(
+            f"The actual split sizes {tuple(actual_sizes)} differ from the requested sizes "
+            f"{tuple(requested_sizes)}.",
+            ImperfectSplittingWarning,
+        )
+
+
 def _unpack_astartes_result(
     result: tuple, include_val: bool
 ) -> tuple[list[int], list[int], list[int]]:
@@ -215,7 +568,7 @@ def _splitter_helper(data, indices):
     if indices is None:
         return None
 
-    if isinstance(data[0], (MoleculeDatapoint, ReactionDatapoint)):
+    if isinstance(data[0], (MoleculeDatapoint, LazyMoleculeDatapoint, ReactionDatapoint)):
         datapoints = data
         idxss = indices
         return [[datapoints[idx] for idx in idxs] for idxs in idxss]
@@ -223,3 +576,36 @@ def _splitter_helper(data, indices):
         datapointss = data
         idxss = indices
         return [[[datapoints[idx] for idx in idxs] for datapoints in datapointss] for idxs in idxss]
+
+
+def split_dataset_by_indices(
+    dataset: MoleculeDataset | ReactionDataset | MulticomponentDataset,
+    train_indices: Iterable[Iterable[int]] | None = None,
+    val_indices: Iterable[Iterable[int]] | None = None,
+    test_indices: Iterable[Iterable[int]] | None = None,
+):
+    """Splits a dataset into training, validation, and test :class:`SubsetDataset`\s based on
+    split indices given.
+
+    Unlike :func:`split_data_by_indices`, the resulting datasets are views of the input dataset,
+    so the featurized data (and its cache) of the input dataset are shared by every split of every
+    replicate."""
+
+    train_dsets = _subset_helper(dataset, train_indices)
+    val_dsets = _subset_helper(dataset, val_indices)
+    test_dsets = _subset_helper(dataset, test_indices)
+
+    return train_dsets, val_dsets, test_dsets
+
+
+def _subset_helper(dataset, indices):
+    if indices is None:
+        return None
+
+    if isinstance(dataset, MulticomponentDataset):
+        return [
+            MulticomponentDataset([SubsetDataset(dset, idxs) for dset in dataset.datasets])
+            for idxs in indices
+        ]
+    else:
+        return [SubsetDataset(dataset, idxs) for idxs in indices]
@@ -17,6 +17,7 @@ from .molgraph import (
     CondensedGraphOfReactionFeaturizer,
     MolGraphCache,
     MolGraphCacheFacade,
+    MolGraphCacheLRU,
     MolGraphCacheOnTheFly,
     RxnMode,
     SimpleMoleculeMolGraphFeaturizer,
@@ -35,6 +36,7 @@ __all__ = [
     "MolGraphCacheFacade",
     "MolGraphCache",
     "MolGraphCacheOnTheFly",
+    "MolGraphCacheLRU",
     "SimpleMoleculeMolGraphFeaturizer",
     "CondensedGraphOfReactionFeaturizer",
     "CGRFeaturizer",
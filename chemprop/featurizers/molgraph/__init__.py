@@ -1,4 +1,4 @@
-from .cache import MolGraphCache, MolGraphCacheFacade, MolGraphCacheOnTheFly
+from .cache import MolGraphCache, MolGraphCacheFacade, MolGraphCacheLRU, MolGraphCacheOnTheFly
 from .molecule import SimpleMoleculeMolGraphFeaturizer
 from .reaction import CGRFeaturizer, CondensedGraphOfReactionFeaturizer, RxnMode
 
@@ -6,6 +6,7 @@ __all__ = [
     "MolGraphCacheFacade",
     "MolGraphCache",
     "MolGraphCacheOnTheFly",
+    "MolGraphCacheLRU",
     "SimpleMoleculeMolGraphFeaturizer",
     "CondensedGraphOfReactionFeaturizer",
     "CGRFeaturizer",
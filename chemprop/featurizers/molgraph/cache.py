@@ -1,4 +1,5 @@
 from abc import abstractmethod
+from collections import OrderedDict
 from collections.abc import Sequence
 from typing import Generic, Iterable
 
@@ -6,6 +7,7 @@ import numpy as np
 
 from chemprop.data.molgraph import MolGraph
 from chemprop.featurizers.base import Featurizer, S
+from chemprop.utils.profiling import get_profiler
 
 
 class MolGraphCacheFacade(Sequence[MolGraph], Generic[S]):
@@ -55,7 +57,9 @@ class MolGraphCache(MolGraphCacheFacade):
         E_fs: Iterable[np.ndarray | None],
         featurizer: Featurizer[S, MolGraph],
     ):
-        self._mgs = [featurizer(input, V_f, E_f) for input, V_f, E_f in zip(inputs, V_fs, E_fs)]
+        self._mgs = [
+            _featurize(featurizer, input, V_f, E_f) for input, V_f, E_f in zip(inputs, V_fs, E_fs)
+        ]
 
     def __len__(self) -> int:
         return len(self._mgs)
@@ -77,7 +81,7 @@ class MolGraphCacheOnTheFly(MolGraphCacheFacade):
         E_fs: Iterable[np.ndarray | None],
         featurizer: Featurizer[S, MolGraph],
     ):
-        self._inputs = list(inputs)
+        self._inputs = inputs if isinstance(inputs, Sequence) else list(inputs)
         self._V_fs = list(V_fs)
         self._E_fs = list(E_fs)
         self._featurizer = featurizer
@@ -86,4 +90,104 @@ class MolGraphCacheOnTheFly(MolGraphCacheFacade):
         return len(self._inputs)
 
     def __getitem__(self, index: int) -> MolGraph:
-        return self._featurizer(self._inputs[index], self._V_fs[index], self._E_fs[index])
+        return _featurize(
+            self._featurizer, self._inputs[index], self._V_fs[index], self._E_fs[index]
+        )
+
+
+class MolGraphCacheLRU(MolGraphCacheFacade):
+    """
+    A :class:`MolGraphCacheLRU` computes the corresponding
+    :class:`~chemprop.data.molgraph.MolGraph`\s as they are requested and caches them in memory
+    up to a given budget, evicting the least recently used ones once the budget is exceeded.
+
+    .. note::
+        Each process holds its own cache, so the budget applies to each
+        :class:`~torch.utils.data.DataLoader` worker separately. Worker caches only persist
+        across epochs when the workers do, i.e., with ``persistent_workers=True``.
+
+    Parameters
+    ----------
+    inputs : Iterable[S]
+        The inputs to be featurized.
+    V_fs : Iterable[np.ndarray]
+        The node features for each input.
+    E_fs : Iterable[np.ndarray]
+        The edge features for each input.
+    featurizer : Featurizer[S, MolGraph]
+        The featurizer with which to generate the
+        :class:`~chemprop.data.molgraph.MolGraph`\s.
+    max_bytes : int
+        The maximum total size in bytes of the arrays of the cached
+        :class:`~chemprop.data.molgraph.MolGraph`\s.
+    """
+
+    def __init__(
+        self,
+        inputs: Iterable[S],
+        V_fs: Iterable[np.ndarray | None],
+        E_fs: Iterable[np.ndarray | None],
+        featurizer: Featurizer[S, MolGraph],
+        max_bytes: int,
+    ):
+        if max_bytes < 0:
+            raise ValueError(f"arg 'max_bytes' must be non-negative! got: {max_bytes}")
+
+        self._inputs = inputs if isinstance(inputs, Sequence) else list(inputs)
+        self._V_fs = list(V_fs)
+        self._E_fs = list(E_fs)
+        self._featurizer = featurizer
+        self.max_bytes = max_bytes
+
+        self._mgs: OrderedDict[int, MolGraph] = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._inputs)
+
+    def __getitem__(self, index: int) -> MolGraph:
+        mg = self._mgs.get(index)
+        if mg is not None:
+            self.hits += 1
+            self._mgs.move_to_end(index)
+
+            return mg
+
+        self.misses += 1
+        mg = _featurize(self._featurizer, self._inputs[index], self._V_fs[index], self._E_fs[index])
+
+        nbytes = sum(X.nbytes for X in mg)
+        if nbytes > self.max_bytes:
+            return mg
+
+        self._mgs[index] = mg
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes:
+            _, mg_old = self._mgs.popitem(last=False)
+            self.nbytes -= sum(X.nbytes for X in mg_old)
+            self.evictions += 1
+
+        return mg
+
+    @property
+    def hit_rate(self) -> float:
+        """the fraction of requests that were served from the cache"""
+        n_requests = self.hits + self.misses
+
+        return self.hits / n_requests if n_requests > 0 else 0.0
+
+
+def _featurize(featurizer: Featurizer[S, MolGraph], input: S, V_f, E_f) -> MolGraph:
+    """Featurize the input, recording it as a ``"featurize"`` stage with the active profiler"""
+    profiler = get_profiler()
+    if profiler is None:
+        return featurizer(input, V_f, E_f)
+
+    start = profiler.start(synchronize=False)
+    mg = featurizer(input, V_f, E_f)
+    profiler.stop("featurize", start, 1, len(mg.V), synchronize=False)
+
+    return mg
@@ -1,5 +1,21 @@
+from .batching import LatencyStats, MicroBatcher
+from .cache import PredictionCache, file_digest, model_digest
+from .ensemble import EnsembleCheckpoint, EnsembleMPNN
 from .model import MPNN
 from .multi import MulticomponentMPNN
-from .utils import load_model, save_model
+from .utils import load_model, load_model_with_metadata, save_model
 
-__all__ = ["MPNN", "MulticomponentMPNN", "load_model", "save_model"]
+__all__ = [
+    "MPNN",
+    "MulticomponentMPNN",
+    "EnsembleMPNN",
+    "EnsembleCheckpoint",
+    "MicroBatcher",
+    "LatencyStats",
+    "PredictionCache",
+    "file_digest",
+    "model_digest",
+    "load_model",
+    "load_model_with_metadata",
+    "save_model",
+]
@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+from contextlib import suppress
+from dataclasses import dataclass, field
+import queue
+import threading
+import time
+from typing import Self, Sequence
+
+import numpy as np
+from rdkit.Chem import Mol
+import torch
+from torch import Tensor
+
+from chemprop.data import MoleculeDatapoint, MoleculeDataset, collate_batch
+from chemprop.data.datasets import Datum
+from chemprop.data.molgraph import MolGraph
+from chemprop.featurizers import Featurizer, SimpleMoleculeMolGraphFeaturizer
+from chemprop.models.model import MPNN
+
+_STOP = object()
+
+
+@dataclass
+class _Request:
+    data: list[Datum]
+    future: Future
+    start: float
+    n_atoms: int = field(init=False)
+
+    def __post_init__(self):
+        self.n_atoms = sum(len(d.mg.V) for d in self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+@dataclass
+class LatencyStats:
+    """The latency statistics of the recent requests of a :class:`MicroBatcher`"""
+
+    n_requests: int
+    """the number of requests over which the statistics were calculated"""
+    n_batches: int
+    """the number of batches in which all requests so far were predicted"""
+    mean_batch_size: float
+    """the mean number of molecules in a batch"""
+    mean_ms: float
+    p50_ms: float
+    p99_ms: float
+
+
+class MicroBatcher:
+    """A :class:`MicroBatcher` predicts many small requests with an :class:`MPNN` in few batches.
+
+    Requests are submitted from any number of threads or event loops and queued. A background
+    thread coalesces the queued requests into a single batch until adding the next request would
+    exceed ``max_batch_size`` molecules or ``max_atoms`` atoms, or until ``max_latency`` seconds have
+    passed since the first request of the batch was submitted. The batch is collated into a single
+    :class:`~chemprop.data.BatchMolGraph` and predicted in one forward pass, and the predictions are
+    scattered back to the requests. A request that exceeds the budget on its own is predicted alone
+    in as many forward passes as needed.
+
+    The datapoints of a request are featurized in the submitting thread, so only the collation and
+    forward pass are serialized by the background thread::
+
+        with MicroBatcher(model, max_latency=0.002) as batcher:
+            preds = batcher.predict([MoleculeDatapoint.from_smi("CCO")])
+
+    Parameters
+    ----------
+    models : MPNN | Sequence[MPNN]
+        the model(s) with which to predict. The predictions of several models are averaged.
+    featurizer : Featurizer[Mol, MolGraph] | None, default=None
+        the featurizer of the molecules of the submitted datapoints. If ``None``, a
+        :class:`~chemprop.featurizers.SimpleMoleculeMolGraphFeaturizer` is used.
+    max_batch_size : int, default=256
+        the maximum number of molecules in a batch
+    max_atoms : int | None, default=None
+        the maximum total number of atoms in a batch. If ``None``, only the number of molecules is
+        bounded.
+    max_latency : float, default=0.005
+        the maximum time in seconds that the first request of a batch waits for further requests
+    device : str | torch.device, default="cpu"
+        the device on which to run the models
+    history_size : int, default=10000
+        the number of most recent requests whose latencies are kept for :meth:`latency_stats`
+    """
+
+    def __init__(
+        self,
+        models: MPNN | Sequence[MPNN],
+        featurizer: Featurizer[Mol, MolGraph] | None = None,
+        max_batch_size: int = 256,
+        max_atoms: int | None = None,
+        max_latency: float = 0.005,
+        device: str | torch.device = "cpu",
+        history_size: int = 10000,
+    ):
+        if max_batch_size < 1:
+            raise ValueError(f"arg 'max_batch_size' must be positive! got: {max_batch_size}")
+        if max_atoms is not None and max_atoms < 1:
+            raise ValueError(f"arg 'max_atoms' must be positive! got: {max_atoms}")
+        if max_latency < 0:
+            raise ValueError(f"arg 'max_latency' must be non-negative! got: {max_latency}")
+
+        models = [models] if isinstance(models, MPNN) else models
+        self.device = torch.device(device)
+        self.models = [model.to(self.device).eval() for model in models]
+        self.featurizer = featurizer or SimpleMoleculeMolGraphFeaturizer()
+        self.max_batch_size = max_batch_size
+        self.max_atoms = max_atoms
+        self.max_latency = max_latency
+
+        self._requests: queue.Queue[_Request | object] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._stats_lock = threading.Lock()
+        self._latencies: deque[float] = deque(maxlen=history_size)
+        self._n_batches = 0
+        self._n_batched_mols = 0
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """Start the background thread that predicts the batches of requests"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="chemprop-batcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background thread after the pending requests have been predicted"""
+        if self._thread is not None:
+            self._requests.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, dps: Sequence[MoleculeDatapoint]) -> Future[Tensor]:
+        """Featurize the datapoints ``dps`` and queue them for prediction
+
+        Returns
+        -------
+        Future[Tensor]
+            a future of the predictions of the datapoints, a tensor of shape ``n x t`` (or
+            ``n x t x *``, depending on the predictor of the models) on the CPU
+        """
+        if len(dps) == 0:
+            raise ValueError("Cannot submit a request without datapoints!")
+        if self._thread is None:
+            raise RuntimeError("The MicroBatcher must be started before submitting requests!")
+
+        start = time.perf_counter()
+        dset = MoleculeDataset(dps, self.featurizer)
+        future = Future()
+        self._requests.put(_Request([dset[i] for i in range(len(dset))], future, start))
+
+        return future
+
+    def predict(self, dps: Sequence[MoleculeDatapoint]) -> Tensor:
+        """Predict the datapoints ``dps``, blocking until their batch has been predicted"""
+        return self.submit(dps).result()
+
+    async def predict_async(self, dps: Sequence[MoleculeDatapoint]) -> Tensor:
+        """Predict the datapoints ``dps`` without blocking the running event loop"""
+        return await asyncio.wrap_future(self.submit(dps))
+
+    def latency_stats(self) -> LatencyStats:
+        """Calculate the statistics of the latencies of the most recent requests, measured from the
+        submission of a request until its predictions are available"""
+        with self._stats_lock:
+            latencies = 1e3 * np.array(self._latencies)
+            n_batches, n_mols = self._n_batches, self._n_batched_mols
+
+        if len(latencies) == 0:
+            mean = p50 = p99 = float("nan")
+        else:
+            mean = latencies.mean()
+            p50, p99 = np.percentile(latencies, [50, 99])
+
+        return LatencyStats(
+            len(latencies),
+            n_batches,
+            n_mols / n_batches if n_batches > 0 else float("nan"),
+            float(mean),
+            float(p50),
+            float(p99),
+        )
+
+    def reset_stats(self):
+        """Discard the latencies and batch counts recorded so far"""
+        with self._stats_lock:
+            self._latencies.clear()
+            self._n_batches = 0
+            self._n_batched_mols = 0
+
+    def _fits(self, n_mols: int, n_atoms: int) -> bool:
+        return n_mols <= self.max_batch_size and (
+            self.max_atoms is None or n_atoms <= self.max_atoms
+        )
+
+    def _run(self):
+        pending = None
+        while True:
+            request = pending if pending is not None else self._next_request()
+            pending = None
+            if request is _STOP:
+                break
+
+            requests = [request]
+            n_mols, n_atoms = len(request), request.n_atoms
+            deadline = request.start + self.max_latency
+            while self._fits(n_mols + 1, n_atoms + 1):
+                try:
+                    request = self._next_request(deadline)
+                except queue.Empty:
+                    break
+                if request is _STOP or not self._fits(
+                    n_mols + len(request), n_atoms + request.n_atoms
+                ):
+                    pending = request
+                    break
+                requests.append(request)
+                n_mols += len(request)
+                n_atoms += request.n_atoms
+
+            self._predict(requests)
+
+    def _next_request(self, deadline: float | None = None) -> _Request | object:
+        """Take the next request that was not cancelled off the queue and mark it as running,
+        waiting until at most ``deadline``
+
+        Raises
+        ------
+        queue.Empty
+            if no request was queued before the deadline
+        """
+        while True:
+            timeout = None if deadline is None else max(deadline - time.perf_counter(), 0)
+            request = self._requests.get(timeout=timeout)
+            if request is _STOP or request.future.set_running_or_notify_cancel():
+                return request
+
+    def _predict(self, requests: list[_Request]):
+        data = [d for request in requests for d in request.data]
+        try:
+            preds = torch.cat([self._forward(chunk) for chunk in self._chunks(data)])
+        except Exception as e:
+            for request in requests:
+                with suppress(InvalidStateError):
+                    request.future.set_exception(e)
+            return
+
+        end = time.perf_counter()
+        with self._stats_lock:
+            self._latencies.extend(end - request.start for request in requests)
+            self._n_batches += 1
+            self._n_batched_mols += len(data)
+
+        for request, request_preds in zip(requests, preds.split([len(r) for r in requests])):
+            with suppress(InvalidStateError):
+                request.future.set_result(request_preds)
+
+    def _chunks(self, data: list[Datum]) -> list[list[Datum]]:
+        """Split ``data`` into chunks that each fit the budget of a batch"""
+        chunks = [[]]
+        n_atoms = 0
+        for d in data:
+            if len(chunks[-1]) > 0 and not self._fits(len(chunks[-1]) + 1, n_atoms + len(d.mg.V)):
+                chunks.append([])
+                n_atoms = 0
+            chunks[-1].append(d)
+            n_atoms += len(d.mg.V)
+
+        return chunks
+
+    def _forward(self, data: list[Datum]) -> Tensor:
+        bmg, V_d, X_d, *_ = collate_batch(data).to(self.device)
+
+        with torch.inference_mode():
+            preds = torch.stack([model(bmg, V_d, X_d) for model in self.models]).mean(0)
+
+        return preds.cpu()
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import hashlib
+import io
+from os import PathLike
+import sqlite3
+import time
+from typing import Callable, Iterable, Self, Sequence
+
+from lightning import pytorch as pl
+import numpy as np
+from rdkit import Chem
+import torch
+from torch import Tensor
+from torch.utils.data import DataLoader
+
+from chemprop.data import MolGraphDataset, MulticomponentDataset, ReactionDatapoint, SubsetDataset
+from chemprop.models.model import MPNN
+
+Estimator = Callable[[DataLoader, Sequence[MPNN], pl.Trainer], tuple[Tensor, Tensor | None]]
+
+_SQLITE_MAX_VARS = 500
+
+
+def file_digest(path: PathLike) -> str:
+    """Calculate the SHA-256 digest of the contents of the file at ``path``, e.g., of a model
+    checkpoint"""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def model_digest(model: MPNN) -> str:
+    """Calculate the SHA-256 digest of the parameters and buffers of ``model``"""
+    h = hashlib.sha256()
+    for name, tensor in model.state_dict().items():
+        h.update(name.encode())
+        h.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+
+    return h.hexdigest()
+
+
+class PredictionCache:
+    """A :class:`PredictionCache` persists the predictions of datapoints in an SQLite database.
+
+    The predictions of each datapoint are keyed by the canonical SMILES of its molecule(s) or
+    reaction(s), the fingerprint of its extra features and descriptors, the digests of the models,
+    and a free-form ``context`` describing anything else that affects the predictions, e.g., the
+    featurization settings. Once the cache holds more than ``max_size`` entries, the least recently
+    used entries are evicted.
+
+    :meth:`estimate` wraps an uncertainty estimator (see
+    :class:`~chemprop.uncertainty.UncertaintyEstimator`) so that only the datapoints whose
+    predictions are missing from the cache are featurized and predicted::
+
+        with PredictionCache("preds.sqlite") as cache:
+            preds, uncs = cache.estimate(NoUncertaintyEstimator(), loader, models, trainer)
+
+    .. note::
+        The predictions of stochastic estimators, such as
+        :class:`~chemprop.uncertainty.DropoutEstimator`, are cached like those of any other
+        estimator, so repeated predictions of a cached datapoint return the same samples.
+
+    Parameters
+    ----------
+    path : PathLike
+        the path of the SQLite database, which is created if it doesn't exist
+    max_size : int | None, default=1000000
+        the maximum number of cached datapoints. If ``None``, no entries are evicted.
+    """
+
+    def __init__(self, path: PathLike, max_size: int | None = 1_000_000):
+        if max_size is not None and max_size < 1:
+            raise ValueError(f"arg 'max_size' must be positive! got: {max_size}")
+
+        self.path = path
+        self.max_size = max_size
+        self.n_hits = 0
+        self.n_misses = 0
+
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions "
+            "(key BLOB PRIMARY KEY, value BLOB NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS predictions_last_used ON predictions (last_used)"
+        )
+        self._conn.commit()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+    def clear(self):
+        """Remove all cached predictions"""
+        with self._conn:
+            self._conn.execute("DELETE FROM predictions")
+
+    def get(self, keys: Sequence[bytes]) -> list[tuple[np.ndarray, np.ndarray | None] | None]:
+        """Get the cached predictions and uncertainties of each key, or ``None`` if a key isn't
+        cached, and mark the found entries as recently used"""
+        values = {}
+        for i in range(0, len(keys), _SQLITE_MAX_VARS):
+            chunk = keys[i : i + _SQLITE_MAX_VARS]
+            params = ",".join("?" * len(chunk))
+            values.update(
+                self._conn.execute(
+                    f"SELECT key, value FROM predictions WHERE key IN ({params})", chunk
+                )
+            )
+
+        now = time.time_ns()
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE predictions SET last_used = ? WHERE key = ?", ((now, k) for k in values)
+            )
+
+        return [_loads(values[k]) if k in values else None for k in keys]
+
+    def put(self, keys: Sequence[bytes], preds: np.ndarray, uncs: np.ndarray | None):
+        """Cache the predictions ``preds[:, i]`` and uncertainties ``uncs[:, i]`` of the ``i``-th
+        key, then evict the least recently used entries in excess of :attr:`max_size`"""
+        now = time.time_ns()
+        rows = (
+            (k, _dumps(preds[:, i], None if uncs is None else uncs[:, i]), now)
+            for i, k in enumerate(keys)
+        )
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)", rows)
+            if self.max_size is not None:
+                self._conn.execute(
+                    "DELETE FROM predictions WHERE key IN (SELECT key FROM predictions "
+                    "ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_size,),
+                )
+
+    def keys(
+        self,
+        dset: MolGraphDataset | MulticomponentDataset,
+        digests: Iterable[str],
+        context: str = "",
+    ) -> list[bytes]:
+        """Calculate the cache key of each datapoint of ``dset`` predicted by the models with the
+        given ``digests`` (see :func:`file_digest` and :func:`model_digest`)"""
+        prefix = hashlib.sha256()
+        for s in [context, *digests]:
+            prefix.update(s.encode())
+            prefix.update(b"\0")
+
+        if isinstance(dset, MulticomponentDataset):
+            dpss = zip(*[d.data for d in dset.datasets])
+        else:
+            dpss = ([d] for d in dset.data)
+
+        keys = []
+        for dps in dpss:
+            h = prefix.copy()
+            for d in dps:
+                _update(h, d)
+            keys.append(h.digest())
+
+        return keys
+
+    def estimate(
+        self,
+        estimator: Estimator,
+        dataloader: DataLoader,
+        models: Sequence[MPNN],
+        trainer: pl.Trainer,
+        digests: Iterable[str] | None = None,
+        context: str = "",
+    ) -> tuple[Tensor, Tensor | None]:
+        """Calculate the predictions and uncertainties of the dataset of ``dataloader`` as
+        ``estimator(dataloader, models, trainer)`` would, but predict only the datapoints whose
+        predictions are missing from the cache and cache their predictions.
+
+        Parameters
+        ----------
+        estimator : Estimator
+            the uncertainty estimator, e.g., an :class:`~chemprop.uncertainty.UncertaintyEstimator`
+        dataloader : DataLoader
+            the dataloader of the datapoints to predict, in order
+        models : Sequence[MPNN]
+            the models with which to predict
+        trainer : pl.Trainer
+            the trainer with which to predict
+        digests : Iterable[str] | None, default=None
+            the digests identifying the models, e.g., the :func:`file_digest` of their checkpoints.
+            If ``None``, the :func:`model_digest` of each model is used.
+        context : str, default=""
+            a description of any other settings that affect the predictions and should therefore
+            be part of the key, such as the parameters of the estimator (whose type is always part
+            of the key) or the featurization settings
+
+        Returns
+        -------
+        tuple[Tensor, Tensor | None]
+            the predictions and uncertainties, as returned by ``estimator``
+        """
+        dset = dataloader.dataset
+        if digests is None:
+            digests = [model_digest(model) for model in models]
+        context = f"{type(estimator).__qualname__}|{context}"
+
+        keys = self.keys(dset, digests, context)
+        values = self.get(keys)
+        miss_idxs = [i for i, v in enumerate(values) if v is None]
+        self.n_hits += len(keys) - len(miss_idxs)
+        self.n_misses += len(miss_idxs)
+
+        if len(miss_idxs) > 0:
+            miss_loader = DataLoader(
+                _subset(dset, miss_idxs) if len(miss_idxs) < len(keys) else dset,
+                dataloader.batch_size,
+                num_workers=dataloader.num_workers,
+                collate_fn=dataloader.collate_fn,
+                pin_memory=dataloader.pin_memory,
+            )
+            miss_preds, miss_uncs = estimator(miss_loader, models, trainer)
+            miss_preds = miss_preds.cpu().numpy()
+            miss_uncs = None if miss_uncs is None else miss_uncs.cpu().numpy()
+            self.put([keys[i] for i in miss_idxs], miss_preds, miss_uncs)
+
+            for j, i in enumerate(miss_idxs):
+                values[i] = (miss_preds[:, j], None if miss_uncs is None else miss_uncs[:, j])
+
+        preds = torch.from_numpy(np.stack([v[0] for v in values], axis=1))
+        uncs = values[0][1] if len(values) > 0 else None
+        if uncs is not None:
+            uncs = torch.from_numpy(np.stack([v[1] for v in values], axis=1))
+
+        return preds, uncs
+
+
+def _update(h, d):
+    """Update the hash ``h`` with the canonical SMILES and the extra features of the datapoint"""
+    if isinstance(d, ReactionDatapoint):
+        smi = f"{Chem.MolToSmiles(d.rct)}>>{Chem.MolToSmiles(d.pdt)}"
+    else:
+        smi = Chem.MolToSmiles(d.mol)
+    h.update(smi.encode())
+
+    for X in (d.x_d, getattr(d, "V_f", None), getattr(d, "E_f", None), getattr(d, "V_d", None)):
+        if X is None:
+            h.update(b"\0")
+        else:
+            X = np.ascontiguousarray(X)
+            h.update(f"{X.dtype.str}{X.shape}".encode())
+            h.update(X.tobytes())
+
+
+def _subset(dset: MolGraphDataset | MulticomponentDataset, idxs: Sequence[int]):
+    if isinstance(dset, MulticomponentDataset):
+        return MulticomponentDataset([SubsetDataset(d, idxs) for d in dset.datasets])
+
+    return SubsetDataset(dset, idxs)
+
+
+def _dumps(preds: np.ndarray, uncs: np.ndarray | None) -> bytes:
+    buf = io.BytesIO()
+    np.save(buf, preds)
+    if uncs is not None:
+        np.save(buf, uncs)
+
+    return buf.getvalue()
+
+
+def _loads(value: bytes) -> tuple[np.ndarray, np.ndarray | None]:
+    buf = io.BytesIO(value)
+    preds = np.load(buf)
+    uncs = np.load(buf) if buf.tell() < len(value) else None
+
+    return preds, uncs
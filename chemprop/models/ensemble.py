@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+from os import PathLike
+from pathlib import Path
+from typing import Iterable, Sequence
+
+from lightning import pytorch as pl
+import torch
+from torch import Tensor, nn
+
+from chemprop.data import MulticomponentTrainingBatch, TrainingBatch
+from chemprop.models.model import MPNN
+
+BatchType = TrainingBatch | MulticomponentTrainingBatch
+
+
+class EnsembleMPNN(pl.LightningModule):
+    r"""An :class:`EnsembleMPNN` trains several independent :class:`MPNN`\s on the same batches.
+
+    Every batch is loaded, collated, and moved to the device once and then used by each model in
+    turn, so the cost of the data pipeline doesn't scale with the size of the ensemble. The models
+    are otherwise independent: each has its own initialization, optimizer, learning rate
+    schedule, and gradient clipping, and each logs its own metrics under the prefix
+    ``"model_{i}/"``. Individual models may be stopped early (see :class:`EnsembleCheckpoint`), after
+    which they are no longer trained or validated.
+
+    .. note::
+        All models see the batches in the same order, and they draw their dropout masks from the
+        same global random number generator in turn. Training an ensemble jointly therefore
+        doesn't reproduce the exact results of training its models one after another, even with
+        identical seeds.
+
+    Parameters
+    ----------
+    models : Iterable[MPNN]
+        the models of the ensemble
+    grad_clip : float | None, default=None
+        the maximum norm of the gradients of each model. If ``None``, gradients are not clipped.
+    """
+
+    def __init__(self, models: Iterable[MPNN], grad_clip: float | None = None):
+        super().__init__()
+
+        self.models = nn.ModuleList(models)
+        self.grad_clip = grad_clip
+        self.stopped = [False] * len(self.models)
+
+        # each model has its own optimizer, so the optimization must be performed manually
+        self.automatic_optimization = False
+
+    def __len__(self) -> int:
+        return len(self.models)
+
+    def forward(self, *args, **kwargs) -> Tensor:
+        """Generate the predictions of each model, stacked along the first dimension"""
+        return torch.stack([model(*args, **kwargs) for model in self.models])
+
+    def training_step(self, batch: BatchType, batch_idx: int):
+        optimizers = self.optimizers()
+        lr_schedulers = self.lr_schedulers()
+        if not isinstance(optimizers, list):
+            optimizers, lr_schedulers = [optimizers], [lr_schedulers]
+
+        bmg, V_d, X_d, targets, weights, lt_mask, gt_mask = batch
+        mask = targets.isfinite()
+        targets = targets.nan_to_num(nan=0.0)
+
+        for i, (model, opt, lr_sched) in enumerate(zip(self.models, optimizers, lr_schedulers)):
+            if self.stopped[i]:
+                continue
+
+            preds = model.predictor.train_step(model.fingerprint(bmg, V_d, X_d))
+            l = model.criterion(preds, targets, mask, weights, lt_mask, gt_mask)
+
+            opt.zero_grad()
+            self.manual_backward(l)
+            if self.grad_clip is not None:
+                self.clip_gradients(opt, gradient_clip_val=self.grad_clip)
+            opt.step()
+            lr_sched.step()
+
+            self.log(
+                f"model_{i}/train_loss",
+                model.criterion,
+                batch_size=model.get_batch_size(batch),
+                on_epoch=True,
+            )
+
+    def on_validation_model_eval(self) -> None:
+        self.eval()
+        for model in self.models:
+            model.on_validation_model_eval()
+
+    def validation_step(self, batch: BatchType, batch_idx: int = 0):
+        self._evaluate_batch(batch, "val")
+
+    def test_step(self, batch: BatchType, batch_idx: int = 0):
+        self._evaluate_batch(batch, "test")
+
+    def _evaluate_batch(self, batch: BatchType, label: str) -> None:
+        for i, model in enumerate(self.models):
+            if not self.stopped[i]:
+                model._evaluate_batch(batch, label, f"model_{i}/", self.log)
+
+    def predict_step(self, batch: BatchType, batch_idx: int, dataloader_idx: int = 0) -> Tensor:
+        """Return the predictions of each model for the input batch, stacked along the first
+        dimension. See :meth:`MPNN.predict_step` for the shape of the predictions of each model."""
+        return torch.stack(
+            [model.predict_step(batch, batch_idx, dataloader_idx) for model in self.models]
+        )
+
+    def configure_optimizers(self):
+        optimizers, lr_schedulers = [], []
+        for model in self.models:
+            # the optimizer of a model depends on the number of training batches of the trainer
+            model.trainer = self.trainer
+            config = model.configure_optimizers()
+            optimizers.append(config["optimizer"])
+            lr_schedulers.append(config["lr_scheduler"])
+
+        return optimizers, lr_schedulers
+
+    def transfer_batch_to_device(self, batch: BatchType, device: torch.device, dataloader_idx: int):
+        return self.models[0].transfer_batch_to_device(batch, device, dataloader_idx)
+
+
+class EnsembleCheckpoint(pl.Callback):
+    """Save the checkpoints of each model of an :class:`EnsembleMPNN` individually and stop
+    training each model once its monitored metric stops improving.
+
+    After every validation epoch, the checkpoint of each model whose metric improved replaces its
+    previous best checkpoint, and, if ``save_last`` is ``True``, the checkpoint of each model is
+    saved to ``last.ckpt``. The checkpoints of each model may be loaded with
+    :meth:`MPNN.load_from_checkpoint` like those of a model trained on its own. Training ends once
+    every model has been stopped.
+
+    Parameters
+    ----------
+    dirpaths : Sequence[PathLike]
+        the directory in which to save the checkpoints of each model
+    monitor : str
+        the name of the metric to monitor, without the ``"model_{i}/"`` prefix
+    mode : {"min", "max"}, default="min"
+        whether the monitored metric should be minimized or maximized
+    patience : int | None, default=None
+        the number of validation epochs without improvement after which to stop training a model.
+        If ``None``, models are never stopped early.
+    save_last : bool, default=True
+        whether to save the latest checkpoint of each model to ``last.ckpt``
+    """
+
+    def __init__(
+        self,
+        dirpaths: Sequence[PathLike],
+        monitor: str,
+        mode: str = "min",
+        patience: int | None = None,
+        save_last: bool = True,
+    ):
+        self.dirpaths = [Path(dirpath) for dirpath in dirpaths]
+        self.monitor = monitor
+        self.mode = mode
+        self.patience = patience
+        self.save_last = save_last
+
+        self.best_model_paths: list[Path | None] = [None] * len(self.dirpaths)
+        self.best_model_scores: list[float | None] = [None] * len(self.dirpaths)
+        self.wait_counts = [0] * len(self.dirpaths)
+
+    def on_validation_end(self, trainer: pl.Trainer, pl_module: EnsembleMPNN):
+        if trainer.sanity_checking:
+            return
+
+        for i, model in enumerate(pl_module.models):
+            if pl_module.stopped[i]:
+                continue
+
+            score = trainer.callback_metrics.get(f"model_{i}/{self.monitor}")
+            if score is None:
+                continue
+            score = score.item()
+
+            if self._improved(score, self.best_model_scores[i]):
+                filename = (
+                    f"best-epoch={trainer.current_epoch}-{self.monitor.replace('/', '_')}="
+                    f"{score:.2f}.ckpt"
+                )
+                path = self.dirpaths[i] / filename
+                if self.best_model_paths[i] is not None and self.best_model_paths[i] != path:
+                    self.best_model_paths[i].unlink(missing_ok=True)
+                self._save(trainer, model, path)
+
+                self.best_model_paths[i] = path
+                self.best_model_scores[i] = score
+                self.wait_counts[i] = 0
+            else:
+                self.wait_counts[i] += 1
+                if self.patience is not None and self.wait_counts[i] >= self.patience:
+                    pl_module.stopped[i] = True
+
+            if self.save_last:
+                self._save(trainer, model, self.dirpaths[i] / "last.ckpt")
+
+        if all(pl_module.stopped):
+            trainer.should_stop = True
+
+    def _improved(self, score: float, best_score: float | None) -> bool:
+        if best_score is None:
+            return True
+
+        return score > best_score if self.mode == "max" else score < best_score
+
+    def _save(self, trainer: pl.Trainer, model: MPNN, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        torch.save(
+            {
+                "epoch": trainer.current_epoch,
+                "pytorch-lightning_version": pl.__version__,
+                "state_dict": model.state_dict(),
+                "hyper_parameters": model.hparams,
+            },
+            path,
+        )
@@ -2,16 +2,18 @@ from __future__ import annotations
 
 import io
 import logging
-from typing import Iterable, TypeAlias
+from typing import Callable, Iterable, TypeAlias
 
 from lightning import pytorch as pl
 import torch
 from torch import Tensor, nn, optim
 
 from chemprop.data import BatchMolGraph, MulticomponentTrainingBatch, TrainingBatch
+from chemprop.models.serialization import load_model_file
 from chemprop.nn import Aggregation, ChempropMetric, MessagePassing, Predictor
 from chemprop.nn.transforms import ScaleTransform
 from chemprop.schedulers import build_NoamLike_LRSched
+from chemprop.utils.profiling import timer
 
 logger = logging.getLogger(__name__)
 
@@ -167,35 +169,36 @@ class MPNN(pl.LightningModule):
     def validation_step(self, batch: BatchType, batch_idx: int = 0):
         self._evaluate_batch(batch, "val")
 
-        batch_size = self.get_batch_size(batch)
-        bmg, V_d, X_d, targets, weights, lt_mask, gt_mask = batch
-
-        mask = targets.isfinite()
-        targets = targets.nan_to_num(nan=0.0)
-
-        Z = self.fingerprint(bmg, V_d, X_d)
-        preds = self.predictor.train_step(Z)
-        self.metrics[-1](preds, targets, mask, weights, lt_mask, gt_mask)
-        self.log("val_loss", self.metrics[-1], batch_size=batch_size, prog_bar=True)
-
     def test_step(self, batch: BatchType, batch_idx: int = 0):
         self._evaluate_batch(batch, "test")
 
-    def _evaluate_batch(self, batch: BatchType, label: str) -> None:
+    def _evaluate_batch(
+        self, batch: BatchType, label: str, prefix: str = "", log: Callable | None = None
+    ) -> None:
+        """Update and log the metrics of the batch as ``"{prefix}{label}/{alias}"`` and, if
+        ``label`` is ``"val"``, the validation loss as ``"{prefix}val_loss"``. The metrics are
+        logged with ``log`` if given, e.g., the :meth:`log` of an ensemble containing this model,
+        and with :meth:`log` otherwise."""
+        log = log or self.log
         batch_size = self.get_batch_size(batch)
         bmg, V_d, X_d, targets, weights, lt_mask, gt_mask = batch
 
         mask = targets.isfinite()
         targets = targets.nan_to_num(nan=0.0)
-        preds = self(bmg, V_d, X_d)
-        weights = torch.ones_like(weights)
+        Z = self.fingerprint(bmg, V_d, X_d)
 
+        preds = self.predictor(Z)
         if self.predictor.n_targets > 1:
             preds = preds[..., 0]
 
         for m in self.metrics[:-1]:
-            m.update(preds, targets, mask, weights, lt_mask, gt_mask)
-            self.log(f"{label}/{m.alias}", m, batch_size=batch_size)
+            m.update(preds, targets, mask, torch.ones_like(weights), lt_mask, gt_mask)
+            log(f"{prefix}{label}/{m.alias}", m, batch_size=batch_size)
+
+        if label == "val":
+            preds = self.predictor.train_step(Z)
+            self.metrics[-1](preds, targets, mask, weights, lt_mask, gt_mask)
+            log(f"{prefix}val_loss", self.metrics[-1], batch_size=batch_size, prog_bar=True)
 
     def predict_step(self, batch: BatchType, batch_idx: int, dataloader_idx: int = 0) -> Tensor:
         """Return the predictions of the input batch
@@ -250,10 +253,17 @@ class MPNN(pl.LightningModule):
     def get_batch_size(self, batch: TrainingBatch) -> int:
         return len(batch[0])
 
-    @classmethod
-    def _load(cls, path, map_location, **submodules):
-        d = torch.load(path, map_location, weights_only=False)
+    def transfer_batch_to_device(self, batch: BatchType, device: torch.device, dataloader_idx: int):
+        """Move the batch to the device, using non-blocking transfers for CUDA devices. These only
+        overlap with computation if the batch is in pinned memory."""
+        if isinstance(batch, (TrainingBatch, MulticomponentTrainingBatch)):
+            with timer("transfer", len(batch.w)):
+                return batch.to(device, non_blocking=device.type == "cuda")
+
+        return super().transfer_batch_to_device(batch, device, dataloader_idx)
 
+    @classmethod
+    def _unpack(cls, d, path, **submodules):
         try:
             hparams = d["hyper_parameters"]
             state_dict = d["state_dict"]
@@ -273,6 +283,23 @@ class MPNN(pl.LightningModule):
 
         return submodules, state_dict, hparams
 
+    @classmethod
+    def _from_dict(cls, d, path, strict=True, **kwargs) -> MPNN:
+        """Build a model from the deserialized contents ``d`` of the model file or checkpoint at
+        ``path``, overriding its hyperparameters (including its submodules) with ``kwargs``"""
+        submodules = {
+            k: v for k, v in kwargs.items() if k in ["message_passing", "agg", "predictor"]
+        }
+        submodules, state_dict, hparams = cls._unpack(d, path, **submodules)
+        hparams.update(kwargs | submodules)
+
+        state_dict = cls._add_metric_task_weights_to_state_dict(state_dict, hparams)
+
+        model = cls(**hparams)
+        model.load_state_dict(state_dict, strict=strict)
+
+        return model
+
     @classmethod
     def _add_metric_task_weights_to_state_dict(cls, state_dict, hparams):
         if "metrics.0.task_weights" not in state_dict:
@@ -289,15 +316,23 @@ class MPNN(pl.LightningModule):
     def load_from_checkpoint(
         cls, checkpoint_path, map_location=None, hparams_file=None, strict=True, **kwargs
     ) -> MPNN:
+        d = torch.load(checkpoint_path, map_location, weights_only=False)
+        if hparams_file is None:
+            model = cls._from_dict(d, checkpoint_path, strict, **kwargs)
+            # like lightning, put the model on the device to which the weights were mapped
+            device = next(
+                (X.device for X in d["state_dict"].values() if isinstance(X, Tensor)), None
+            )
+
+            return model if device is None else model.to(device)
+
         submodules = {
             k: v for k, v in kwargs.items() if k in ["message_passing", "agg", "predictor"]
         }
-        submodules, state_dict, hparams = cls._load(checkpoint_path, map_location, **submodules)
+        submodules, state_dict, hparams = cls._unpack(d, checkpoint_path, **submodules)
         kwargs.update(submodules)
 
-        state_dict = cls._add_metric_task_weights_to_state_dict(state_dict, hparams)
-        d = torch.load(checkpoint_path, map_location, weights_only=False)
-        d["state_dict"] = state_dict
+        d["state_dict"] = cls._add_metric_task_weights_to_state_dict(state_dict, hparams)
         buffer = io.BytesIO()
         torch.save(d, buffer)
         buffer.seek(0)
@@ -305,13 +340,12 @@ class MPNN(pl.LightningModule):
         return super().load_from_checkpoint(buffer, map_location, hparams_file, strict, **kwargs)
 
     @classmethod
-    def load_from_file(cls, model_path, map_location=None, strict=True, **submodules) -> MPNN:
-        submodules, state_dict, hparams = cls._load(model_path, map_location, **submodules)
-        hparams.update(submodules)
-
-        state_dict = cls._add_metric_task_weights_to_state_dict(state_dict, hparams)
-
-        model = cls(**hparams)
-        model.load_state_dict(state_dict, strict=strict)
+    def load_from_file(
+        cls, model_path, map_location=None, strict=True, mmap=False, **submodules
+    ) -> MPNN:
+        """Load a model from a file saved by :func:`~chemprop.models.utils.save_model`. If
+        ``mmap`` is ``True``, the file is memory-mapped rather than read into memory at once.
+        Safetensors files are always memory-mapped."""
+        d = load_model_file(model_path, map_location, mmap)
 
-        return model
+        return cls._from_dict(d, model_path, strict, **submodules)
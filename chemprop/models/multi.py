@@ -63,9 +63,7 @@ class MulticomponentMPNN(MPNN):
         return len(batch[0][0])
 
     @classmethod
-    def _load(cls, path, map_location, **submodules):
-        d = torch.load(path, map_location, weights_only=False)
-
+    def _unpack(cls, d, path, **submodules):
         try:
             hparams = d["hyper_parameters"]
             state_dict = d["state_dict"]
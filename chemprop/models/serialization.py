@@ -0,0 +1,166 @@
+"""Reading and writing of model files in the formats supported by chemprop.
+
+Model files are either pickled dictionaries saved with :func:`torch.save` (``.pt`` and ``.ckpt``)
+or safetensors files (``.safetensors``). A safetensors file stores the weights of a model as raw
+tensors and its hyperparameters as a JSON manifest in the metadata of its header, so it can be
+loaded without unpickling arbitrary objects and is memory-mapped when loaded.
+
+The classes referenced by the hyperparameters (e.g., the class of the message passing or a
+:class:`~chemprop.nn.transforms.ScaleTransform`) are stored by their import path and rebuilt from
+their constructor arguments. Only classes from ``chemprop`` and ``torch.nn`` may be referenced.
+"""
+
+import importlib
+import inspect
+import json
+from os import PathLike
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import torch
+from torch import Tensor, nn
+
+from chemprop.nn.transforms import _ScaleTransformMixin
+
+NO_SAFETENSORS = False
+try:
+    from safetensors import safe_open
+    from safetensors.torch import save_file
+except ImportError:
+    NO_SAFETENSORS = True
+
+SAFETENSORS_SUFFIX = ".safetensors"
+_TRUSTED_PACKAGES = ("chemprop", "torch.nn")
+
+
+def is_safetensors(path: PathLike) -> bool:
+    return Path(path).suffix == SAFETENSORS_SUFFIX
+
+
+def load_model_file(path: PathLike, map_location=None, mmap: bool = False) -> dict:
+    """Load the contents of a model file or checkpoint as a dictionary with (at least) the keys
+    ``"hyper_parameters"`` and ``"state_dict"``. Safetensors files are always memory-mapped, while
+    other files are only memory-mapped if ``mmap`` is ``True``."""
+    if not is_safetensors(path):
+        return torch.load(path, map_location, weights_only=False, mmap=mmap)
+
+    _check_safetensors()
+    device = "cpu" if map_location is None else str(torch.device(map_location))
+    with safe_open(path, framework="pt", device=device) as f:
+        metadata = f.metadata() or {}
+        state_dict = {key: f.get_tensor(key) for key in f.keys()}
+
+    if metadata.get("format") != "chemprop":
+        raise ValueError(f"'{path}' is not a chemprop model file!")
+
+    d = {key: _decode(json.loads(value)) for key, value in metadata.items() if key != "format"}
+    d["state_dict"] = state_dict
+
+    return d
+
+
+def save_safetensors(
+    path: PathLike, hparams: dict, state_dict: dict[str, Tensor], **metadata: Any
+) -> None:
+    """Save the hyperparameters and state dict of a model to a safetensors file along with any
+    additional JSON-serializable ``metadata``, e.g., its ``output_columns``"""
+    _check_safetensors()
+
+    header = {"format": "chemprop", "hyper_parameters": _dumps(_encode(hparams))}
+    header |= {key: _dumps(_encode(value)) for key, value in metadata.items()}
+    # safetensors can't save tensors that share memory, e.g., a loss function that is also a metric
+    tensors = {key: t.detach().cpu().contiguous().clone() for key, t in state_dict.items()}
+
+    save_file(tensors, path, header)
+
+
+def _check_safetensors():
+    if NO_SAFETENSORS:
+        raise ImportError(
+            "Reading and writing safetensors model files requires safetensors to be installed. Run 'pip install safetensors' to install it."
+        )
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"))
+
+
+def _encode(obj: Any) -> Any:
+    """Encode the hyperparameters ``obj`` as a JSON-serializable object"""
+    match obj:
+        case None | bool() | int() | float() | str():
+            return obj
+        case np.generic():
+            return obj.item()
+        case dict():
+            return {str(k): _encode(v) for k, v in obj.items()}
+        case list() | tuple():
+            return [_encode(v) for v in obj]
+        case Tensor():
+            return {"__tensor__": obj.tolist(), "dtype": str(obj.dtype).removeprefix("torch.")}
+        case np.ndarray():
+            return {"__ndarray__": obj.tolist(), "dtype": obj.dtype.str}
+        case type():
+            return {"__class__": _class_path(obj)}
+        case nn.Module():
+            return {"__module__": _class_path(type(obj)), "kwargs": _encode(_init_kwargs(obj))}
+
+    raise TypeError(f"Cannot encode hyperparameter of type {type(obj)} as JSON!")
+
+
+def _decode(obj: Any) -> Any:
+    """Decode the JSON-serializable object ``obj`` encoded by :func:`_encode`"""
+    match obj:
+        case list():
+            return [_decode(v) for v in obj]
+        case {"__tensor__": values, "dtype": dtype}:
+            return torch.tensor(values, dtype=getattr(torch, dtype))
+        case {"__ndarray__": values, "dtype": dtype}:
+            return np.array(values, dtype=dtype)
+        case {"__class__": path}:
+            return _import_class(path)
+        case {"__module__": path, "kwargs": kwargs}:
+            return _import_class(path)(**_decode(kwargs))
+        case dict():
+            return {k: _decode(v) for k, v in obj.items()}
+
+    return obj
+
+
+def _class_path(cls: type) -> str:
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+def _import_class(path: str) -> type:
+    module_name, qualname = path.split(":")
+    if not any(module_name == p or module_name.startswith(f"{p}.") for p in _TRUSTED_PACKAGES):
+        raise ValueError(f"Refusing to load class '{path}' from outside of chemprop and torch.nn!")
+
+    obj = importlib.import_module(module_name)
+    for name in qualname.split("."):
+        obj = getattr(obj, name)
+    if not isinstance(obj, type):
+        raise ValueError(f"'{path}' is not a class!")
+
+    return obj
+
+
+def _init_kwargs(module: nn.Module) -> dict[str, Any]:
+    """Get the constructor arguments with which to rebuild ``module``. Its buffers and parameters
+    are restored from the state dict of the model, so they only need to have the right shapes."""
+    if isinstance(module, _ScaleTransformMixin):
+        return {"mean": module.mean[0].tolist(), "scale": module.scale[0].tolist()}
+
+    kwargs = {}
+    for name, param in inspect.signature(type(module).__init__).parameters.items():
+        if name == "self" or param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            continue
+        if hasattr(module, name):
+            kwargs[name] = getattr(module, name)
+        elif param.default is param.empty:
+            raise TypeError(
+                f"Cannot encode {type(module).__name__}: its required argument '{name}' isn't stored as an attribute!"
+            )
+
+    return kwargs
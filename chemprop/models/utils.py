@@ -4,9 +4,16 @@ import torch
 
 from chemprop.models.model import MPNN
 from chemprop.models.multi import MulticomponentMPNN
+from chemprop.models.serialization import is_safetensors, load_model_file, save_safetensors
 
 
 def save_model(path: PathLike, model: MPNN, output_columns: list[str] = None) -> None:
+    """Save a model to ``path``, as a safetensors file with a JSON manifest of its hyperparameters
+    if ``path`` ends with ``.safetensors`` and with :func:`torch.save` otherwise"""
+    if is_safetensors(path):
+        save_safetensors(path, model.hparams, model.state_dict(), output_columns=output_columns)
+        return
+
     torch.save(
         {
             "hyper_parameters": model.hparams,
@@ -17,16 +24,43 @@ def save_model(path: PathLike, model: MPNN, output_columns: list[str] = None) ->
     )
 
 
-def load_model(path: PathLike, multicomponent: bool) -> MPNN:
-    if multicomponent:
-        model = MulticomponentMPNN.load_from_file(path, map_location=torch.device("cpu"))
-    else:
-        model = MPNN.load_from_file(path, map_location=torch.device("cpu"))
+def load_model(path: PathLike, multicomponent: bool, mmap: bool = False) -> MPNN:
+    model, _ = load_model_with_metadata(path, multicomponent, mmap)
 
     return model
 
 
+def load_model_with_metadata(
+    path: PathLike, multicomponent: bool, mmap: bool = False
+) -> tuple[MPNN, dict]:
+    """Load a model and the metadata stored alongside it from a model file or checkpoint, reading
+    the file only once.
+
+    Parameters
+    ----------
+    path : PathLike
+        the path of the model file or checkpoint
+    multicomponent : bool
+        whether the model is a :class:`MulticomponentMPNN`
+    mmap : bool, default=False
+        whether to memory-map the file rather than read it into memory at once, so that only the
+        weights that are actually used are read from disk. Safetensors files are always
+        memory-mapped.
+
+    Returns
+    -------
+    tuple[MPNN, dict]
+        the model and the remaining contents of the file besides its hyperparameters and weights,
+        e.g., the ``"output_columns"`` of a file saved by :func:`save_model`
+    """
+    d = load_model_file(path, torch.device("cpu"), mmap)
+    metadata = {k: v for k, v in d.items() if k not in ("hyper_parameters", "state_dict")}
+    model_cls = MulticomponentMPNN if multicomponent else MPNN
+
+    return model_cls._from_dict(d, path), metadata
+
+
 def load_output_columns(path: PathLike) -> list[str] | None:
-    model_file = torch.load(path, map_location=torch.device("cpu"), weights_only=False)
+    model_file = load_model_file(path, torch.device("cpu"), mmap=True)
 
     return model_file.get("output_columns")
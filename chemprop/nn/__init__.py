@@ -24,6 +24,8 @@ from .metrics import (
     BinaryF1Score,
     BinaryMCCLoss,
     BinaryMCCMetric,
+    BinnedBinaryAUPRC,
+    BinnedBinaryAUROC,
     BoundedMAE,
     BoundedMixin,
     BoundedMSE,
@@ -98,6 +100,8 @@ __all__ = [
     "MulticlassMCCMetric",
     "BinaryAUROC",
     "BinaryAUPRC",
+    "BinnedBinaryAUROC",
+    "BinnedBinaryAUPRC",
     "BinaryAccuracy",
     "BinaryF1Score",
     "MulticlassDirichletLoss",
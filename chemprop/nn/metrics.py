@@ -6,7 +6,6 @@ from torch import Tensor
 from torch.nn import functional as F
 import torchmetrics
 from torchmetrics.utilities.compute import auc
-from torchmetrics.utilities.data import dim_zero_cat
 
 from chemprop.utils.registry import ClassRegistry
 
@@ -43,6 +42,8 @@ __all__ = [
     "ClassificationMixin",
     "BinaryAUROC",
     "BinaryAUPRC",
+    "BinnedBinaryAUROC",
+    "BinnedBinaryAUPRC",
     "BinaryAccuracy",
     "BinaryF1Score",
     "DirichletLoss",
@@ -278,10 +279,12 @@ class BinaryMCCLoss(ChempropMetric):
         """
         super().__init__(task_weights)
 
-        self.add_state("TP", default=[], dist_reduce_fx="cat")
-        self.add_state("FP", default=[], dist_reduce_fx="cat")
-        self.add_state("TN", default=[], dist_reduce_fx="cat")
-        self.add_state("FN", default=[], dist_reduce_fx="cat")
+        # running sums over the epoch, so memory is constant in the number of batches and
+        # synchronizing the states across processes is a single all-reduce
+        self.add_state("TP", default=torch.tensor(0.0), dist_reduce_fx="sum")
+        self.add_state("FP", default=torch.tensor(0.0), dist_reduce_fx="sum")
+        self.add_state("TN", default=torch.tensor(0.0), dist_reduce_fx="sum")
+        self.add_state("FN", default=torch.tensor(0.0), dist_reduce_fx="sum")
 
     def update(
         self,
@@ -299,10 +302,10 @@ class BinaryMCCLoss(ChempropMetric):
 
         TP, FP, TN, FN = self._calc_unreduced_loss(preds, targets.long(), mask, weights, *args)
 
-        self.TP += [TP]
-        self.FP += [FP]
-        self.TN += [TN]
-        self.FN += [FN]
+        self.TP = self.TP + TP
+        self.FP = self.FP + FP
+        self.TN = self.TN + TN
+        self.FN = self.FN + FN
 
     def _calc_unreduced_loss(self, preds, targets, mask, weights, *args) -> Tensor:
         TP = (targets * preds * weights * mask).sum(0, keepdim=True)
@@ -313,10 +316,7 @@ class BinaryMCCLoss(ChempropMetric):
         return TP, FP, TN, FN
 
     def compute(self):
-        TP = dim_zero_cat(self.TP).sum(0)
-        FP = dim_zero_cat(self.FP).sum(0)
-        TN = dim_zero_cat(self.TN).sum(0)
-        FN = dim_zero_cat(self.FN).sum(0)
+        TP, FP, TN, FN = self.TP, self.FP, self.TN, self.FN
 
         MCC = (TP * TN - FP * FN) / ((TP + FP) * (TP + FN) * (TN + FP) * (TN + FN) + 1e-8).sqrt()
         MCC = MCC * self.task_weights
@@ -348,10 +348,11 @@ class MulticlassMCCLoss(ChempropMetric):
         """
         super().__init__(task_weights)
 
-        self.add_state("p", default=[], dist_reduce_fx="cat")
-        self.add_state("t", default=[], dist_reduce_fx="cat")
-        self.add_state("c", default=[], dist_reduce_fx="cat")
-        self.add_state("s", default=[], dist_reduce_fx="cat")
+        # running sums over the epoch (see :class:`BinaryMCCLoss`)
+        self.add_state("p", default=torch.tensor(0.0), dist_reduce_fx="sum")
+        self.add_state("t", default=torch.tensor(0.0), dist_reduce_fx="sum")
+        self.add_state("c", default=torch.tensor(0.0), dist_reduce_fx="sum")
+        self.add_state("s", default=torch.tensor(0.0), dist_reduce_fx="sum")
 
     def update(
         self,
@@ -371,10 +372,10 @@ class MulticlassMCCLoss(ChempropMetric):
 
         p, t, c, s = self._calc_unreduced_loss(preds, targets.long(), mask, weights, *args)
 
-        self.p += [p]
-        self.t += [t]
-        self.c += [c]
-        self.s += [s]
+        self.p = self.p + p
+        self.t = self.t + t
+        self.c = self.c + c
+        self.s = self.s + s
 
     def _calc_unreduced_loss(self, preds, targets, mask, weights, *args) -> Tensor:
         device = preds.device
@@ -390,10 +391,7 @@ class MulticlassMCCLoss(ChempropMetric):
         return p, t, c, s
 
     def compute(self):
-        p = dim_zero_cat(self.p).sum(0)
-        t = dim_zero_cat(self.t).sum(0)
-        c = dim_zero_cat(self.c).sum(0)
-        s = dim_zero_cat(self.s).sum(0)
+        p, t, c, s = self.p.sum(0), self.t.sum(0), self.c.sum(0), self.s.sum(0)
         s2 = s.square()
 
         # the `einsum` calls amount to calculating the batched dot product
@@ -422,8 +420,10 @@ class ClassificationMixin:
         task_weights :  ArrayLike = 1.0
             .. important::
                 Ignored. Maintained for compatibility with :class:`ChempropMetric`
+        **kwargs
+            keyword arguments to pass to the underlying :mod:`torchmetrics` metric
         """
-        super().__init__()
+        super().__init__(**kwargs)
         task_weights = torch.as_tensor(task_weights, dtype=torch.float).view(1, -1)
         self.register_buffer("task_weights", task_weights)
 
@@ -440,7 +440,54 @@ class BinaryAUROC(ClassificationMixin, torchmetrics.classification.BinaryAUROC):
 class BinaryAUPRC(ClassificationMixin, torchmetrics.classification.BinaryPrecisionRecallCurve):
     def compute(self) -> Tensor:
         p, r, _ = super().compute()
-        return auc(r, p)
+        # with binned thresholds, the precision of a threshold above all predictions is undefined
+        return auc(r, p.nan_to_num(1.0))
+
+
+@MetricRegistry.register("roc-binned")
+class BinnedBinaryAUROC(BinaryAUROC):
+    r"""The AUROC calculated from predictions binned into ``thresholds`` equally spaced bins.
+
+    Unlike :class:`BinaryAUROC`, which stores every prediction of the epoch, this metric only
+    stores a confusion matrix per bin, so its memory is constant in the number of predictions and
+    synchronizing it across processes is a single all-reduce. Binning only loses the ordering of
+    predictions within the same bin: the result differs from the exact AUROC by at most half the
+    fraction of positive-negative pairs whose predictions fall into the same bin, i.e., by at most
+    :math:`\frac{1}{2}\sum_b P_b N_b / (PN)`, where :math:`P_b` and :math:`N_b` are the numbers of
+    positives and negatives in bin :math:`b`.
+
+    Parameters
+    ----------
+    task_weights :  ArrayLike = 1.0
+        .. important::
+            Ignored. Maintained for compatibility with :class:`ChempropMetric`
+    thresholds : int, default=1000
+        the number of bins
+    """
+
+    def __init__(self, task_weights: ArrayLike = 1.0, thresholds: int = 1000, **kwargs):
+        super().__init__(task_weights, thresholds=thresholds, **kwargs)
+
+
+@MetricRegistry.register("prc-binned")
+class BinnedBinaryAUPRC(BinaryAUPRC):
+    """The AUPRC calculated from predictions binned into ``thresholds`` equally spaced bins.
+
+    Like :class:`BinnedBinaryAUROC`, this metric uses constant memory, and binning only loses the
+    ordering of predictions within the same bin, so the error vanishes as the bins get finer and
+    is largest when many positives and negatives share bins.
+
+    Parameters
+    ----------
+    task_weights :  ArrayLike = 1.0
+        .. important::
+            Ignored. Maintained for compatibility with :class:`ChempropMetric`
+    thresholds : int, default=1000
+        the number of bins
+    """
+
+    def __init__(self, task_weights: ArrayLike = 1.0, thresholds: int = 1000, **kwargs):
+        super().__init__(task_weights, thresholds=thresholds, **kwargs)
 
 
 @MetricRegistry.register("accuracy")
@@ -1,14 +1,13 @@
 from abc import ABC, abstractmethod
 import logging
 import math
-from typing import Self
+from typing import Callable, Self
 
 import numpy as np
-from scipy.optimize import fmin
-from scipy.special import expit, logit, softmax
 from sklearn.isotonic import IsotonicRegression
 import torch
 from torch import Tensor
+from torch.nn import functional as F
 
 from chemprop.utils.registry import ClassRegistry
 
@@ -46,6 +45,75 @@ class CalibratorBase(ABC):
 UncertaintyCalibratorRegistry = ClassRegistry[CalibratorBase]()
 
 
+def _minimize(
+    objective: Callable[[Tensor], Tensor],
+    derivatives: Callable[[Tensor], tuple[Tensor, Tensor]],
+    x0: Tensor,
+    max_iter: int = 100,
+    tol: float = 1e-12,
+) -> Tensor:
+    """Minimize the independent objectives of several tasks at once with Newton's method.
+
+    Parameters
+    ----------
+    objective : Callable[[Tensor], Tensor]
+        a function mapping the parameters of each task, a tensor of shape ``t x k``, to the value of
+        the objective of each task, a tensor of shape ``t``
+    derivatives : Callable[[Tensor], tuple[Tensor, Tensor]]
+        a function mapping the parameters of each task to the gradient, of shape ``t x k``, and the
+        Hessian, of shape ``t x k x k``, of the objective of each task
+    x0 : Tensor
+        the initial parameters of shape ``t x k``
+    max_iter : int, default=100
+        the maximum number of iterations
+    tol : float, default=1e-12
+        the decrease of the objective of a task, relative to its value, predicted by a Newton step
+        below which the task is considered converged
+
+    Returns
+    -------
+    Tensor
+        the optimized parameters of shape ``t x k``
+
+    Notes
+    -----
+    Each step uses the absolute values of the eigenvalues of the Hessian, so that it is a descent
+    direction even where an objective is not convex, and is halved until the objective of its task
+    sufficiently decreases.
+    """
+    x = x0.clone()
+    f = objective(x)
+    done = torch.zeros(len(x), dtype=torch.bool)
+
+    for _ in range(max_iter):
+        g, H = derivatives(x)
+        L, V = torch.linalg.eigh(H)
+        L = L.abs().clamp_min(1e-12 * (1 + L.abs().amax(1, keepdim=True)))
+        d = -(V @ ((V.mT @ g.unsqueeze(2)) / L.unsqueeze(2))).squeeze(2)
+        slope = (g * d).sum(1)
+
+        done |= -slope / 2 <= tol * (1 + f.abs())
+        if done.all():
+            break
+
+        step = torch.where(done, 0.0, 1.0).to(x)
+        for _ in range(30):
+            f_new = objective(x + step.unsqueeze(1) * d)
+            accepted = f_new <= f + 1e-4 * step * slope
+            if accepted.all():
+                break
+            step = torch.where(accepted, step, step / 2)
+        else:
+            # the objective of the remaining tasks can't be decreased any further in practice
+            done |= ~accepted
+            step = torch.where(accepted, step, 0.0)
+
+        x = x + step.unsqueeze(1) * d
+        f = torch.where(step > 0, f_new, f)
+
+    return x
+
+
 class RegressionCalibrator(CalibratorBase):
     """
     A class for calibrating the predicted uncertainties in regressions tasks.
@@ -87,24 +155,11 @@ class ZScalingCalibrator(RegressionCalibrator):
     """
 
     def fit(self, preds: Tensor, uncs: Tensor, targets: Tensor, mask: Tensor) -> Self:
-        scalings = np.zeros(uncs.shape[1])
-        for j in range(uncs.shape[1]):
-            mask_j = mask[:, j]
-            preds_j = preds[:, j][mask_j].numpy()
-            uncs_j = uncs[:, j][mask_j].numpy()
-            targets_j = targets[:, j][mask_j].numpy()
-            errors = preds_j - targets_j
-
-            def objective(scaler_value: float):
-                scaled_vars = uncs_j * scaler_value**2
-                nll = np.log(2 * np.pi * scaled_vars) / 2 + errors**2 / (2 * scaled_vars)
-                return nll.sum()
+        # the NLL of each task is minimized by the root mean square of its z-scores
+        errors = (preds - targets).double()
+        z2 = torch.where(mask, errors**2 / uncs.double(), 0.0)
+        self.scalings = (z2.sum(0) / mask.sum(0)).sqrt()
 
-            zscore = errors / np.sqrt(uncs_j)
-            initial_guess = np.std(zscore)
-            scalings[j] = fmin(objective, x0=initial_guess, disp=False)
-
-        self.scalings = torch.tensor(scalings)
         return self
 
     def apply(self, uncs: Tensor) -> Tensor:
@@ -187,25 +242,45 @@ class MVEWeightingCalibrator(RegressionCalibrator):
         self : MVEWeightingCalibrator
             the fitted calibrator
         """
-        scalings = []
-        for j in range(uncs.shape[2]):
-            mask_j = mask[:, j]
-            preds_j = preds[:, j][mask_j].numpy()
-            uncs_j = uncs[:, mask_j, j].numpy()
-            targets_j = targets[:, j][mask_j].numpy()
-            errors = preds_j - targets_j
+        uncs = torch.where(mask, uncs.double(), 1.0).permute(2, 1, 0).contiguous()  # (t, n, m)
+        errors = (preds - targets).double().T
+        mask = mask.T
+
+        def scaled_vars(scaler_values: Tensor) -> Tensor:  # (t, n)
+            return (uncs @ scaler_values.softmax(1).unsqueeze(2)).squeeze(2)
+
+        def objective(scaler_values: Tensor) -> Tensor:
+            vars = scaled_vars(scaler_values)
+            nll = torch.log(2 * torch.pi * vars) / 2 + errors**2 / (2 * vars)
+            return torch.where(mask, nll, 0.0).sum(1)
+
+        def derivatives(scaler_values: Tensor) -> tuple[Tensor, Tensor]:
+            vars = scaled_vars(scaler_values)
+            # the first and second derivatives of the NLL w.r.t. the scaled variances
+            d1 = torch.where(mask, 1 / (2 * vars) - errors**2 / (2 * vars**2), 0.0)
+            d2 = torch.where(mask, -1 / (2 * vars**2) + errors**2 / vars**3, 0.0)
+            # ... w.r.t. the weights, w
+            g_w = (uncs.mT @ d1.unsqueeze(2)).squeeze(2)
+            H_w = uncs.mT @ (d2.unsqueeze(2) * uncs)
+            # ... and w.r.t. the scaler values, z, where w = softmax(z) and dw/dz = J
+            w = scaler_values.softmax(1)
+            J = torch.diag_embed(w) - w.unsqueeze(2) * w.unsqueeze(1)
+            wg = w * g_w
+            s = wg.sum(1, keepdim=True).unsqueeze(2)
+            H = (
+                J @ H_w @ J
+                + torch.diag_embed(wg - s.squeeze(2) * w)
+                - wg.unsqueeze(2) * w.unsqueeze(1)
+                - w.unsqueeze(2) * wg.unsqueeze(1)
+                + 2 * s * w.unsqueeze(2) * w.unsqueeze(1)
+            )
 
-            def objective(scaler_values: np.ndarray):
-                scaler_values = np.reshape(softmax(scaler_values), [-1, 1])  # (m, 1)
-                scaled_vars = np.sum(uncs_j * scaler_values, axis=0, keepdims=False)
-                nll = np.log(2 * np.pi * scaled_vars) / 2 + errors**2 / (2 * scaled_vars)
-                return np.sum(nll)
+            return (J @ g_w.unsqueeze(2)).squeeze(2), H
 
-            initial_guess = np.ones(uncs_j.shape[0])
-            sol = fmin(objective, x0=initial_guess, disp=False)
-            scalings.append(torch.tensor(softmax(sol)))
+        x0 = torch.zeros(uncs.shape[0], uncs.shape[2], dtype=torch.double)
+        scalings = _minimize(objective, derivatives, x0).softmax(1)
 
-        self.scalings = torch.stack(scalings).t().unsqueeze(1)
+        self.scalings = scalings.t().unsqueeze(1)
         return self
 
     def apply(self, uncs: Tensor) -> Tensor:
@@ -385,24 +460,35 @@ class PlattCalibrator(BinaryClassificationCalibrator):
         else:
             logger.info("No training targets were provided. No Bayesian correction is applied.")
 
-        xs = []
-        for j in range(uncs.shape[1]):
-            mask_j = mask[:, j]
-            uncs_j = uncs[:, j][mask_j].numpy()
-            targets_j = targets[:, j][mask_j].numpy()
-
-            def objective(parameters):
-                a, b = parameters
-                scaled_uncs = expit(a * logit(uncs_j) + b)
-                nll = -1 * np.sum(
-                    targets_j * np.log(scaled_uncs) + (1 - targets_j) * np.log(1 - scaled_uncs)
-                )
-                return nll
+        logits = torch.where(mask, torch.logit(uncs.double()), 0.0)
+        targets = targets.double()
+
+        def objective(parameters: Tensor) -> Tensor:  # (t, 2)
+            a, b = parameters.T
+            scaled_logits = a * logits + b
+            # -(y log(sigmoid(x)) + (1 - y) log(1 - sigmoid(x))) = softplus(x) - y * x
+            nll = F.softplus(scaled_logits) - targets * scaled_logits
+            return torch.where(mask, nll, 0.0).sum(0)
+
+        def derivatives(parameters: Tensor) -> tuple[Tensor, Tensor]:
+            a, b = parameters.T
+            scaled_uncs = torch.sigmoid(a * logits + b)
+            d1 = torch.where(mask, scaled_uncs - targets, 0.0)
+            d2 = torch.where(mask, scaled_uncs * (1 - scaled_uncs), 0.0)
+            g = torch.stack([(d1 * logits).sum(0), d1.sum(0)], 1)
+            H_ab = (d2 * logits).sum(0)
+            H = torch.stack(
+                [
+                    torch.stack([(d2 * logits**2).sum(0), H_ab], 1),
+                    torch.stack([H_ab, d2.sum(0)], 1),
+                ],
+                1,
+            )
 
-            xs.append(fmin(objective, x0=[1, 0], disp=False))
+            return g, H
 
-        xs = np.vstack(xs)
-        self.a, self.b = torch.tensor(xs).T.unbind(dim=0)
+        x0 = torch.tensor([1.0, 0.0], dtype=torch.double).expand(uncs.shape[1], 2)
+        self.a, self.b = _minimize(objective, derivatives, x0).unbind(dim=1)
 
         return self
 
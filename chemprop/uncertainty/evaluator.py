@@ -97,17 +97,19 @@ class CalibrationAreaEvaluator(RegressionEvaluator):
             a tensor of the shape ``t`` containing the evaluated metrics
         """
         bins = torch.arange(1, num_bins)
-        bin_scaling = torch.special.erfinv(bins / num_bins).view(-1, 1, 1) * np.sqrt(2)
+        bin_scaling = torch.special.erfinv(bins / num_bins) * np.sqrt(2)
         errors = torch.abs(preds - targets)
-        uncs = torch.sqrt(uncs).unsqueeze(0)
-        bin_unc = uncs * bin_scaling
-        bin_count = bin_unc >= errors.unsqueeze(0)
-        mask = mask.unsqueeze(0)
-        observed_auc = (bin_count & mask).sum(1) / mask.sum(1)
+        # an error is within the scaled uncertainty of a bin if its z-score is within the scaling,
+        # so the observed fraction of each bin is the cumulative count of the sorted z-scores
+        zscores = torch.where(errors == 0, 0.0, errors / torch.sqrt(uncs))
+        zscores = torch.where(mask, zscores, torch.inf).T.sort(dim=1).values.contiguous()
+        bin_scaling = bin_scaling.to(zscores).expand(len(zscores), -1).contiguous()
+        bin_count = torch.searchsorted(zscores, bin_scaling, right=True)
+        observed_auc = bin_count / mask.sum(0, keepdim=True).T
         num_tasks = uncs.shape[-1]
         observed_auc = torch.cat(
-            [torch.zeros(1, num_tasks), observed_auc, torch.ones(1, num_tasks)]
-        ).T
+            [torch.zeros(num_tasks, 1), observed_auc, torch.ones(num_tasks, 1)], dim=1
+        )
         ideal_auc = torch.arange(num_bins + 1) / num_bins
         miscal_area = (1 / num_bins) * (observed_auc - ideal_auc).abs().sum(dim=1)
         return miscal_area
@@ -157,20 +159,24 @@ class ExpectedNormalizedErrorEvaluator(RegressionEvaluator):
         Tensor
             a tensor of the shape ``t`` containing the evaluated metrics
         """
-        masked_preds = preds * mask
-        masked_targets = targets * mask
         masked_uncs = uncs * mask
-        errors = torch.abs(masked_preds - masked_targets)
+        errors = torch.abs(preds - targets) * mask
 
-        sort_idx = torch.argsort(masked_uncs, dim=0)
-        sorted_uncs = torch.gather(masked_uncs, 0, sort_idx)
+        sorted_uncs, sort_idx = torch.sort(masked_uncs, dim=0)
         sorted_errors = torch.gather(errors, 0, sort_idx)
 
-        split_unc = torch.chunk(sorted_uncs, num_bins, dim=0)
-        split_error = torch.chunk(sorted_errors, num_bins, dim=0)
+        # the bins are the (possibly fewer than `num_bins`) chunks of the sorted predictions given
+        # by `torch.chunk`
+        bin_size = -(-len(uncs) // num_bins)
+        bin_idxs = torch.arange(len(uncs), device=uncs.device) // bin_size
+        n_bins = int(bin_idxs[-1]) + 1
+        bin_counts = torch.bincount(bin_idxs, minlength=n_bins).unsqueeze(1)
 
-        root_mean_vars = torch.sqrt(torch.stack([chunk.mean(0) for chunk in split_unc]))
-        rmses = torch.sqrt(torch.stack([chunk.pow(2).mean(0) for chunk in split_error]))
+        def bin_means(X: Tensor) -> Tensor:
+            return X.new_zeros(n_bins, X.shape[1]).index_add_(0, bin_idxs, X) / bin_counts
+
+        root_mean_vars = torch.sqrt(bin_means(sorted_uncs))
+        rmses = torch.sqrt(bin_means(sorted_errors.pow(2)))
 
         ence = torch.mean(torch.abs(root_mean_vars - rmses) / root_mean_vars, dim=0)
         return ence
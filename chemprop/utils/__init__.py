@@ -1,4 +1,15 @@
+from .profiling import Profiler, ProfilingCallback, profile, timer
 from .registry import ClassRegistry, Factory
 from .utils import EnumMapping, make_mol, pretty_shape
 
-__all__ = ["ClassRegistry", "Factory", "EnumMapping", "make_mol", "pretty_shape"]
+__all__ = [
+    "ClassRegistry",
+    "Factory",
+    "EnumMapping",
+    "make_mol",
+    "pretty_shape",
+    "Profiler",
+    "ProfilingCallback",
+    "profile",
+    "timer",
+]
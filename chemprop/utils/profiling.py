@@ -0,0 +1,348 @@
+"""Opt-in wall-clock profiling of the stages of the data and model pipelines.
+
+Stages are timed with the :func:`timer` context manager, which records into the active
+:class:`Profiler`, if any, and otherwise does nothing. The data pipeline (featurization and
+collation) and the host-device transfer are instrumented with :func:`timer`, while the stages of
+a model (message passing, aggregation, and the FFN) are timed by the forward hooks of a
+:class:`ProfilingCallback`::
+
+    trainer = pl.Trainer(callbacks=[ProfilingCallback("profile/")])
+    trainer.fit(model, train_loader, val_loader)
+
+.. note::
+    Only stages running in the process of the active :class:`Profiler` are recorded, so the
+    featurization and collation of batches loaded by :class:`~torch.utils.data.DataLoader` workers
+    (i.e., with ``num_workers > 0``) are not.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+import json
+import logging
+import os
+from os import PathLike
+from pathlib import Path
+import sys
+import threading
+import time
+from typing import ContextManager, Iterator
+
+from lightning import pytorch as pl
+import pandas as pd
+import torch
+from torch import nn
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+_PROFILER: Profiler | None = None
+
+
+@dataclass
+class StageStats:
+    """The accumulated statistics of a profiled stage"""
+
+    n_calls: int = 0
+    time: float = 0.0
+    """the total wall time in seconds"""
+    n_mols: int = 0
+    n_atoms: int = 0
+    peak_memory: int | None = None
+    """the peak memory of the process in bytes at the end of any call, if known"""
+
+    @property
+    def mols_per_s(self) -> float:
+        return self.n_mols / self.time if self.time > 0 else float("nan")
+
+    @property
+    def atoms_per_s(self) -> float:
+        return self.n_atoms / self.time if self.time > 0 else float("nan")
+
+
+class Profiler:
+    """A :class:`Profiler` records the wall time, throughput, and peak memory of named stages.
+
+    Each call of a stage is recorded both into the accumulated :class:`StageStats` of the stage and
+    as a complete event of a Chrome trace, which may be viewed with ``chrome://tracing`` or
+    Perfetto.
+
+    Parameters
+    ----------
+    device : str | torch.device, default="cpu"
+        the device on which the profiled computations run. For CUDA devices, the device is
+        synchronized at the start and end of each stage, so that the recorded times include the
+        asynchronously executed kernels, and the peak memory is the peak memory allocated on the
+        device. Otherwise, the peak memory is the peak resident set size of the process.
+    """
+
+    def __init__(self, device: str | torch.device = "cpu"):
+        self.device = device
+        self.stats: dict[str, StageStats] = {}
+        self.events: list[dict] = []
+        self._t0 = time.perf_counter()
+
+    @property
+    def device(self) -> torch.device:
+        return self.__device
+
+    @device.setter
+    def device(self, device: str | torch.device):
+        self.__device = torch.device(device)
+
+    def start(self, synchronize: bool = True) -> float:
+        """Start timing a stage and return its start time, to be passed to :meth:`stop`. Stages
+        that don't run on the device may pass ``synchronize=False`` to avoid stalling it."""
+        if synchronize:
+            self._synchronize()
+
+        return time.perf_counter()
+
+    def stop(
+        self, name: str, start: float, n_mols: int = 0, n_atoms: int = 0, synchronize: bool = True
+    ):
+        """Stop timing the stage ``name`` started at ``start`` and record its statistics"""
+        if synchronize:
+            self._synchronize()
+        end = time.perf_counter()
+        peak_memory = self._peak_memory()
+
+        stats = self.stats.setdefault(name, StageStats())
+        stats.n_calls += 1
+        stats.time += end - start
+        stats.n_mols += n_mols
+        stats.n_atoms += n_atoms
+        if peak_memory is not None:
+            stats.peak_memory = max(stats.peak_memory or 0, peak_memory)
+
+        self.events.append(
+            {
+                "name": name,
+                "ph": "X",
+                "ts": (start - self._t0) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": {"n_mols": n_mols, "n_atoms": n_atoms},
+            }
+        )
+
+    @contextmanager
+    def stage(
+        self, name: str, n_mols: int = 0, n_atoms: int = 0, synchronize: bool = True
+    ) -> Iterator[None]:
+        """Time the enclosed block as a call of the stage ``name`` processing ``n_mols``
+        molecules with a total of ``n_atoms`` atoms"""
+        start = self.start(synchronize)
+        try:
+            yield
+        finally:
+            self.stop(name, start, n_mols, n_atoms, synchronize)
+
+    def summary(self) -> pd.DataFrame:
+        """Summarize the statistics of each stage, sorted by descending total time"""
+        rows = [
+            {
+                "stage": name,
+                "calls": stats.n_calls,
+                "total_s": stats.time,
+                "mean_ms": 1e3 * stats.time / stats.n_calls,
+                "mols_per_s": stats.mols_per_s if stats.n_mols > 0 else float("nan"),
+                "atoms_per_s": stats.atoms_per_s if stats.n_atoms > 0 else float("nan"),
+                "peak_memory_MiB": (
+                    stats.peak_memory / 2**20 if stats.peak_memory is not None else float("nan")
+                ),
+            }
+            for name, stats in self.stats.items()
+        ]
+        columns = [
+            "stage",
+            "calls",
+            "total_s",
+            "mean_ms",
+            "mols_per_s",
+            "atoms_per_s",
+            "peak_memory_MiB",
+        ]
+
+        return pd.DataFrame(rows, columns=columns).sort_values("total_s", ascending=False)
+
+    def save(self, output_dir: PathLike):
+        """Save the summary to ``profile_summary.csv`` and the trace to ``profile_trace.json`` in
+        the directory ``output_dir``"""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        self.summary().to_csv(output_dir / "profile_summary.csv", index=False)
+        with open(output_dir / "profile_trace.json", "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+        logger.info(f"Profile saved to '{output_dir}'")
+
+    def _synchronize(self):
+        if self.device.type == "cuda":
+            torch.cuda.synchronize(self.device)
+
+    def _peak_memory(self) -> int | None:
+        if self.device.type == "cuda":
+            return torch.cuda.max_memory_allocated(self.device)
+        if resource is None:
+            return None
+
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+        return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def get_profiler() -> Profiler | None:
+    """Get the active :class:`Profiler`, if any"""
+    return _PROFILER
+
+
+@contextmanager
+def profile(profiler: Profiler | None = None) -> Iterator[Profiler]:
+    """Activate the given :class:`Profiler` (by default, a new one) within the enclosed block"""
+    global _PROFILER
+
+    profiler = profiler or Profiler()
+    prev_profiler, _PROFILER = _PROFILER, profiler
+    try:
+        yield profiler
+    finally:
+        _PROFILER = prev_profiler
+
+
+def timer(name: str, n_mols: int = 0, n_atoms: int = 0, synchronize: bool = True) -> ContextManager:
+    """Time the enclosed block as a call of the stage ``name`` with the active :class:`Profiler`,
+    or do nothing if there is none (see :meth:`Profiler.stage`)"""
+    if _PROFILER is None:
+        return nullcontext()
+
+    return _PROFILER.stage(name, n_mols, n_atoms, synchronize)
+
+
+class ProfilingCallback(pl.Callback):
+    """Profile the stages of training, validation, testing, and prediction.
+
+    Each batch is recorded as a ``"{stage}_batch"`` stage and each backward pass as a
+    ``"backward"`` stage. The message passing, aggregation, and FFN of every
+    :class:`~chemprop.models.MPNN` in the module being run (e.g., of each model of an
+    :class:`~chemprop.models.EnsembleMPNN`) are recorded as the ``"message_passing"``, ``"agg"``,
+    and ``"ffn"`` stages. Along with the stages instrumented with :func:`timer`, these are recorded
+    into the active :class:`Profiler` if there is one (e.g., one activated with :func:`profile` to
+    profile several trainers together) and otherwise into :attr:`profiler`, which is activated
+    while the trainer runs and saved to ``output_dir`` when it finishes.
+
+    Parameters
+    ----------
+    output_dir : PathLike | None, default=None
+        the directory to which to save the profile of :attr:`profiler` (see :meth:`Profiler.save`)
+        after each run of the trainer. If ``None``, the profile is not saved.
+    """
+
+    def __init__(self, output_dir: PathLike | None = None):
+        self.output_dir = output_dir
+        self.profiler = Profiler()
+
+        self._owns_profiler = False
+        self._handles = []
+        self._batch_start: float | None = None
+        self._backward_start: float | None = None
+        self._batch_size = (0, 0)
+
+    def setup(self, trainer: pl.Trainer, pl_module: pl.LightningModule, stage: str):
+        global _PROFILER
+
+        self._owns_profiler = _PROFILER is None
+        if self._owns_profiler:
+            _PROFILER = self.profiler
+        # the module is only moved to the accelerator after setup, but the device is already known
+        _PROFILER.device = trainer.strategy.root_device
+
+        for module in pl_module.modules():
+            if all(hasattr(module, attr) for attr in ("message_passing", "agg", "predictor")):
+                self._register_hooks(module.message_passing, "message_passing", True)
+                self._register_hooks(module.agg, "agg")
+                self._register_hooks(module.predictor.ffn, "ffn")
+
+    def teardown(self, trainer: pl.Trainer, pl_module: pl.LightningModule, stage: str):
+        global _PROFILER
+
+        for handle in self._handles:
+            handle.remove()
+        self._handles = []
+
+        if self._owns_profiler:
+            _PROFILER = None
+            self._owns_profiler = False
+
+            logger.info(f"Profile:\n{self.profiler.summary().to_string(index=False)}")
+            if self.output_dir is not None:
+                self.profiler.save(self.output_dir)
+
+    def _register_hooks(self, module: nn.Module, name: str, counts_batch: bool = False):
+        starts = []
+
+        def pre_hook(module, args):
+            if counts_batch:
+                self._batch_size = _count(args[0])
+            starts.append(_PROFILER.start())
+
+        def hook(module, args, output):
+            _PROFILER.stop(name, starts.pop(), *self._batch_size)
+
+        self._handles.append(module.register_forward_pre_hook(pre_hook))
+        self._handles.append(module.register_forward_hook(hook))
+
+    def _on_batch_start(self):
+        self._batch_start = _PROFILER.start()
+
+    def _on_batch_end(self, stage: str, batch):
+        _PROFILER.stop(f"{stage}_batch", self._batch_start, *_count(batch[0]))
+
+    def on_train_batch_start(self, trainer, pl_module, batch, batch_idx):
+        self._on_batch_start()
+
+    def on_train_batch_end(self, trainer, pl_module, outputs, batch, batch_idx):
+        self._on_batch_end("train", batch)
+
+    def on_validation_batch_start(self, trainer, pl_module, batch, batch_idx, dataloader_idx=0):
+        self._on_batch_start()
+
+    def on_validation_batch_end(
+        self, trainer, pl_module, outputs, batch, batch_idx, dataloader_idx=0
+    ):
+        self._on_batch_end("validation", batch)
+
+    def on_test_batch_start(self, trainer, pl_module, batch, batch_idx, dataloader_idx=0):
+        self._on_batch_start()
+
+    def on_test_batch_end(self, trainer, pl_module, outputs, batch, batch_idx, dataloader_idx=0):
+        self._on_batch_end("test", batch)
+
+    def on_predict_batch_start(self, trainer, pl_module, batch, batch_idx, dataloader_idx=0):
+        self._on_batch_start()
+
+    def on_predict_batch_end(self, trainer, pl_module, outputs, batch, batch_idx, dataloader_idx=0):
+        self._on_batch_end("predict", batch)
+
+    def on_before_backward(self, trainer, pl_module, loss):
+        self._backward_start = _PROFILER.start()
+
+    def on_after_backward(self, trainer, pl_module):
+        _PROFILER.stop("backward", self._backward_start, *self._batch_size)
+
+
+def _count(bmg) -> tuple[int, int]:
+    """Count the molecules and atoms of a :class:`~chemprop.data.BatchMolGraph` or of the first
+    component of a list of them"""
+    if isinstance(bmg, (list, tuple)):
+        bmg = bmg[0]
+
+    return len(bmg), len(bmg.V)
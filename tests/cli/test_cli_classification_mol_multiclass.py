@@ -1,6 +1,8 @@
 """This tests the CLI functionality of training and predicting a regression model on a single molecule.
 """
 
+import numpy as np
+import pandas as pd
 import pytest
 
 from chemprop.cli.main import main
@@ -196,6 +198,42 @@ def test_predict_output_structure(monkeypatch, data_path, model_path, tmp_path):
     assert (tmp_path / "preds_individual.csv").exists()
 
 
+def test_predict_probability_columns(monkeypatch, data_path, model_path, tmp_path):
+    args = [
+        "chemprop",
+        "predict",
+        "-i",
+        data_path,
+        "--model-path",
+        model_path,
+        model_path,
+        "--output",
+        str(tmp_path / "preds.csv"),
+        "--class-probability-format",
+        "columns",
+        "--drop-extra-columns",
+    ]
+
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", args)
+        main()
+
+    df = pd.read_csv(tmp_path / "preds.csv")
+    assert list(df.columns) == [
+        "smiles",
+        "pred_0",
+        "pred_0_prob_0",
+        "pred_0_prob_1",
+        "pred_0_prob_2",
+    ]
+    np.testing.assert_array_equal(
+        df["pred_0"], df[["pred_0_prob_0", "pred_0_prob_1", "pred_0_prob_2"]].values.argmax(1)
+    )
+
+    df_individual = pd.read_csv(tmp_path / "preds_individual.csv")
+    assert "pred_0_prob_2_model_1" in df_individual.columns
+
+
 @pytest.mark.parametrize("ffn_block_index", ["0", "1"])
 def test_fingerprint_output_structure(
     monkeypatch, data_path, model_path, tmp_path, ffn_block_index
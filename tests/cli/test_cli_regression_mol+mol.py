@@ -3,6 +3,7 @@
 
 import json
 
+import pandas as pd
 import pytest
 
 from chemprop.cli.main import main
@@ -98,6 +99,53 @@ def test_predict_quick(monkeypatch, data_path, model_path):
         main()
 
 
+def test_predict_chunked_features(monkeypatch, data_path, tmp_path):
+    (
+        input_path,
+        desc_path,
+        atom_feat_path_0,
+        atom_feat_path_1,
+        bond_feat_path_0,
+        atom_desc_path_1,
+    ) = data_path
+    feature_args = [
+        "--smiles-columns",
+        "smiles",
+        "solvent",
+        "--descriptors-path",
+        desc_path,
+        "--atom-features-path",
+        *atom_feat_path_0,
+        "--atom-features-path",
+        *atom_feat_path_1,
+        "--bond-features-path",
+        *bond_feat_path_0,
+        "--atom-descriptors-path",
+        *atom_desc_path_1,
+    ]
+    train_args = ["chemprop", "train", "-i", input_path, *feature_args, "--epochs", "3"]
+    train_args += ["--num-workers", "0", "--output-dir", str(tmp_path)]
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", train_args)
+        main()
+
+    args = ["chemprop", "predict", "-i", input_path, *feature_args]
+    args += ["--model-path", str(tmp_path / "model_0" / "best.pt")]
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", args + ["--output", str(tmp_path / "preds.csv")])
+        main()
+    with monkeypatch.context() as m:
+        m.setattr(
+            "sys.argv",
+            args + ["--output", str(tmp_path / "preds_chunked.csv"), "--chunk-size", "7"],
+        )
+        main()
+
+    df = pd.read_csv(tmp_path / "preds.csv")
+    df_chunked = pd.read_csv(tmp_path / "preds_chunked.csv")
+    pd.testing.assert_frame_equal(df, df_chunked)
+
+
 @pytest.mark.parametrize("ffn_block_index", ["0", "1"])
 def test_fingerprint_quick(monkeypatch, data_path, model_path, ffn_block_index):
     input_path, _, _, _, _, _ = data_path
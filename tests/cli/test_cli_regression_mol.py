@@ -3,6 +3,7 @@
 
 import json
 
+import pandas as pd
 import pytest
 import torch
 
@@ -10,6 +11,7 @@ from chemprop.cli.hpopt import NO_HYPEROPT, NO_OPTUNA, NO_RAY
 from chemprop.cli.main import main
 from chemprop.cli.train import TrainSubcommand
 from chemprop.models.model import MPNN
+from chemprop.models.serialization import NO_SAFETENSORS
 
 pytestmark = pytest.mark.CLI
 
@@ -286,6 +288,113 @@ def test_train_output_structure_replicate_ensemble(monkeypatch, data_path, tmp_p
     assert (tmp_path / "replicate_2" / "train_smiles.csv").exists()
 
 
+def test_train_joint_ensemble(monkeypatch, data_path, tmp_path):
+    input_path, *_ = data_path
+    args = [
+        "chemprop",
+        "train",
+        "-i",
+        input_path,
+        "--epochs",
+        "3",
+        "--num-workers",
+        "0",
+        "--save-dir",
+        str(tmp_path),
+        "--ensemble-size",
+        "2",
+        "--joint-ensemble",
+    ]
+
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", args)
+        main()
+
+    for model_idx in range(2):
+        model_dir = tmp_path / f"model_{model_idx}"
+        assert (model_dir / "best.pt").exists()
+        assert (model_dir / "checkpoints" / "last.ckpt").exists()
+        assert (model_dir / "test_predictions.csv").exists()
+
+    model = MPNN.load_from_checkpoint(tmp_path / "model_1" / "checkpoints" / "last.ckpt")
+    assert model is not None
+
+
+def test_train_parallel_jobs(monkeypatch, data_path, tmp_path):
+    input_path, *_ = data_path
+    args = [
+        "chemprop",
+        "train",
+        "-i",
+        input_path,
+        "--epochs",
+        "3",
+        "--num-workers",
+        "0",
+        "--save-dir",
+        str(tmp_path),
+        "--num-replicates",
+        "2",
+        "--ensemble-size",
+        "2",
+        "--parallel-jobs",
+        "2",
+        "--threads-per-job",
+        "1",
+    ]
+
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", args)
+        main()
+
+    for replicate_idx in range(2):
+        for model_idx in range(2):
+            model_dir = tmp_path / f"replicate_{replicate_idx}" / f"model_{model_idx}"
+            assert (model_dir / "best.pt").exists()
+            assert (model_dir / "test_predictions.csv").exists()
+
+
+def test_train_index_splits(monkeypatch, data_path, tmp_path):
+    (
+        input_path,
+        descriptors_path,
+        atom_features_path,
+        bond_features_path,
+        atom_descriptors_path,
+    ) = data_path
+    args = [
+        "chemprop",
+        "train",
+        "-i",
+        input_path,
+        "--epochs",
+        "3",
+        "--num-workers",
+        "0",
+        "--save-dir",
+        str(tmp_path),
+        "--save-smiles-splits",
+        "--num-replicates",
+        "2",
+        "--index-splits",
+        "--descriptors-path",
+        descriptors_path,
+        "--atom-features-path",
+        atom_features_path,
+        "--bond-features-path",
+        bond_features_path,
+        "--atom-descriptors-path",
+        atom_descriptors_path,
+    ]
+
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", args)
+        main()
+
+    assert (tmp_path / "replicate_1" / "model_0" / "best.pt").exists()
+    assert (tmp_path / "replicate_1" / "train_smiles.csv").exists()
+
+
 def test_train_csv_splits(monkeypatch, data_dir, tmp_path):
     input_path = str(data_dir / "regression" / "mol" / "mol_with_splits.csv")
     args = [
@@ -365,6 +474,115 @@ def test_predict_output_structure(monkeypatch, data_path, model_path, tmp_path):
     assert (tmp_path / "preds_individual.csv").exists()
 
 
+def test_predict_chunked(monkeypatch, data_path, mve_model_path, tmp_path):
+    input_path, *_ = data_path
+    args = [
+        "chemprop",
+        "predict",
+        "-i",
+        input_path,
+        "--model-path",
+        mve_model_path,
+        mve_model_path,
+        "--cal-path",
+        input_path,
+        "--uncertainty-method",
+        "mve",
+        "--calibration-method",
+        "zscaling",
+        "--evaluation-methods",
+        "nll-regression",
+    ]
+
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", args + ["--output", str(tmp_path / "preds.csv")])
+        main()
+    with monkeypatch.context() as m:
+        m.setattr(
+            "sys.argv",
+            args + ["--output", str(tmp_path / "preds_chunked.csv"), "--chunk-size", "7"],
+        )
+        main()
+
+    for suffix in ["", "_individual"]:
+        df = pd.read_csv(tmp_path / f"preds{suffix}.csv")
+        df_chunked = pd.read_csv(tmp_path / f"preds_chunked{suffix}.csv")
+        pd.testing.assert_frame_equal(df, df_chunked)
+
+
+def test_predict_cached(monkeypatch, data_path, model_path, tmp_path):
+    input_path, *_ = data_path
+    half_path = tmp_path / "half.csv"
+    pd.read_csv(input_path).iloc[::2].to_csv(half_path, index=False)
+    cache_path = tmp_path / "cache.sqlite"
+
+    for path, output, cache_args in [
+        (input_path, "preds.csv", []),
+        (str(half_path), "preds_half.csv", ["--prediction-cache", str(cache_path)]),
+        (input_path, "preds_cached.csv", ["--prediction-cache", str(cache_path)]),
+    ]:
+        args = ["chemprop", "predict", "-i", path, "--model-path", model_path]
+        with monkeypatch.context() as m:
+            m.setattr("sys.argv", args + ["--output", str(tmp_path / output)] + cache_args)
+            main()
+
+    df = pd.read_csv(tmp_path / "preds.csv")
+    pd.testing.assert_frame_equal(df, pd.read_csv(tmp_path / "preds_cached.csv"))
+    pd.testing.assert_frame_equal(
+        df.iloc[::2].reset_index(drop=True), pd.read_csv(tmp_path / "preds_half.csv")
+    )
+
+
+@pytest.mark.skipif(NO_SAFETENSORS, reason="safetensors not installed")
+def test_predict_safetensors(monkeypatch, data_path, model_path, tmp_path):
+    input_path, *_ = data_path
+    st_path = str(tmp_path / "model.safetensors")
+
+    args = ["chemprop", "convert", "-i", model_path, "-o", st_path]
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", args)
+        main()
+
+    for path, output in [(model_path, "preds.csv"), (st_path, "preds_st.csv")]:
+        args = ["chemprop", "predict", "-i", input_path, "--model-path", path]
+        with monkeypatch.context() as m:
+            m.setattr("sys.argv", args + ["--output", str(tmp_path / output)])
+            main()
+
+    pd.testing.assert_frame_equal(
+        pd.read_csv(tmp_path / "preds.csv"), pd.read_csv(tmp_path / "preds_st.csv")
+    )
+
+
+def test_predict_parquet_chunked(monkeypatch, data_path, model_path, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    input_path, *_ = data_path
+
+    # an extra column that is parsed as integers in the first chunk but as floats in the others
+    df = pd.read_csv(input_path)
+    df["id"] = pd.array([i if i < 7 else None for i in range(len(df))], dtype="Int64")
+    input_path = tmp_path / "input.csv"
+    df.to_csv(input_path, index=False)
+
+    args = ["chemprop", "predict", "-i", str(input_path), "--model-path", model_path]
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", args + ["--output", str(tmp_path / "preds.csv")])
+        main()
+    with monkeypatch.context() as m:
+        m.setattr(
+            "sys.argv", args + ["--output", str(tmp_path / "preds.parquet"), "--chunk-size", "7"]
+        )
+        main()
+
+    assert pq.read_schema(tmp_path / "preds.parquet").field("id").type == pa.int64()
+    pd.testing.assert_frame_equal(
+        pd.read_parquet(tmp_path / "preds.parquet"),
+        pd.read_csv(tmp_path / "preds.csv"),
+        check_dtype=False,
+    )
+
+
 @pytest.mark.parametrize("ffn_block_index", ["0", "1"])
 def test_fingerprint_output_structure(
     monkeypatch, data_path, model_path, tmp_path, ffn_block_index
@@ -574,3 +792,71 @@ def test_hyperopt_quick(monkeypatch, data_path, tmp_path):
         main()
 
     assert (tmp_path / "model_0" / "best.pt").exists()
+
+
+@pytest.mark.skipif(NO_RAY, reason="Ray not installed")
+def test_hyperband_resume(monkeypatch, data_path, tmp_path):
+    input_path, *_ = data_path
+
+    args = [
+        "chemprop",
+        "hpopt",
+        "-i",
+        input_path,
+        "--epochs",
+        "4",
+        "--hpopt-save-dir",
+        str(tmp_path),
+        "--raytune-num-samples",
+        "2",
+        "--raytune-search-algorithm",
+        "random",
+        "--raytune-trial-scheduler",
+        "HyperBand",
+    ]
+
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", args)
+        main()
+
+    assert (tmp_path / "best_checkpoint.ckpt").exists()
+
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", args + ["--raytune-resume"])
+        main()
+
+    assert len(list((tmp_path / "ray_results").iterdir())) == 1
+    assert (tmp_path / "best_config.toml").exists()
+
+
+def test_local_hpopt(monkeypatch, data_path, tmp_path):
+    input_path, *_ = data_path
+
+    args = [
+        "chemprop",
+        "hpopt",
+        "-i",
+        input_path,
+        "--epochs",
+        "3",
+        "--hpopt-save-dir",
+        str(tmp_path),
+        "--hpopt-backend",
+        "local",
+        "--raytune-num-samples",
+        "2",
+        "--raytune-search-algorithm",
+        "random",
+        "--search-parameter-keywords",
+        "depth",
+        "dropout",
+    ]
+
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", args)
+        main()
+
+    assert (tmp_path / "best_config.toml").exists()
+    assert (tmp_path / "best_checkpoint.ckpt").exists()
+    assert (tmp_path / "all_progress.csv").exists()
+    assert len(list((tmp_path / "local_results").iterdir())) == 2
@@ -0,0 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor
+import http.client
+import json
+import socket
+import threading
+
+import pytest
+import torch
+
+from chemprop import data
+from chemprop.cli.serve import PredictionService, build_server
+from chemprop.models import MPNN
+
+pytestmark = pytest.mark.CLI
+
+SMIS = ["CCO", "c1ccccc1", "CC(=O)O", "C1CCCCC1N", "O=C=O"]
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__("localhost")
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+@pytest.fixture
+def model(data_dir):
+    return MPNN.load_from_file(data_dir / "example_model_v2_regression_mol.pt")
+
+
+@pytest.fixture
+def expected(model):
+    dset = data.MoleculeDataset([data.MoleculeDatapoint.from_smi(smi) for smi in SMIS])
+    batch = data.collate_batch([dset[i] for i in range(len(dset))])
+    with torch.inference_mode():
+        return model.eval()(batch.bmg, batch.V_d, batch.X_d)
+
+
+def post(conn: http.client.HTTPConnection, body: dict) -> tuple[int, dict]:
+    conn.request("POST", "/predict", json.dumps(body), {"Content-Type": "application/json"})
+    response = conn.getresponse()
+    content = response.read()
+
+    return response.status, json.loads(content) if response.status == 200 else None
+
+
+def test_service_batches_and_caches(model, expected):
+    with PredictionService([model], ["y"], max_batch_size=4, max_latency=0.05) as service:
+        with ThreadPoolExecutor(len(SMIS)) as pool:
+            preds = list(pool.map(lambda smi: service.predict([smi])[0], SMIS))
+        torch.testing.assert_close(torch.tensor(preds), expected)
+
+        assert len(service._cache) == len(SMIS)
+        assert service.predict(SMIS + ["not a smiles"])[-1] is None
+
+
+def test_http_server(model, expected):
+    service = PredictionService([model], ["y"])
+    server = build_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+
+    with service:
+        thread.start()
+        try:
+            conn = http.client.HTTPConnection(*server.server_address)
+            status, body = post(conn, {"smiles": SMIS})
+            assert status == 200
+            assert body["columns"] == ["y"]
+            torch.testing.assert_close(torch.tensor(body["predictions"]), expected)
+
+            status, _ = post(conn, {"smis": SMIS})
+            assert status == 400
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def test_unix_socket_server(model, expected, tmp_path):
+    service = PredictionService([model], ["y"])
+    server = build_server(service, socket_path=tmp_path / "chemprop.sock")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+
+    with service:
+        thread.start()
+        try:
+            conn = UnixHTTPConnection(str(tmp_path / "chemprop.sock"))
+            status, body = post(conn, {"smiles": SMIS[:2]})
+            assert status == 200
+            torch.testing.assert_close(torch.tensor(body["predictions"]), expected[:2])
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -123,6 +123,20 @@ def test_repeated_smiles(mol_data_with_repeated_mols):
     assert test[0] == [2, 3]
 
 
+def test_repeated_smiles_groups_together():
+    """Testing that all copies of a molecule end up in the same split for every replicate"""
+    smis = [f"C{'C' * (i % 20)}O" for i in range(100)]
+    mols = [Chem.MolFromSmiles(smi) for smi in smis]
+    trains, vals, tests = make_split_indices(
+        mols=mols, split="random_with_repeated_smiles", num_replicates=3
+    )
+
+    for train, val, test in zip(trains, vals, tests):
+        assert sorted(train + val + test) == list(range(len(mols)))
+        for split_1, split_2 in [(train, val), (train, test), (val, test)]:
+            assert not {smis[i] for i in split_1} & {smis[i] for i in split_2}
+
+
 def test_kennard_stone(mol_data):
     """
     Testing if Kennard-Stone split yield expected results.
@@ -156,3 +170,43 @@ def test_scaffold(molecule_dataset_with_rings):
     )
 
     assert train[0] == [0, 1, 2]
+
+
+def test_scaffold_sizes_normalized(molecule_dataset_with_rings):
+    """Testing that scaffold splits normalize the split sizes like the astartes samplers"""
+    with pytest.warns(NormalizationWarning):
+        make_split_indices(
+            mols=molecule_dataset_with_rings, sizes=(0.4, 0.0, 0.4), split="scaffold_balanced"
+        )
+
+    with pytest.raises(ValueError):
+        make_split_indices(
+            mols=molecule_dataset_with_rings, sizes=(0.0, 0.2, 0.0), split="scaffold_balanced"
+        )
+
+
+def test_scaffold_num_workers(molecule_dataset_with_rings):
+    """Testing that calculating scaffolds in parallel does not change the scaffold split"""
+    splits = make_split_indices(
+        mols=molecule_dataset_with_rings, sizes=(0.3, 0.3, 0.3), split="scaffold_balanced"
+    )
+    parallel_splits = make_split_indices(
+        mols=molecule_dataset_with_rings,
+        sizes=(0.3, 0.3, 0.3),
+        split="scaffold_balanced",
+        num_workers=2,
+    )
+
+    assert splits == parallel_splits
+
+
+@pytest.mark.parametrize("split_type", ["kennard_stone_approx", "kmeans_minibatch"])
+def test_approximate_splits(monkeypatch, split_type):
+    """Testing that the approximate splits partition the data"""
+    monkeypatch.setattr("chemprop.data.splitting.KS_SAMPLE_SIZE", 20)
+    smis = [f"{'C' * i}{group}" for i in range(1, 21) for group in ["O", "N", "c1ccccc1"]]
+    mols = [Chem.MolFromSmiles(smi) for smi in smis]
+    train, val, test = make_split_indices(mols=mols, split=split_type)
+
+    assert sorted(train[0] + val[0] + test[0]) == list(range(len(mols)))
+    assert len(train[0]) > 0 and len(val[0]) > 0 and len(test[0]) > 0
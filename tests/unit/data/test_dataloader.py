@@ -3,7 +3,9 @@ import pytest
 import torch
 
 from chemprop.data.collate import BatchMolGraph, collate_batch
-from chemprop.data.datasets import Datum
+from chemprop.data.dataloader import BatchReplayLoader, DeviceDataLoader, build_dataloader
+from chemprop.data.datapoints import MoleculeDatapoint
+from chemprop.data.datasets import Datum, MoleculeDataset
 from chemprop.data.molgraph import MolGraph
 
 
@@ -82,3 +84,80 @@ def test_collate_batch_multiple_graphs(datum_1, datum_2):
     torch.testing.assert_close(weights, torch.tensor([[[8.0]], [[1.0]]], dtype=torch.float32))
     torch.testing.assert_close(lt_masks, torch.tensor([[1], [0]], dtype=torch.bool))
     torch.testing.assert_close(gt_masks, torch.tensor([[0], [1]], dtype=torch.bool))
+
+
+def test_batch_replay_loader(datum_1, datum_2):
+    n_collations = 0
+
+    def counting_collate(batch):
+        nonlocal n_collations
+        n_collations += 1
+        return collate_batch(batch)
+
+    loader = torch.utils.data.DataLoader([datum_1, datum_2], 1, collate_fn=counting_collate)
+    replay_loader = BatchReplayLoader(loader)
+
+    assert len(replay_loader) == len(loader)
+    assert replay_loader.dataset is loader.dataset
+
+    next(iter(replay_loader))
+    assert not replay_loader.cached
+
+    batches = list(replay_loader)
+    assert replay_loader.cached
+    assert n_collations == 3
+
+    replayed_batches = list(replay_loader)
+    assert n_collations == 3
+    for b1, b2 in zip(batches, replayed_batches):
+        assert b1.bmg is not b2.bmg
+        assert all(X1 is X2 for X1, X2 in zip(b1.bmg.tensors(), b2.bmg.tensors()))
+
+    for batch in replay_loader:
+        batch.bmg.to("meta")
+    assert all(X.device.type == "cpu" for b in replay_loader for X in b.bmg.tensors())
+
+    replay_loader.clear()
+    list(replay_loader)
+    assert n_collations == 5
+
+
+def test_device_data_loader(smis):
+    dps = [
+        MoleculeDatapoint.from_smi(smi, y=np.random.rand(2), x_d=np.random.rand(3))
+        for smi in smis[:10]
+    ]
+    dset = MoleculeDataset(dps)
+
+    loader = build_dataloader(dset, 4, shuffle=False)
+    device_loader = DeviceDataLoader(dset, 4, shuffle=False)
+
+    assert len(device_loader) == len(loader)
+    for batch, device_batch in zip(loader, device_loader):
+        bmg, device_bmg = batch.bmg, device_batch.bmg
+        assert len(bmg) == len(device_bmg)
+        for attr in ["V", "E", "edge_index", "rev_edge_index", "batch"]:
+            torch.testing.assert_close(getattr(bmg, attr), getattr(device_bmg, attr))
+        for X, X_device in zip(batch[1:], device_batch[1:]):
+            torch.testing.assert_close(X, X_device)
+
+
+def test_training_batch_to(datum_1, datum_2):
+    batch = collate_batch([datum_1, datum_2])
+    moved_batch = batch.to("cpu", non_blocking=True)
+
+    assert isinstance(moved_batch, type(batch))
+    assert moved_batch.bmg is not batch.bmg
+    assert len(moved_batch.bmg) == len(batch.bmg)
+    for X, X_moved in zip(batch.bmg.tensors(), moved_batch.bmg.tensors()):
+        torch.testing.assert_close(X, X_moved)
+    for X, X_moved in zip(batch[1:], moved_batch[1:]):
+        torch.testing.assert_close(X, X_moved)
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="requires CUDA")
+def test_training_batch_pin_memory(datum_1, datum_2):
+    batch = collate_batch([datum_1, datum_2]).pin_memory()
+
+    assert all(X.is_pinned() for X in batch.bmg.tensors())
+    assert all(X.is_pinned() for X in batch[1:] if X is not None)
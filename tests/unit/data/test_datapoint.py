@@ -1,7 +1,8 @@
 import numpy as np
 import pytest
+from rdkit import Chem
 
-from chemprop.data import MoleculeDatapoint
+from chemprop.data import LazyMoleculeDatapoint, MoleculeDatapoint
 
 SMI = "c1ccccc1"
 
@@ -44,3 +45,25 @@ def test_replace_token(smi, targets, features_with_nans):
     d = MoleculeDatapoint.from_smi(smi, y=targets, x_d=features_with_nans)
 
     assert not np.isnan(d.x_d).any()
+
+
+def test_lazy_mol(smi, targets):
+    d1 = MoleculeDatapoint.from_smi(smi, y=targets)
+    d2 = LazyMoleculeDatapoint.from_smi(smi, y=targets)
+
+    assert d2.name == smi
+    assert Chem.MolToSmiles(d1.mol) == Chem.MolToSmiles(d2.mol)
+
+
+def test_lazy_addh(smi, targets):
+    d1 = LazyMoleculeDatapoint.from_smi(smi, y=targets)
+    d2 = LazyMoleculeDatapoint.from_smi(smi, y=targets, add_h=True)
+
+    assert d1.mol.GetNumAtoms() != d2.mol.GetNumAtoms()
+
+
+def test_lazy_invalid_smi(targets):
+    d = LazyMoleculeDatapoint.from_smi("not_a_smiles", y=targets)
+
+    with pytest.raises(RuntimeError):
+        d.mol
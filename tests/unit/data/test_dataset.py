@@ -1,3 +1,4 @@
+import pickle
 from unittest.mock import MagicMock, call
 
 import numpy as np
@@ -5,7 +6,7 @@ import pytest
 from rdkit import Chem
 from sklearn.preprocessing import StandardScaler
 
-from chemprop.data.datasets import MoleculeDatapoint, MoleculeDataset
+from chemprop.data.datasets import MoleculeDatapoint, MoleculeDataset, PackedDataset, SubsetDataset
 from chemprop.data.molgraph import MolGraph
 from chemprop.featurizers.molgraph import SimpleMoleculeMolGraphFeaturizer
 
@@ -178,3 +179,77 @@ def test_cache(dataset: MoleculeDataset, cache):
         calls.append(call(i))
 
     dataset.mg_cache.__getitem__.assert_has_calls(calls)
+
+
+def test_subset(dataset):
+    idxs = list(range(0, len(dataset), 2))
+    subset = SubsetDataset(dataset, idxs)
+
+    assert len(subset) == len(idxs)
+    assert subset.smiles == [dataset.smiles[i] for i in idxs]
+    for i, idx in enumerate(idxs):
+        np.testing.assert_array_equal(subset[i].mg.V, dataset[idx].mg.V)
+        np.testing.assert_array_equal(subset[i].y, dataset[idx].y)
+
+
+def test_subset_shares_cache(dataset):
+    subset = SubsetDataset(dataset, [0])
+    subset.cache = True
+
+    assert dataset.cache
+    assert subset[0].mg is dataset[0].mg
+
+
+def test_subset_normalize_targets(dataset):
+    idxs = list(range(0, len(dataset), 2))
+    subset = SubsetDataset(dataset, idxs)
+    subset.normalize_targets()
+
+    np.testing.assert_array_equal(dataset.Y, dataset._Y)
+    np.testing.assert_array_equal(subset.Y, StandardScaler().fit_transform(dataset._Y[idxs]))
+
+
+def test_subset_normalize_features(mols, V_fs, E_fs):
+    data = [MoleculeDatapoint(mol, V_f=V_f, E_f=E_f) for mol, V_f, E_f in zip(mols, V_fs, E_fs)]
+    featurizer = SimpleMoleculeMolGraphFeaturizer(extra_atom_fdim=1, extra_bond_fdim=2)
+    dataset = MoleculeDataset(data, featurizer)
+    idxs = list(range(0, len(dataset), 2))
+    subset = SubsetDataset(dataset, idxs)
+    subset.cache = True
+    expected = MoleculeDataset([data[i] for i in idxs], featurizer)
+    for dset in [subset, expected]:
+        dset.normalize_inputs("V_f")
+        dset.normalize_inputs("E_f")
+
+    for d, d_expected in zip(subset, expected):
+        for X, X_expected in zip(d.mg, d_expected.mg):
+            np.testing.assert_array_equal(X, X_expected)
+
+    subset.reset()
+    for i, idx in enumerate(idxs):
+        assert subset[i].mg is dataset[idx].mg
+
+
+def test_packed(dataset):
+    packed = PackedDataset.from_dataset(dataset)
+    packed = pickle.loads(pickle.dumps(packed))
+
+    assert len(packed) == len(dataset)
+    assert packed.d_xd == dataset.d_xd
+    assert packed.d_vd == dataset.d_vd
+    for d, d_packed in zip(dataset, packed):
+        for X, X_packed in zip(d.mg, d_packed.mg):
+            np.testing.assert_array_equal(X, X_packed)
+        np.testing.assert_array_equal(d.V_d, d_packed.V_d)
+        np.testing.assert_array_equal(d.x_d, d_packed.x_d)
+        np.testing.assert_array_equal(d.y, d_packed.y)
+
+
+def test_packed_save_load(dataset, tmp_path):
+    packed = PackedDataset.from_dataset(dataset)
+    packed.save(tmp_path)
+    loaded = PackedDataset.load(tmp_path, mmap=True)
+
+    assert isinstance(loaded.V, np.memmap)
+    for name, X in packed._arrays().items():
+        np.testing.assert_array_equal(X, getattr(loaded, name))
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from chemprop.featurizers.molgraph import (
+    MolGraphCache,
+    MolGraphCacheLRU,
+    SimpleMoleculeMolGraphFeaturizer,
+)
+
+
+@pytest.fixture
+def inputs(mols):
+    return list(mols[:10])
+
+
+@pytest.fixture
+def featurizer():
+    return SimpleMoleculeMolGraphFeaturizer()
+
+
+@pytest.fixture
+def nones(inputs):
+    return [None] * len(inputs)
+
+
+def mg_nbytes(mg):
+    return sum(X.nbytes for X in mg)
+
+
+def test_lru_same_molgraphs(inputs, nones, featurizer):
+    cache = MolGraphCache(inputs, nones, nones, featurizer)
+    lru_cache = MolGraphCacheLRU(inputs, nones, nones, featurizer, 2**20)
+
+    assert len(cache) == len(lru_cache)
+    for i in range(len(cache)):
+        for X, X_lru in zip(cache[i], lru_cache[i]):
+            np.testing.assert_array_equal(X, X_lru)
+
+
+def test_lru_hits_misses(inputs, nones, featurizer):
+    cache = MolGraphCacheLRU(inputs, nones, nones, featurizer, 2**20)
+
+    for _ in range(3):
+        for i in range(len(inputs)):
+            cache[i]
+
+    assert cache.misses == len(inputs)
+    assert cache.hits == 2 * len(inputs)
+    assert cache.evictions == 0
+    assert cache.hit_rate == pytest.approx(2 / 3)
+    assert cache[0] is cache[0]
+
+
+def test_lru_budget(inputs, nones, featurizer):
+    max_bytes = mg_nbytes(featurizer(inputs[0])) + mg_nbytes(featurizer(inputs[1]))
+    cache = MolGraphCacheLRU(inputs, nones, nones, featurizer, max_bytes)
+
+    for i in range(len(inputs)):
+        cache[i]
+        assert cache.nbytes <= max_bytes
+
+    assert cache.evictions > 0
+
+
+def test_lru_evicts_least_recently_used(inputs, featurizer):
+    inputs = [inputs[0]] * 3
+    nones = [None] * 3
+    cache = MolGraphCacheLRU(inputs, nones, nones, featurizer, 2 * mg_nbytes(featurizer(inputs[0])))
+
+    mg0 = cache[0]
+    mg1 = cache[1]
+    assert cache[0] is mg0
+    cache[2]
+
+    assert cache.evictions == 1
+    assert cache[0] is mg0
+    assert cache[1] is not mg1
+
+
+def test_lru_zero_budget(inputs, nones, featurizer):
+    cache = MolGraphCacheLRU(inputs, nones, nones, featurizer, 0)
+
+    assert cache[0] is not cache[0]
+    assert cache.nbytes == 0
+    assert cache.misses == 2
+
+
+def test_lru_negative_budget(inputs, nones, featurizer):
+    with pytest.raises(ValueError):
+        MolGraphCacheLRU(inputs, nones, nones, featurizer, -1)
@@ -0,0 +1,117 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import math
+import threading
+
+import pytest
+import torch
+
+from chemprop.data import MoleculeDatapoint, MoleculeDataset, collate_batch
+from chemprop.models import MPNN, MicroBatcher
+from chemprop.nn import BondMessagePassing, MeanAggregation, RegressionFFN
+
+
+@pytest.fixture
+def model():
+    torch.manual_seed(0)
+    return MPNN(BondMessagePassing(), MeanAggregation(), RegressionFFN()).eval()
+
+
+@pytest.fixture
+def dps(smis):
+    return [MoleculeDatapoint.from_smi(smi) for smi in smis]
+
+
+@pytest.fixture
+def expected(model, dps):
+    dset = MoleculeDataset(dps)
+    bmg, V_d, X_d, *_ = collate_batch([dset[i] for i in range(len(dset))])
+    with torch.inference_mode():
+        return model(bmg, V_d, X_d)
+
+
+def test_concurrent_requests(model, dps, expected):
+    with MicroBatcher(model, max_batch_size=8, max_latency=0.05) as batcher:
+        with ThreadPoolExecutor(16) as pool:
+            preds = list(pool.map(lambda dp: batcher.predict([dp]), dps))
+
+    torch.testing.assert_close(torch.cat(preds), expected)
+
+    stats = batcher.latency_stats()
+    assert stats.n_requests == len(dps)
+    assert stats.n_batches < len(dps)
+    assert stats.mean_batch_size <= 8
+    assert 0 < stats.p50_ms <= stats.p99_ms
+
+
+def test_atom_budget(model, dps, expected):
+    max_atoms = max(dp.mol.GetNumAtoms() for dp in dps)
+    with MicroBatcher(model, max_atoms=max_atoms, max_latency=0.05) as batcher:
+        futures = [batcher.submit(dps[i : i + 2]) for i in range(0, len(dps), 2)]
+        preds = torch.cat([future.result() for future in futures])
+
+    torch.testing.assert_close(preds, expected)
+    assert batcher.latency_stats().n_batches == len(futures)
+
+
+def test_oversized_request(model, dps, expected):
+    with MicroBatcher(model, max_batch_size=3) as batcher:
+        preds = batcher.predict(dps)
+
+    torch.testing.assert_close(preds, expected)
+
+
+def test_predict_async(model, dps, expected):
+    async def predict_all(batcher):
+        return await asyncio.gather(*(batcher.predict_async([dp]) for dp in dps))
+
+    with MicroBatcher([model, model]) as batcher:
+        preds = asyncio.run(predict_all(batcher))
+
+    torch.testing.assert_close(torch.cat(preds), expected)
+
+
+def test_cancelled_request(model, dps, expected, monkeypatch):
+    batcher = MicroBatcher(model, max_latency=0)
+    entered, release = threading.Event(), threading.Event()
+    forward = batcher._forward
+
+    def blocking_forward(data):
+        entered.set()
+        release.wait()
+        return forward(data)
+
+    monkeypatch.setattr(batcher, "_forward", blocking_forward)
+
+    async def cancel_then_predict():
+        blocked = batcher.submit(dps[:1])
+        entered.wait()
+        task = asyncio.ensure_future(batcher.predict_async(dps[1:2]))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        release.set()
+        blocked.result(timeout=2)
+
+        return await asyncio.wait_for(batcher.predict_async(dps), timeout=2)
+
+    with batcher:
+        preds = asyncio.run(cancel_then_predict())
+
+    torch.testing.assert_close(preds, expected)
+
+
+def test_reset_stats(model, dps):
+    with MicroBatcher(model) as batcher:
+        batcher.predict(dps)
+        batcher.reset_stats()
+
+    stats = batcher.latency_stats()
+    assert stats.n_requests == stats.n_batches == 0
+    assert math.isnan(stats.p99_ms)
+
+
+def test_not_started(model, dps):
+    with pytest.raises(RuntimeError):
+        MicroBatcher(model).submit(dps)
@@ -0,0 +1,99 @@
+from lightning import pytorch as pl
+import numpy as np
+import pytest
+import torch
+
+from chemprop.data import MoleculeDatapoint, MoleculeDataset, build_dataloader
+from chemprop.models import MPNN, EnsembleCheckpoint, EnsembleMPNN
+from chemprop.nn import BondMessagePassing, MeanAggregation, RegressionFFN
+
+
+class FixedScores(pl.Callback):
+    """Set the metric ``"model_{i}/score"`` of each model to its given score in each epoch"""
+
+    def __init__(self, scoress):
+        self.scoress = scoress
+
+    def on_validation_end(self, trainer, pl_module):
+        for i, scores in enumerate(self.scoress):
+            trainer.callback_metrics[f"model_{i}/score"] = torch.tensor(
+                scores[trainer.current_epoch]
+            )
+
+
+class RecordValLosses(pl.Callback):
+    """Record the validation loss of each model in each epoch"""
+
+    def __init__(self, n_models):
+        self.val_losses = [[] for _ in range(n_models)]
+
+    def on_validation_end(self, trainer, pl_module):
+        if trainer.sanity_checking:
+            return
+
+        for i, val_losses in enumerate(self.val_losses):
+            val_losses.append(trainer.callback_metrics[f"model_{i}/val_loss"].item())
+
+
+@pytest.fixture
+def loader(smis):
+    smis = smis[:20]
+    targets = np.random.default_rng(0).random((len(smis), 1))
+    dps = [MoleculeDatapoint.from_smi(smi, y) for smi, y in zip(smis, targets)]
+
+    return build_dataloader(MoleculeDataset(dps), batch_size=10, seed=0)
+
+
+@pytest.fixture
+def ensemble():
+    torch.manual_seed(0)
+
+    return EnsembleMPNN(
+        [MPNN(BondMessagePassing(), MeanAggregation(), RegressionFFN()) for _ in range(2)]
+    )
+
+
+def fit(ensemble, loader, callbacks, max_epochs=3):
+    trainer = pl.Trainer(
+        logger=False,
+        enable_checkpointing=False,
+        enable_progress_bar=False,
+        enable_model_summary=False,
+        accelerator="cpu",
+        max_epochs=max_epochs,
+        callbacks=callbacks,
+    )
+    trainer.fit(ensemble, loader, loader)
+
+
+def test_stopped_model_is_frozen(ensemble, loader, tmp_path):
+    dirpaths = [tmp_path / "model_0", tmp_path / "model_1"]
+    checkpointing = EnsembleCheckpoint(dirpaths, "score", patience=1)
+    # model 0 stops improving after the first epoch, so it is stopped after the second
+    scores = FixedScores([[1.0, 2.0, 3.0], [3.0, 2.0, 1.0]])
+
+    fit(ensemble, loader, [scores, checkpointing])
+
+    assert ensemble.stopped == [True, False]
+    for model, dirpath, epoch in zip(ensemble.models, dirpaths, [1, 2]):
+        last = torch.load(dirpath / "last.ckpt", weights_only=False)
+        assert last["epoch"] == epoch
+        for key, X in model.state_dict().items():
+            torch.testing.assert_close(X, last["state_dict"][key], rtol=0, atol=0)
+
+
+def test_best_checkpoints_track_own_val_loss(ensemble, loader, tmp_path):
+    dirpaths = [tmp_path / "model_0", tmp_path / "model_1"]
+    checkpointing = EnsembleCheckpoint(dirpaths, "val_loss")
+    val_losses = RecordValLosses(len(ensemble))
+
+    fit(ensemble, loader, [val_losses, checkpointing])
+
+    for i, losses in enumerate(val_losses.val_losses):
+        best_epoch = int(np.argmin(losses))
+        best = torch.load(checkpointing.best_model_paths[i], weights_only=False)
+
+        assert checkpointing.best_model_scores[i] == min(losses)
+        assert best["epoch"] == best_epoch
+        assert checkpointing.best_model_paths[i].parent == dirpaths[i]
+        assert list(dirpaths[i].glob("best-*.ckpt")) == [checkpointing.best_model_paths[i]]
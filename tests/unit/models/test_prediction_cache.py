@@ -0,0 +1,90 @@
+from lightning import pytorch as pl
+import numpy as np
+import pytest
+import torch
+
+from chemprop.data import MoleculeDatapoint, MoleculeDataset, build_dataloader
+from chemprop.models import MPNN, PredictionCache, model_digest
+from chemprop.nn import BondMessagePassing, MeanAggregation, RegressionFFN
+from chemprop.uncertainty import NoUncertaintyEstimator
+
+
+class CountingEstimator(NoUncertaintyEstimator):
+    def __init__(self):
+        self.n_predicted = 0
+
+    def __call__(self, dataloader, models, trainer):
+        self.n_predicted += len(dataloader.dataset)
+        return super().__call__(dataloader, models, trainer)
+
+
+@pytest.fixture
+def model():
+    torch.manual_seed(0)
+    return MPNN(BondMessagePassing(), MeanAggregation(), RegressionFFN())
+
+
+@pytest.fixture
+def trainer():
+    return pl.Trainer(logger=False, enable_progress_bar=False, accelerator="cpu", devices=1)
+
+
+def make_loader(smis, x_d=None):
+    dps = [
+        MoleculeDatapoint.from_smi(smi, x_d=None if x_d is None else np.array([x_d], float))
+        for smi in smis
+    ]
+    return build_dataloader(MoleculeDataset(dps), batch_size=4, shuffle=False)
+
+
+def test_only_misses_predicted(model, trainer, smis, tmp_path):
+    smis = smis.tolist()[:10]
+    estimator = CountingEstimator()
+    expected, _ = estimator(make_loader(smis), [model], trainer)
+    estimator.n_predicted = 0
+
+    with PredictionCache(tmp_path / "cache.sqlite") as cache:
+        cache.estimate(estimator, make_loader(smis[::2]), [model], trainer)
+        preds, uncs = cache.estimate(estimator, make_loader(smis), [model], trainer)
+
+    torch.testing.assert_close(preds, expected)
+    assert uncs is None
+    assert estimator.n_predicted == len(smis)
+    assert (cache.n_hits, cache.n_misses) == (len(smis[::2]), len(smis))
+
+
+def test_persistent(model, trainer, smis, tmp_path):
+    smis = smis.tolist()[:5]
+    estimator = CountingEstimator()
+    for _ in range(2):
+        with PredictionCache(tmp_path / "cache.sqlite") as cache:
+            cache.estimate(estimator, make_loader(smis), [model], trainer)
+
+    assert estimator.n_predicted == len(smis)
+
+
+def test_keys(model, tmp_path):
+    with PredictionCache(tmp_path / "cache.sqlite") as cache:
+        digests = [model_digest(model)]
+        keys = cache.keys(make_loader(["OCC", "CCO", "CCN"]).dataset, digests)
+        assert keys[0] == keys[1] != keys[2]
+
+        x_d_keys = cache.keys(make_loader(["CCO", "CCO"], 1.0).dataset, digests)
+        assert x_d_keys[0] != keys[1]
+        assert x_d_keys[0] != cache.keys(make_loader(["CCO"], 2.0).dataset, digests)[0]
+
+        assert keys[0] != cache.keys(make_loader(["CCO"]).dataset, digests, "add_h=True")[0]
+        assert keys[0] != cache.keys(make_loader(["CCO"]).dataset, ["other"])[0]
+
+
+def test_eviction(tmp_path):
+    with PredictionCache(tmp_path / "cache.sqlite", max_size=3) as cache:
+        keys = [bytes([i]) for i in range(4)]
+        cache.put(keys[:3], np.zeros((1, 3, 1)), None)
+        cache.get(keys[:1])
+        cache.put(keys[3:], np.ones((1, 1, 1)), np.ones((1, 1, 1)))
+
+        assert len(cache) == 3
+        values = cache.get(keys)
+        assert values[1] is None
+        np.testing.assert_array_equal(values[3][1], np.ones((1, 1)))
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+import torch
+from torch.nn import Identity
+
+from chemprop.models import MPNN, MulticomponentMPNN
+from chemprop.models.serialization import NO_SAFETENSORS, _decode, _dumps, _encode
+from chemprop.models.utils import load_model_with_metadata, save_model
+from chemprop.nn import (
+    MSE,
+    BondMessagePassing,
+    GraphTransform,
+    NormAggregation,
+    RegressionFFN,
+    ScaleTransform,
+    UnscaleTransform,
+)
+
+
+@pytest.fixture
+def model():
+    E_f_transform = ScaleTransform(mean=[0.0, 1.0], scale=[2.0, 3.0])
+    graph_transform = GraphTransform(V_transform=Identity(), E_transform=E_f_transform)
+    mp = BondMessagePassing(graph_transform=graph_transform)
+    ffn = RegressionFFN(
+        output_transform=UnscaleTransform(mean=[4.0], scale=[5.0]),
+        criterion=MSE(task_weights=[6.0]),
+    )
+
+    return MPNN(mp, NormAggregation(), ffn, X_d_transform=ScaleTransform(mean=[7.0], scale=[8.0]))
+
+
+def assert_state_dicts_equal(sd1, sd2):
+    assert sd1.keys() == sd2.keys()
+    for key in sd1:
+        torch.testing.assert_close(sd1[key], sd2[key], rtol=0, atol=0)
+
+
+@pytest.mark.parametrize(
+    "cls,filename",
+    [
+        (MPNN, "example_model_v2_regression_mol.pt"),
+        (MPNN, "example_model_v2_regression_mol.ckpt"),
+        (MPNN, "example_model_v2_classification_mol_multiclass.pt"),
+        (MulticomponentMPNN, "example_model_v2_regression_rxn+mol.pt"),
+    ],
+)
+def test_manifest_roundtrip(data_dir, cls, filename):
+    d = torch.load(data_dir / filename, weights_only=False)
+    original = cls.load_from_file(data_dir / filename)
+
+    hparams = _decode(json.loads(_dumps(_encode(d["hyper_parameters"]))))
+    loaded = cls._from_dict({"hyper_parameters": hparams, "state_dict": d["state_dict"]}, filename)
+
+    assert type(loaded.predictor) is type(original.predictor)
+    assert_state_dicts_equal(loaded.state_dict(), original.state_dict())
+
+
+def test_manifest_is_deterministic(model):
+    assert _dumps(_encode(model.hparams)) == _dumps(_encode(model.hparams))
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "os:system",
+        "builtins:eval",
+        "torch.serialization:load",
+        "torch.utils.data:DataLoader",
+        "chemprop_evil:Module",
+        "chemprop.nn:MSE.__call__",
+    ],
+)
+def test_untrusted_classes_rejected(path):
+    with pytest.raises(ValueError):
+        _decode({"__module__": path, "kwargs": {}})
+
+
+@pytest.mark.skipif(NO_SAFETENSORS, reason="safetensors not installed")
+def test_safetensors_roundtrip(tmp_path, model):
+    save_model(tmp_path / "model.safetensors", model, output_columns=["y"])
+    loaded, metadata = load_model_with_metadata(tmp_path / "model.safetensors", False)
+
+    assert metadata == {"output_columns": ["y"]}
+    assert_state_dicts_equal(loaded.state_dict(), model.state_dict())
@@ -20,6 +20,8 @@ from chemprop.nn.metrics import (
     BinaryF1Score,
     BinaryMCCLoss,
     BinaryMCCMetric,
+    BinnedBinaryAUPRC,
+    BinnedBinaryAUROC,
     BoundedMAE,
     BoundedMSE,
     BoundedRMSE,
@@ -276,3 +278,47 @@ def test_metric_integeration(loss_fn, metric_fn, train_step, forward, targets, m
 
     for value in val_metrics:
         assert abs(float(value) - test_metric) <= 0.01 * max(abs(float(value)), abs(test_metric))
+
+
+@pytest.mark.parametrize(
+    "metric, binned_metric",
+    [(BinaryAUROC(), BinnedBinaryAUROC()), (BinaryAUPRC(), BinnedBinaryAUPRC())],
+)
+def test_binned_curve_metrics(metric, binned_metric):
+    gen = torch.Generator().manual_seed(42)
+    preds = torch.rand(2000, 1, generator=gen)
+    targets = (torch.rand(2000, 1, generator=gen) < preds).float()
+    mask = torch.ones_like(preds, dtype=torch.bool)
+
+    for i in range(0, 2000, 100):
+        metric.update(preds[i : i + 100], targets[i : i + 100], mask[i : i + 100])
+        binned_metric.update(preds[i : i + 100], targets[i : i + 100], mask[i : i + 100])
+
+    assert binned_metric.compute() == pytest.approx(metric.compute().item(), abs=1e-3)
+
+
+@pytest.mark.parametrize(
+    "metric_cls, shape, targets",
+    [
+        (BinaryMCCMetric, (20, 2), b_class_targets),
+        (MulticlassMCCMetric, (20, 2, 3), m_class_targets),
+    ],
+)
+def test_mcc_running_sums(metric_cls, shape, targets):
+    gen = torch.Generator().manual_seed(42)
+    preds = torch.rand(shape, generator=gen)
+    if metric_cls is MulticlassMCCMetric:
+        preds = preds.softmax(2)
+    mask = torch.ones_like(targets, dtype=torch.bool)
+    metric = metric_cls()
+    metric.update(preds, targets, mask)
+    expected = metric.compute()
+
+    metric = metric_cls()
+    for i in range(0, len(targets), 5):
+        metric.update(preds[i : i + 5], targets[i : i + 5], mask[i : i + 5])
+        if i == 0:
+            state_sizes = [state.numel() for state in metric.metric_state.values()]
+
+    assert metric.compute() == pytest.approx(expected.item(), rel=1e-5)
+    assert [state.numel() for state in metric.metric_state.values()] == state_sizes
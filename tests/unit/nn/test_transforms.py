@@ -154,3 +154,13 @@ def test_graph_transform_forward_eval(graph_transform, bmg):
 
     assert torch.equal(transformed_bmg.V, expected_V)
     assert torch.equal(transformed_bmg.E, expected_E)
+
+
+def test_graph_transform_forward_eval_not_inplace(graph_transform, bmg):
+    graph_transform.eval()
+    V, E = bmg.V, bmg.E
+
+    graph_transform(bmg)
+
+    assert bmg.V is V
+    assert bmg.E is E
@@ -100,8 +100,9 @@ def test_PlattCalibrator(
     calibrator2.fit(cal_uncs, cal_targets, cal_mask, training_targets)
     uncs2 = calibrator2.apply(test_uncs)
 
-    torch.testing.assert_close(uncs1, cal_test_uncs)
-    torch.testing.assert_close(uncs2, cal_test_uncs_with_training_targets)
+    # the expected values were fit with Nelder-Mead, which stops within ~1e-4 of the optimum
+    torch.testing.assert_close(uncs1, cal_test_uncs, atol=1e-4, rtol=1e-4)
+    torch.testing.assert_close(uncs2, cal_test_uncs_with_training_targets, atol=1e-4, rtol=1e-4)
 
 
 @pytest.mark.parametrize(
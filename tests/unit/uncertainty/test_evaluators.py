@@ -275,3 +275,29 @@ def test_ExpectedNormalizedErrorEvaluator(preds, uncs, targets, mask, ence):
     ence_cal = evaluator.evaluate(preds, uncs, targets, mask)
 
     torch.testing.assert_close(ence_cal, ence)
+
+
+def test_CalibrationAreaEvaluator_dense():
+    """
+    Testing that the CalibrationAreaEvaluator matches the dense comparison of the errors against
+    the scaled uncertainties of every bin
+    """
+    torch.manual_seed(0)
+    preds = torch.randn(250, 3)
+    targets = preds + torch.randn(250, 3)
+    targets[::5] = preds[::5]
+    uncs = torch.rand(250, 3)
+    mask = torch.rand(250, 3) > 0.3
+
+    num_bins = 20
+    bin_scaling = torch.special.erfinv(torch.arange(1, num_bins) / num_bins) * 2**0.5
+    covered = uncs.sqrt() * bin_scaling.view(-1, 1, 1) >= (preds - targets).abs()
+    observed = (covered & mask).sum(1) / mask.sum(0)
+    observed = torch.cat([torch.zeros(1, 3), observed, torch.ones(1, 3)])
+    miscal_area = (observed - torch.linspace(0, 1, num_bins + 1).unsqueeze(1)).abs().mean(0)
+    miscal_area = miscal_area * (num_bins + 1) / num_bins
+
+    evaluator = CalibrationAreaEvaluator()
+    miscal_area_cal = evaluator.evaluate(preds, uncs, targets, mask, num_bins)
+
+    torch.testing.assert_close(miscal_area_cal, miscal_area)
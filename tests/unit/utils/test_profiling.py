@@ -0,0 +1,98 @@
+import json
+from types import SimpleNamespace
+
+from lightning import pytorch as pl
+import pytest
+import torch
+
+from chemprop.data import MoleculeDatapoint, MoleculeDataset, build_dataloader
+from chemprop.models import MPNN
+from chemprop.nn import BondMessagePassing, MeanAggregation, RegressionFFN
+from chemprop.utils.profiling import Profiler, ProfilingCallback, get_profiler, profile, timer
+
+
+@pytest.fixture
+def dataset(mol_regression_data):
+    smis, Y = mol_regression_data
+    return MoleculeDataset([MoleculeDatapoint.from_smi(smi, y) for smi, y in zip(smis, Y)])
+
+
+def test_timer_inactive():
+    assert get_profiler() is None
+    with timer("stage", 1, 2):
+        pass
+
+
+def test_profile():
+    with profile() as profiler:
+        assert get_profiler() is profiler
+        for _ in range(3):
+            with timer("stage", 2, 10):
+                pass
+
+    assert get_profiler() is None
+
+    stats = profiler.stats["stage"]
+    assert stats.n_calls == 3
+    assert stats.n_mols == 6
+    assert stats.n_atoms == 30
+    assert len(profiler.events) == 3
+
+    df = profiler.summary()
+    assert df.loc[0, "stage"] == "stage"
+    assert df.loc[0, "calls"] == 3
+
+
+def test_save(tmp_path):
+    profiler = Profiler()
+    with profiler.stage("stage", 1, 1):
+        pass
+    profiler.save(tmp_path)
+
+    with open(tmp_path / "profile_trace.json") as f:
+        trace = json.load(f)
+    assert trace["traceEvents"][0]["name"] == "stage"
+    assert trace["traceEvents"][0]["ph"] == "X"
+    assert (tmp_path / "profile_summary.csv").exists()
+
+
+def test_callback(dataset, tmp_path):
+    loader = build_dataloader(dataset, batch_size=32, num_workers=0, shuffle=False)
+    model = MPNN(BondMessagePassing(), MeanAggregation(), RegressionFFN())
+    callback = ProfilingCallback(tmp_path)
+    trainer = pl.Trainer(
+        logger=False,
+        enable_checkpointing=False,
+        enable_progress_bar=False,
+        max_epochs=1,
+        callbacks=[callback],
+    )
+    trainer.fit(model, loader)
+
+    stages = set(callback.profiler.stats)
+    assert {
+        "featurize",
+        "collate",
+        "transfer",
+        "message_passing",
+        "agg",
+        "ffn",
+        "train_batch",
+        "backward",
+    } <= stages
+    assert callback.profiler.stats["train_batch"].n_mols == len(dataset)
+    assert get_profiler() is None
+    assert (tmp_path / "profile_trace.json").exists()
+
+
+def test_callback_device():
+    model = MPNN(BondMessagePassing(), MeanAggregation(), RegressionFFN())
+    trainer = SimpleNamespace(strategy=SimpleNamespace(root_device=torch.device("meta")))
+    callback = ProfilingCallback()
+
+    callback.setup(trainer, model, "fit")
+    try:
+        assert model.device.type == "cpu"
+        assert callback.profiler.device == torch.device("meta")
+    finally:
+        callback.teardown(trainer, model, "fit")
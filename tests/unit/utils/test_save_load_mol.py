@@ -9,7 +9,7 @@ from torch.utils.data import DataLoader
 
 from chemprop.data import MoleculeDatapoint, MoleculeDataset, collate_batch
 from chemprop.models import MPNN
-from chemprop.models.utils import load_model, save_model
+from chemprop.models.utils import load_model, load_model_with_metadata, save_model
 from chemprop.nn import (
     MSE,
     BondMessagePassing,
@@ -97,6 +97,34 @@ def test_checkpoint_roundtrip(checkpoint_path, model_path, trainer, test_loader)
     assert np.allclose(ys_from_file, ys_from_checkpoint, atol=1e-6)
 
 
+@pytest.mark.parametrize(
+    "map_location",
+    [
+        "cpu",
+        pytest.param(
+            "cuda", marks=pytest.mark.skipif(not torch.cuda.is_available(), reason="requires CUDA")
+        ),
+    ],
+)
+def test_checkpoint_map_location(checkpoint_path, map_location):
+    model = MPNN.load_from_checkpoint(checkpoint_path, map_location=map_location)
+
+    assert model.device.type == map_location
+    assert all(p.device.type == map_location for p in model.parameters())
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_load_with_metadata(tmp_path, model, test_loader, trainer, ys, mmap):
+    save_path = Path(tmp_path) / "test.pt"
+    save_model(save_path, model, output_columns=["lipo"])
+
+    model_from_file, metadata = load_model_with_metadata(save_path, False, mmap=mmap)
+    ys_from_file = np.vstack(trainer.predict(model_from_file, test_loader))
+
+    assert np.allclose(ys_from_file, ys, atol=1e-6)
+    assert metadata == {"output_columns": ["lipo"]}
+
+
 def test_scalers_roundtrip(tmp_path):
     E_f_transform = ScaleTransform(mean=[0.0, 1.0], scale=[2.0, 3.0])
     graph_transform = GraphTransform(V_transform=Identity(), E_transform=E_f_transform)